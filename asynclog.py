@@ -0,0 +1,196 @@
+"""
+Asynchronous logging for PoE2-AutoFlask.
+
+Threads that log only append the record to a bounded in-memory queue. A
+background listener thread takes records off the queue in batches, passes
+them to the real handlers (log file, console) and flushes once per batch,
+so disk I/O never sits between a bar reading and its keypress.
+
+When the queue is full the drop policy decides what is lost:
+
+    newest - the incoming record is dropped (errors still displace the oldest record)
+    oldest - the oldest queued record is dropped
+
+Every dropped record is counted.
+"""
+import logging
+import threading
+from collections import deque
+
+DROP_NEWEST = "newest"
+DROP_OLDEST = "oldest"
+DROP_POLICIES = (DROP_NEWEST, DROP_OLDEST)
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 256
+
+
+class BoundedLogQueue:
+    """
+    Thread-safe record queue with a maximum size and a drop policy
+    """
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE, policy=DROP_NEWEST):
+        self.records = deque()
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.configure(maxsize, policy)
+
+    def configure(self, maxsize, policy):
+        """Change the size limit and drop policy"""
+        if policy not in DROP_POLICIES:
+            policy = DROP_NEWEST
+        with self.condition:
+            self.maxsize = max(1, maxsize)
+            self.policy = policy
+            while len(self.records) > self.maxsize:
+                self.records.popleft()
+                self.dropped += 1
+
+    def put(self, record):
+        """
+        Queue a record, applying the drop policy when full
+
+        Returns:
+            False if the record itself was dropped
+        """
+        with self.condition:
+            if len(self.records) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST and record.levelno < logging.ERROR:
+                    return False
+                self.records.popleft()
+            self.records.append(record)
+            self.condition.notify()
+            return True
+
+    def get_batch(self, max_records, timeout=None):
+        """
+        Wait for records and take up to max_records of them
+
+        Returns:
+            List of records, empty if the timeout expired
+        """
+        with self.condition:
+            if not self.records:
+                self.condition.wait(timeout)
+            count = min(max_records, len(self.records))
+            return [self.records.popleft() for _ in range(count)]
+
+    def wake(self):
+        """Wake a waiting get_batch()"""
+        with self.condition:
+            self.condition.notify_all()
+
+    def __len__(self):
+        return len(self.records)
+
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Handler that only queues records for the LogListener
+    """
+
+    def __init__(self, log_queue):
+        super().__init__()
+        self.queue = log_queue
+
+    def emit(self, record):
+        try:
+            # Resolve the message and traceback now - the record's arguments
+            # may change before the listener gets to it
+            record.message = record.getMessage()
+            if record.exc_info and not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.msg = record.message
+            record.args = None
+            record.exc_info = None
+            self.queue.put(record)
+        except Exception:
+            self.handleError(record)
+
+
+class BatchFileHandler(logging.FileHandler):
+    """
+    Log file handler that writes without flushing; the listener calls
+    flush_batch() once per batch instead
+    """
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        logging.FileHandler.flush(self)
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class LogListener:
+    """
+    Background thread writing queued records to the real handlers
+    """
+
+    def __init__(self, log_queue, handlers, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Args:
+            log_queue: BoundedLogQueue filled by AsyncLogHandler
+            handlers: Handlers that format and write the records
+            batch_size: Maximum records written between flushes
+        """
+        self.queue = log_queue
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.records_written = 0
+        self.batches = 0
+
+        self._stop = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self._stop.clear()
+        self.thread = threading.Thread(target=self.run, name="log-listener")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        """Write everything still queued and stop the thread"""
+        self._stop.set()
+        self.queue.wake()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout)
+        for handler in self.handlers:
+            handler.close()
+
+    def run(self):
+        while True:
+            stopping = self._stop.is_set()
+            batch = self.queue.get_batch(self.batch_size, timeout=0.5)
+            if batch:
+                self.write(batch)
+            elif stopping:
+                break
+
+    def write(self, batch):
+        """Pass a batch of records to the handlers and flush each once"""
+        for record in batch:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        for handler in self.handlers:
+            try:
+                getattr(handler, "flush_batch", handler.flush)()
+            except Exception:
+                pass
+        self.records_written += len(batch)
+        self.batches += 1
+
+    def stats(self):
+        """Queue and write statistics"""
+        return {
+            "queued": len(self.queue),
+            "dropped": self.queue.dropped,
+            "written": self.records_written,
+            "batches": self.batches,
+        }
@@ -0,0 +1,170 @@
+"""
+Automatic orb location for PoE2-AutoFlask.
+
+Finds the health and mana orbs in a single full-screen frame without any
+user input: the frame is first searched at a coarse pyramid level (every
+Nth pixel) for the largest round region of each orb color, and only the
+area around that region is then classified at full resolution to place
+the monitoring strip precisely.
+"""
+import numpy as np
+
+import detection
+
+# Width of the coarse pyramid level the orbs are searched at
+DEFAULT_SEARCH_WIDTH = 480
+# Smallest orb, as a fraction of the coarse level's area
+MIN_AREA_FRACTION = 0.0005
+# Share of its bounding box a region must fill to count as round: a full
+# circle fills ~0.79 and any bottom-filled part of one at least ~0.67, while
+# solid rectangles such as icons fill all of it
+MIN_EXTENT = 0.55
+MAX_EXTENT = 0.9
+# Columns on each side of the orb center in the monitoring strip
+STRIP_HALF_WIDTH = 2
+
+
+def pyramid_factor(width, search_width=DEFAULT_SEARCH_WIDTH):
+    """Subsampling step that brings a frame down to about search_width columns"""
+    return max(1, int(round(width / search_width)))
+
+
+def label_regions(mask):
+    """
+    Label the 4-connected regions of a boolean mask
+
+    Every pixel starts with its own flat index as label; labels then take
+    the minimum of their neighbours and follow the label they point to
+    (pointer jumping) until nothing changes.
+
+    Returns:
+        (height, width) int64 array; background pixels hold mask.size
+    """
+    height, width = mask.shape
+    background = mask.size
+    labels = np.where(mask, np.arange(mask.size, dtype=np.int64).reshape(height, width), background)
+    while True:
+        merged = labels.copy()
+        np.minimum(merged[1:], labels[:-1], out=merged[1:])
+        np.minimum(merged[:-1], labels[1:], out=merged[:-1])
+        np.minimum(merged[:, 1:], labels[:, :-1], out=merged[:, 1:])
+        np.minimum(merged[:, :-1], labels[:, 1:], out=merged[:, :-1])
+        merged[~mask] = background
+
+        flat = merged.ravel()
+        foreground = flat < background
+        flat[foreground] = flat[flat[foreground]]
+
+        if np.array_equal(merged, labels):
+            return labels
+        labels = merged
+
+
+def find_regions(mask, min_area=1):
+    """
+    Connected regions of a mask, largest first
+
+    Returns:
+        List of dicts with area, bbox (x1, y1, x2, y2; exclusive end) and
+        extent (share of the bounding box covered)
+    """
+    labels = label_regions(mask)
+    rows, cols = np.nonzero(mask)
+    if len(rows) == 0:
+        return []
+    ids, inverse, areas = np.unique(labels[rows, cols], return_inverse=True, return_counts=True)
+
+    y1 = np.full(len(ids), mask.shape[0]); np.minimum.at(y1, inverse, rows)
+    y2 = np.zeros(len(ids), dtype=np.int64); np.maximum.at(y2, inverse, rows)
+    x1 = np.full(len(ids), mask.shape[1]); np.minimum.at(x1, inverse, cols)
+    x2 = np.zeros(len(ids), dtype=np.int64); np.maximum.at(x2, inverse, cols)
+
+    regions = []
+    for i in np.argsort(-areas):
+        if areas[i] < min_area:
+            break
+        box_area = (x2[i] - x1[i] + 1) * (y2[i] - y1[i] + 1)
+        regions.append({
+            "area": int(areas[i]),
+            "bbox": (int(x1[i]), int(y1[i]), int(x2[i]) + 1, int(y2[i]) + 1),
+            "extent": float(areas[i] / box_area),
+        })
+    return regions
+
+
+def refine_orb(frame, classifier, bbox, margin):
+    """
+    Place the monitoring strip of an orb found near bbox at full resolution
+
+    Args:
+        frame: Full-screen RGB frame
+        classifier: ColorClassifier for the orb color
+        bbox: Approximate orb bounding box in frame pixels
+        margin: Pixels added on each side of bbox before classifying
+
+    Returns:
+        Dict with region (monitoring strip), bbox (colored part of the orb),
+        center, diameter, fill and confidence - or None
+    """
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = bbox
+    x1, y1 = max(0, x1 - margin), max(0, y1 - margin)
+    x2, y2 = min(width, x2 + margin), min(height, y2 + margin)
+    mask = classifier.mask(frame[y1:y2, x1:x2])
+
+    location = detection.locate_bar(mask)
+    if location is None:
+        return None
+
+    # The colored columns span the orb's diameter once it is at least half
+    # full. Below that they span the chord at the liquid surface, and the
+    # circle follows from the chord and the segment height
+    columns = np.flatnonzero(mask.any(axis=0))
+    liquid_rows = location["bottom"] - location["top"] + 1
+    chord = int(columns[-1] - columns[0] + 1)
+    if liquid_rows * 2 >= chord:
+        diameter = max(chord, liquid_rows)
+    else:
+        diameter = int(round(chord * chord / (4.0 * liquid_rows) + liquid_rows))
+    bottom = y1 + location["bottom"]
+    top = max(0, bottom - diameter + 1)
+    center = x1 + location["column"]
+
+    return {
+        "region": (center - STRIP_HALF_WIDTH, top, center + STRIP_HALF_WIDTH, bottom),
+        "bbox": (x1 + int(columns[0]), y1 + location["top"], x1 + int(columns[-1]) + 1, bottom + 1),
+        "center": x1 + location["center"],
+        "diameter": diameter,
+        "fill": min(1.0, liquid_rows / diameter),
+        "confidence": location["confidence"],
+    }
+
+
+def locate_orbs(frame, classifiers, search_width=DEFAULT_SEARCH_WIDTH):
+    """
+    Find orbs in a full-screen frame
+
+    Args:
+        frame: (height, width, 3) RGB array of the whole screen
+        classifiers: Dict of orb name -> ColorClassifier, e.g.
+            {"health": get_classifier("health_calibration"), ...}
+        search_width: Width of the coarse level the orbs are searched at
+
+    Returns:
+        Dict of orb name -> refine_orb() result, or None if not found
+    """
+    factor = pyramid_factor(frame.shape[1], search_width)
+    coarse = frame[::factor, ::factor]
+    min_area = max(4, int(coarse.shape[0] * coarse.shape[1] * MIN_AREA_FRACTION))
+
+    found = {}
+    for name, classifier in classifiers.items():
+        found[name] = None
+        for region in find_regions(classifier.mask(coarse), min_area):
+            if not MIN_EXTENT <= region["extent"] <= MAX_EXTENT:
+                continue
+            cx1, cy1, cx2, cy2 = region["bbox"]
+            bbox = (cx1 * factor, cy1 * factor, cx2 * factor, cy2 * factor)
+            found[name] = refine_orb(frame, classifier, bbox, margin=2 * factor)
+            break
+    return found
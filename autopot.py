@@ -1,7 +1,6 @@
 import time
 import keyboard
 import threading
-from PIL import ImageGrab
 import numpy as np
 import configparser
 import os
@@ -10,12 +9,53 @@ import colorama
 from colorama import Fore, Back, Style
 import logging
 import traceback
+import atexit
+import argparse
+import json
+import signal
+import functools
+from collections import deque
+
+import detection
+import autolocate
+from capture import BACKEND_MSS, BACKEND_PIL, DEFAULT_REPLAY_FPS, CapturePlanner, SharedCapture, create_frame_source
+from recording import FrameRecorder
+from triggers import PREDICT_OFF, PREDICT_ON, ConfirmationFilter, TrendPredictor
+from scheduling import AdaptiveScheduler
+from pipeline import RESTART_TIMEOUT, BarPipeline
+from regions import REGION_PREFIX, RegionBatch, load_regions
+from settings import CONFIG_PATH, ConfigWatcher, Settings, startup_changes
+from profiles import ProfileStore, detect_ui_scale, profile_key, to_normalized, to_pixels
+from history import SessionHistory, decision_flags
+from display import BarTemplates, ConsoleRenderer, MODE_NONE, clear_console
+from events import EVENT_LEVEL, EVENT_MESSAGE, EVENT_REDRAW, EventChannel
+from dispatcher import PRIORITY_HEALTH, PRIORITY_MANA, PRIORITY_REGION, InputDispatcher, create_input_backend
+from control import COMMANDS, ControlServer, default_address, send_command
+from debugimages import DebugImageWriter
+from asynclog import AsyncLogHandler, BatchFileHandler, BoundedLogQueue, LogListener
 
 # Initialize colorama with autoreset
 colorama.init(autoreset=True)
 
+# Redraw interval while a cooldown counts down or debug statistics are shown
+DISPLAY_TICK = 0.1
+
+# Message color and input dispatch priority of each bar's potion
+BAR_COLORS = {"health": Fore.RED, "mana": Fore.BLUE}
+BAR_PRIORITIES = {"health": PRIORITY_HEALTH, "mana": PRIORITY_MANA}
+
+# Background log writer, shared by every controller in the process
+log_listener = None
+log_filename = None
+# Off while the status display owns the console
+console_logging = True
+
 # Set up logging to file and console
 def setup_logging():
+    global log_listener, log_filename
+    if log_listener is not None:
+        return log_filename
+    
     # Create logs directory if it doesn't exist
     if not os.path.exists("logs"):
         os.makedirs("logs")
@@ -23,19 +63,43 @@ def setup_logging():
     # Create a unique log filename with timestamp
     log_filename = f"logs/autopot_{time.strftime('%Y%m%d_%H%M%S')}.log"
     
+    # Threads only queue records - the listener formats and writes them in batches
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    console_handler = logging.StreamHandler()
+    console_handler.addFilter(lambda record: getattr(record, "console", True))
+    handlers = [BatchFileHandler(log_filename), console_handler]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = BoundedLogQueue()
+    log_listener = LogListener(log_queue, handlers)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    
     # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_filename),
-            logging.StreamHandler()
-        ]
-    )
+    async_handler = AsyncLogHandler(log_queue)
+    async_handler.addFilter(stamp_console)
+    logging.basicConfig(level=logging.DEBUG, handlers=[async_handler])
     
     logging.info(f"Logging started. Log file: {log_filename}")
     return log_filename
 
+def stamp_console(record):
+    """Mark whether the record goes to the console, decided when it is logged"""
+    record.console = console_logging
+    return True
+
+def set_console_logging(enabled):
+    """
+    Echo log records to the console or not
+    
+    The status display draws at fixed console rows, so records printed in
+    between would scroll and corrupt it; the log file still gets everything.
+    The listener writes records later, so each record is stamped when it is
+    logged rather than switching the console handler itself.
+    """
+    global console_logging
+    console_logging = enabled
+
 # Global exception handler to catch and log all unhandled exceptions
 def global_exception_handler(exc_type, exc_value, exc_traceback):
     logging.error("Unhandled exception", exc_info=(exc_type, exc_value, exc_traceback))
@@ -45,73 +109,285 @@ def global_exception_handler(exc_type, exc_value, exc_traceback):
 # Set the global exception handler
 sys.excepthook = global_exception_handler
 
+def live_setting(name):
+    """
+    Controller attribute backed by the current Settings snapshot; assigning
+    it swaps in a new snapshot with just that value changed
+    """
+    return property(
+        lambda self: getattr(self.settings, name),
+        lambda self, value: self.apply_settings(self.settings._replace(**{name: value}))
+    )
+
+
 class AutoPotController:
-    def __init__(self):
+    # Live settings - read from the current snapshot, see settings.py
+    health_threshold = live_setting("health_threshold")
+    mana_threshold = live_setting("mana_threshold")
+    health_potion_key = live_setting("health_potion_key")
+    mana_potion_key = live_setting("mana_potion_key")
+    health_cooldown = live_setting("health_cooldown")
+    mana_cooldown = live_setting("mana_cooldown")
+    prediction_mode = live_setting("prediction_mode")
+    prediction_latency = live_setting("prediction_latency")
+    min_poll_interval = live_setting("min_poll_interval")
+    max_poll_interval = live_setting("max_poll_interval")
+    poll_safe_margin = live_setting("poll_safe_margin")
+
+    def __init__(self, frame_source=None, interactive=True, input_backend=None, headless=False):
+        """
+        Args:
+            frame_source: FrameSource used for every screen capture. When not
+                given, the backend named in the [Capture] config section is used.
+            interactive: Start the console display and global hotkeys. Tools
+                that only drive the detectors (replay, benchmarks) pass False.
+            input_backend: Backend that sends flask keys. When not given, the
+                backend named in the [Input] config section is used.
+            headless: Run without the console display and hotkeys, controlled
+                through the control API instead (see start_control).
+        """
         # Set up logging
         self.log_filename = setup_logging()
         logging.info("Initializing AutoPotController")
+
+        # Configuration
+        self.config = self.load_config()
+        
+        # Live settings - everything the checks read on every cycle comes from
+        # one immutable snapshot, swapped as a whole when the file changes
+        self.settings, problems = Settings.from_config(self.config)
+        for problem in problems:
+            logging.warning(f"Config: {problem} - using the default")
+        self.config_watcher = ConfigWatcher(CONFIG_PATH)
+        
+        # Log queue limits
+        log_listener.queue.configure(
+            self.config.getint("Logging", "queue_size", fallback=10000),
+            self.config.get("Logging", "drop_policy", fallback="newest").strip().lower()
+        )
+        log_listener.batch_size = self.config.getint("Logging", "batch_size", fallback=256)
+        logging.info(f"Log queue: {log_listener.queue.maxsize} records, drop {log_listener.queue.policy}")
+        
+        # Screen capture backend
+        if frame_source is None:
+            frame_source = self.create_frame_source()
+        self.frame_source = frame_source
+        logging.info(f"Capture backend: {self.frame_source.name}")
         
         # Screen resolution
         self.screen_width = 1920
         self.screen_height = 1080
         
-        try:
-            import pyautogui
-            self.screen_width, self.screen_height = pyautogui.size()
+        screen_size = self.current_screen_size()
+        if screen_size:
+            self.screen_width, self.screen_height = screen_size
             logging.info(f"Screen resolution: {self.screen_width}x{self.screen_height}")
-        except Exception as e:
-            logging.warning(f"Could not detect screen resolution: {e}")
+        else:
+            logging.warning("Could not detect screen resolution")
             logging.info(f"Using default resolution: {self.screen_width}x{self.screen_height}")
 
-        # Configuration
-        self.config = self.load_config()
-
-        # Thresholds
-        self.health_threshold = self.config.getfloat("Thresholds", "health", fallback=0.35)
-        self.mana_threshold = self.config.getfloat("Thresholds", "mana", fallback=0.25)
-
         # Hotkeys
-        self.health_potion_key = self.config.get("Hotkeys", "health_potion", fallback="1")
-        self.mana_potion_key = self.config.get("Hotkeys", "mana_potion", fallback="2")
         self.toggle_key = self.config.get("Hotkeys", "toggle", fallback="f12").lower()
 
-        # Screen positions
-        self.health_bar_pos = self.parse_position(
-            self.config.get("ScreenPositions", "health_bar", fallback="0.08,0.95,0.09,0.98")
-        )
-        self.mana_bar_pos = self.parse_position(
-            self.config.get("ScreenPositions", "mana_bar", fallback="0.75,0.95,0.76,0.98")
-        )
+        # Screen positions - the calibration profile for this resolution and UI
+        # scale if there is one, otherwise the default normalized positions
+        self.ui_scale = self.current_ui_scale()
+        self.profiles = ProfileStore(self.config)
+        self.profile_key = profile_key(self.screen_width, self.screen_height, self.ui_scale)
+        self.health_bar_pos, self.mana_bar_pos = self.profile_positions()
+        self.display_check_interval = self.config.getfloat("Calibration", "display_check_interval", fallback=2.0)
         
         logging.info(f"Health bar position: {self.health_bar_pos}")
         logging.info(f"Mana bar position: {self.mana_bar_pos}")
+        
+        # Fill level detection - "profile" finds the liquid surface from the
+        # per-row fill profile, "count" is the original colored pixel count
+        self.detection_method = self.config.get("Detection", "method", fallback="profile").lower()
+        self.profile_columns = self.config.getint("Detection", "columns", fallback=0)
+        logging.info(f"Detection method: {self.detection_method}")
+        
+        # Pixel color classifiers, baked into quantized RGB lookup tables
+        # that are cached on disk so startup doesn't rebuild them
+        self.lut_bits = self.config.getint("Detection", "lut_bits", fallback=detection.DEFAULT_LUT_BITS)
+        self.lut_cache = self.config.get("Detection", "lut_cache", fallback="cache")
+        detection.register_bar_classifiers(bits=self.lut_bits, cache_dir=self.lut_cache)
+        self.health_color = detection.get_classifier("health")
+        self.health_presence = detection.get_classifier("health_presence")
+        self.mana_color = detection.get_classifier("mana")
+        self.mana_presence = detection.get_classifier("mana_presence")
+        
+        # Unchanged-frame detection - identical frames reuse the last measurement
+        self.skip_unchanged_frames = self.config.getboolean("Detection", "skip_unchanged", fallback=True)
+        self.health_measurements = detection.MeasurementCache()
+        self.mana_measurements = detection.MeasurementCache()
+        
+        # Screen capture - one planned grab per cycle covering both bars
+        self.capture_planner = CapturePlanner(
+            self.bar_regions(),
+            mode=self.config.get("Capture", "mode", fallback="auto").lower(),
+            source=self.frame_source
+        )
+        logging.info(f"Capture mode: {self.capture_planner.mode}")
+        # The pipelines share each grab, so bars read together see the same instant
+        self.shared_capture = SharedCapture(self.capture_planner, self.min_poll_interval)
 
         # State
         self.active = False
         self.health_last_used = 0
         self.mana_last_used = 0
-        self.health_cooldown = self.config.getfloat("Cooldowns", "health_potion", fallback=4.0)
-        self.mana_cooldown = self.config.getfloat("Cooldowns", "mana_potion", fallback=7.0)
 
         # Current values
         self.current_health = 1.0
         self.current_mana = 1.0
         
+        # Clock used for cooldowns and dry-run mode (decide but don't press keys),
+        # both swapped out when replaying recorded frames
+        self.clock = time.time
+        self.dry_run = False
+        
+        # Flask keys are sent by a background dispatcher, so slow key
+        # injection never holds up the next reading
+        if input_backend is None:
+            input_backend = create_input_backend(
+                self.config.get("Input", "backend", fallback="keyboard").strip().lower()
+            )
+        self.input_dispatcher = InputDispatcher(input_backend)
+        logging.info(f"Input backend: {getattr(input_backend, 'name', type(input_backend).__name__)}")
+        
+        # Trigger verification - a flask is used once N of the last M readings
+        # were below the threshold, without pausing the monitor loop
+        confirm_frames = self.settings.confirm_frames
+        window_frames = self.settings.window_frames
+        self.health_confirmation = ConfirmationFilter(confirm_frames, window_frames)
+        self.mana_confirmation = ConfirmationFilter(confirm_frames, window_frames)
+        logging.info(f"Trigger verification: {confirm_frames} of last {window_frames} readings")
+        
+        # Predictive triggering - fire ahead of the threshold crossing when the
+        # bar's recent trend projects it below the threshold
+        self.health_predictor = self.create_predictor()
+        self.mana_predictor = self.create_predictor()
+        if self.prediction_mode != PREDICT_OFF:
+            logging.info(f"Predictive triggering: {self.prediction_mode}, "
+                         f"latency {self.prediction_latency if self.prediction_latency is not None else 'auto'}")
+        
+        # Extra monitored regions - [Region <name>] sections, all grabbed and
+        # classified together in one batch
+        self.regions = load_regions(self.config, bits=self.lut_bits, cache_dir=self.lut_cache)
+        for region in self.regions:
+            region.confirmation = ConfirmationFilter(confirm_frames, window_frames)
+        self.region_batch = RegionBatch(
+            self.regions, self.detection_method, self.capture_planner.mode, self.frame_source,
+            columns=self.profile_columns
+        )
+        self.region_batch.place(self.screen_width, self.screen_height)
+        # The regions are captured in the bars' grabs
+        self.capture_planner.set_regions(self.capture_regions())
+        if self.regions:
+            logging.info(f"Extra regions: {', '.join(region.name for region in self.regions)}")
+        
+        # Adaptive polling - each bar is sampled more often near its threshold
+        self.health_scheduler = self.create_scheduler(self.health_threshold)
+        self.mana_scheduler = self.create_scheduler(self.mana_threshold)
+        # Extra regions are scheduled on the distance of the closest one from its trigger
+        self.region_scheduler = self.create_scheduler(0.0)
+        logging.info(f"Polling interval: {self.min_poll_interval:.3f}s - {self.max_poll_interval:.3f}s")
+        
         # Debug mode
         self.debug_mode = self.config.getboolean("Debug", "enabled", fallback=False)
         
-        # Message log
-        self.messages = []
+        # Debug images - sampled and written by a background thread
+        self.debug_images = DebugImageWriter(
+            "debug",
+            mode=self.config.get("Debug", "image_mode", fallback="every").strip().lower(),
+            every=self.config.getint("Debug", "image_every", fallback=10),
+            trigger_frames=self.config.getint("Debug", "trigger_frames", fallback=5),
+            queue_size=self.config.getint("Debug", "image_queue", fallback=64)
+        )
+        
+        # Frame recorder - records every captured region while debug mode is on
+        self.record_frames = self.config.getboolean("Debug", "record", fallback=True)
+        self.recorder = None
+        
+        # Reading and flask history - fixed-size ring buffers, exported on demand or at exit
+        self.history = SessionHistory(
+            capacity=self.config.getint("History", "capacity", fallback=100000),
+            event_capacity=self.config.getint("History", "event_capacity", fallback=10000)
+        )
+        self.history_dir = self.config.get("History", "directory", fallback="history")
+        self.history_formats = [
+            f.strip().lower() for f in self.config.get("History", "formats", fallback="csv,npz").split(",")
+        ]
+        self.export_history_on_exit = self.config.getboolean("History", "export_on_exit", fallback=True)
+        logging.info(f"History buffers: {self.history.nbytes() / 1024:.0f} KiB")
+        
+        # Display events - every pipeline thread publishes, only the display
+        # thread consumes and keeps the levels and messages it draws
+        self.display_events = EventChannel(
+            self.config.getint("Display", "event_queue_size", fallback=1024)
+        )
+        self.display_levels = {"health": 1.0, "mana": 1.0}
         self.max_messages = 3  # Fewer messages for compact display
+        self.display_messages = deque(maxlen=self.max_messages)
+        
+        # Independent monitoring pipeline per bar, supervised by monitor_loop
+        self.pipelines = {
+            name: BarPipeline(
+                name,
+                capture=functools.partial(self.capture_bar, name),
+                check=functools.partial(self.check_bar_level, name),
+                scheduler=getattr(self, f"{name}_scheduler"),
+                publish=functools.partial(self.update_level, name),
+                on_error=self.pipeline_error
+            )
+            for name in ("health", "mana")
+        }
+        if self.regions:
+            self.pipelines["regions"] = BarPipeline(
+                "regions",
+                capture=self.capture_region_batch,
+                check=self.check_regions,
+                scheduler=self.region_scheduler,
+                on_error=self.pipeline_error
+            )
 
         # Initialize monitor thread variable (FIXED: was missing this initialization)
         self.monitor_thread = None
+        # Stop event of the current monitor loop - each loop gets its own
+        self.monitor_stop = threading.Event()
+        
+        # Console display - redraws only changed lines, at most max_fps times a second
+        self.renderer = ConsoleRenderer(
+            self.config.get("Display", "mode", fallback="incremental").strip().lower(),
+            self.config.getfloat("Display", "max_fps", fallback=4.0)
+        )
+        self.bar_templates = BarTemplates(width=25, reset=Style.RESET_ALL)
+        self.display_active = False
+        self.display_paused = False
+        
+        # Headless mode - set when the program should exit
+        self.headless = headless
+        self.shutdown_event = threading.Event()
+        self.control_server = None
+        
+        if not interactive:
+            logging.info("Non-interactive mode - display and hotkeys disabled")
+            return
+        
+        if self.debug_mode:
+            self.start_recording()
+        
+        if headless:
+            logging.info("Headless mode - no console display or hotkeys, use the control API")
+            return
 
         # Start display thread
-        self.display_active = True
-        self.display_thread = threading.Thread(target=self.display_loop)
-        self.display_thread.daemon = True
-        self.display_thread.start()
+        if self.renderer.mode != MODE_NONE:
+            self.display_active = True
+            set_console_logging(False)
+            self.display_thread = threading.Thread(target=self.display_loop)
+            self.display_thread.daemon = True
+            self.display_thread.start()
+        logging.info(f"Display mode: {self.renderer.mode}")
         
         # Add welcome message
         self.add_message(f"{Fore.GREEN}Auto-Potion ready! Press {Fore.YELLOW}{self.toggle_key.upper()}{Fore.GREEN} to toggle.")
@@ -125,7 +401,7 @@ class AutoPotController:
 
     def load_config(self):
         config = configparser.ConfigParser()
-        config_path = "poe2_autopot_config.ini"
+        config_path = CONFIG_PATH
 
         if os.path.exists(config_path):
             config.read(config_path)
@@ -143,7 +419,48 @@ class AutoPotController:
                 "mana_bar": "0.75,0.95,0.76,0.98",
             }
             config["Cooldowns"] = {"health_potion": "2.0", "mana_potion": "4.0"}
-            config["Debug"] = {"enabled": "false"}
+            config["Debug"] = {
+                "enabled": "false",
+                "record": "true",
+                "image_mode": "every",
+                "image_every": "10",
+                "trigger_frames": "5",
+                "image_queue": "64",
+            }
+            config["Capture"] = {"mode": "auto", "backend": "pil"}
+            config["Detection"] = {
+                "method": "profile",
+                "columns": "0",
+                "lut_bits": str(detection.DEFAULT_LUT_BITS),
+                "lut_cache": "cache",
+                "skip_unchanged": "true",
+            }
+            config["Verification"] = {"confirm_frames": "2", "window_frames": "3"}
+            config["Prediction"] = {
+                "mode": "off",
+                "latency": "auto",
+                "process_noise": "4.0",
+                "measurement_noise": "0.02",
+                "min_samples": "3",
+                "verify_window": "1.0",
+            }
+            config["Polling"] = {
+                "min_interval": "0.05",
+                "max_interval": "0.5",
+                "safe_margin": "0.3",
+            }
+            config["Display"] = {"mode": "incremental", "max_fps": "4"}
+            config["Input"] = {"backend": "keyboard"}
+            config["Control"] = {"address": ""}
+            config["Logging"] = {"queue_size": "10000", "drop_policy": "newest", "batch_size": "256"}
+            config["Calibration"] = {"ui_scale": "auto", "display_check_interval": "2.0"}
+            config["History"] = {
+                "capacity": "100000",
+                "event_capacity": "10000",
+                "directory": "history",
+                "formats": "csv,npz",
+                "export_on_exit": "true",
+            }
 
             with open(config_path, "w") as f:
                 config.write(f)
@@ -151,33 +468,359 @@ class AutoPotController:
 
         return config
 
+    def save_config(self):
+        """Write the config file without it counting as an external edit"""
+        with open(CONFIG_PATH, "w") as f:
+            self.config.write(f)
+        self.config_watcher.mark_current()
+
+    def reload_config(self):
+        """
+        Re-read the config file and swap in its live settings
+        
+        The new snapshot is only used if every value is valid; otherwise the
+        current settings stay in place and the problems are reported.
+        
+        Returns:
+            Names of the settings that changed, None if the file couldn't be used
+        """
+        try:
+            config = configparser.ConfigParser()
+            config.read(CONFIG_PATH)
+            settings, problems = Settings.from_config(config)
+            if problems:
+                for problem in problems:
+                    logging.error(f"Config not reloaded: {problem}")
+                self.add_message(f"{Fore.YELLOW}Config not reloaded: {problems[0][:60]}")
+                return None
+            
+            restart = startup_changes(self.config, config)
+            if restart:
+                logging.warning(f"Restart to apply changes to: {', '.join(restart)}")
+                self.add_message(f"{Fore.YELLOW}Restart to apply: {', '.join(restart)}")
+            
+            # Later writes (debug toggle, calibration) must start from the edited file
+            self.config = config
+            self.profiles = ProfileStore(config)
+            
+            changes = settings.changes(self.settings)
+            if not changes:
+                return changes
+            for name in changes:
+                logging.info(f"Config reloaded: {name} {getattr(self.settings, name)} -> {getattr(settings, name)}")
+            self.apply_settings(settings)
+            self.add_message(f"{Fore.CYAN}Config reloaded: {', '.join(changes)}")
+            return changes
+        except Exception as e:
+            logging.error(f"Error reloading config: {e}")
+            logging.error(traceback.format_exc())
+            self.add_message(f"{Fore.RED}Config reload error: {str(e)[:50]}")
+            return None
+
+    def check_config(self):
+        """
+        Reload the config file if it was edited - call about once a second
+        
+        Runs from the main loop rather than the monitoring loop, so edits are
+        picked up while auto-potion is off too.
+        """
+        if self.config_watcher.changed():
+            self.reload_config()
+
+    def start_control(self, address):
+        """
+        Start serving the control API on a local socket or named pipe
+        
+        Args:
+            address: Socket path or pipe name, see control.default_address()
+        """
+        self.control_server = ControlServer(address, {
+            "status": self.control_status,
+            "toggle": self.control_toggle,
+            "reload-config": self.control_reload,
+            "calibrate-auto": self.control_calibrate,
+            "shutdown": self.control_shutdown,
+        })
+        self.control_server.start()
+
+    def control_status(self, request):
+        """Control API: current state, levels, sampling rates and latencies"""
+        settings = self.settings
+        pipelines = {}
+        for name, pipeline in self.pipelines.items():
+            stats = pipeline.latency_stats()
+            pipelines[name] = {
+                "rate": round(pipeline.scheduler.sample_rate(), 2),
+                "p95_ms": round(stats["p95_ms"], 3) if stats else None,
+                "errors": pipeline.errors,
+            }
+        input_stats = self.input_dispatcher.stats()
+        return {
+            "ok": True,
+            "active": self.active,
+            "debug": self.debug_mode,
+            "health": round(self.current_health, 4),
+            "mana": round(self.current_mana, 4),
+            "regions": {region.name: round(region.level, 4) for region in self.regions},
+            "thresholds": {"health": settings.health_threshold, "mana": settings.mana_threshold},
+            "profile": self.profile_key,
+            "pipelines": pipelines,
+            "keys": {
+                "sent": input_stats["sent"],
+                "coalesced": input_stats["coalesced"],
+                "p95_ms": round(input_stats["p95_ms"], 3) if input_stats["p95_ms"] is not None else None,
+            },
+        }
+
+    def control_toggle(self, request):
+        """Control API: turn auto-potion on or off"""
+        self.toggle()
+        return {"ok": True, "active": self.active}
+
+    def control_reload(self, request):
+        """Control API: re-read the config file"""
+        changes = self.reload_config()
+        if changes is None:
+            return {"ok": False, "error": "config not reloaded, see the log"}
+        return {"ok": True, "changed": changes}
+
+    def control_calibrate(self, request):
+        """Control API: locate both orbs and start using their regions"""
+        found = self.auto_calibrate()
+        if found is None:
+            return {"ok": False, "error": "auto-calibration failed, see the log"}
+        reply = {"ok": True, "profile": self.profile_key}
+        for name, orb in found.items():
+            reply[name] = {
+                "region": [int(v) for v in orb["region"]],
+                "confidence": round(float(orb["confidence"]), 3),
+            }
+        return reply
+
+    def control_shutdown(self, request):
+        """Control API: stop the program"""
+        self.shutdown_event.set()
+        return {"ok": True}
+
+    def apply_settings(self, settings):
+        """
+        Start using a settings snapshot
+        
+        Verification filters are rebuilt if their size changed and the polling
+        schedules take the new thresholds and intervals. The snapshot itself
+        is swapped in with a single assignment, so a check running meanwhile
+        uses either the old or the new settings.
+        """
+        old = self.settings
+        if (settings.confirm_frames, settings.window_frames) != (old.confirm_frames, old.window_frames):
+            self.health_confirmation = ConfirmationFilter(settings.confirm_frames, settings.window_frames)
+            self.mana_confirmation = ConfirmationFilter(settings.confirm_frames, settings.window_frames)
+            for region in self.regions:
+                region.confirmation = ConfirmationFilter(settings.confirm_frames, settings.window_frames)
+        
+        for scheduler, threshold in ((self.health_scheduler, settings.health_threshold),
+                                     (self.mana_scheduler, settings.mana_threshold),
+                                     (self.region_scheduler, 0.0)):
+            scheduler.threshold = threshold
+            scheduler.min_interval = settings.min_poll_interval
+            scheduler.max_interval = max(settings.min_poll_interval, settings.max_poll_interval)
+            scheduler.safe_margin = settings.poll_safe_margin
+        # A grab is shared by readings less than one minimum interval apart
+        self.shared_capture.max_age = settings.min_poll_interval
+        
+        self.settings = settings
+
+    def create_frame_source(self):
+        """Create the capture backend selected in the config"""
+        backend = self.config.get("Capture", "backend", fallback="pil").lower()
+        options = {}
+        if backend == "replay":
+            # No default: the replay backend plays full-screen frames, which
+            # neither debug/ (bar crops) nor a recording holds
+            path = self.config.get("Capture", "replay_path", fallback="").strip()
+            if not path:
+                logging.error("Capture backend 'replay' needs replay_path in [Capture], using 'pil'")
+                return create_frame_source("pil")
+            options["path"] = path
+            options["fps"] = self.config.getfloat("Capture", "replay_fps", fallback=DEFAULT_REPLAY_FPS)
+        return create_frame_source(backend, **options)
+
     def parse_position(self, pos_str):
         """Convert position string to screen coordinates"""
         try:
-            x1, y1, x2, y2 = map(float, pos_str.split(","))
-            x1_px = max(0, min(int(x1 * self.screen_width), self.screen_width))
-            y1_px = max(0, min(int(y1 * self.screen_height), self.screen_height))
-            x2_px = max(0, min(int(x2 * self.screen_width), self.screen_width))
-            y2_px = max(0, min(int(y2 * self.screen_height), self.screen_height))
-            
-            # Ensure valid rectangle
-            if x1_px >= x2_px:
-                x2_px = x1_px + 5
-            if y1_px >= y2_px:
-                y2_px = y1_px + 10
-                
-            return (x1_px, y1_px, x2_px, y2_px)
+            return to_pixels(pos_str, self.screen_width, self.screen_height)
         except Exception as e:
             logging.error(f"Error parsing position '{pos_str}': {e}")
             return (0, 0, 10, 10)
 
+    def current_screen_size(self):
+        """
+        Current (width, height) of the screen, or None if it can't be read
+        
+        Live screen backends ask the OS each time; synthetic and replay
+        sources report the size of their frames.
+        """
+        if self.frame_source.name in (BACKEND_PIL, BACKEND_MSS):
+            try:
+                import pyautogui
+                width, height = pyautogui.size()
+                return int(width), int(height)
+            except Exception:
+                pass
+        return self.frame_source.screen_size()
+
+    def current_ui_scale(self):
+        """UI scale from the config, or the OS display scaling with ui_scale = auto"""
+        setting = self.config.get("Calibration", "ui_scale", fallback="auto").strip().lower()
+        if setting == "auto":
+            return detect_ui_scale()
+        try:
+            return float(setting)
+        except ValueError:
+            logging.warning(f"Invalid ui_scale '{setting}', detecting it instead")
+            return detect_ui_scale()
+
+    def profile_positions(self):
+        """
+        Health and mana regions for the current display setup
+        
+        Returns:
+            (health_bar_pos, mana_bar_pos) from the matching calibration profile,
+            or the [ScreenPositions] defaults scaled to the current screen
+        """
+        regions = self.profiles.get(self.profile_key)
+        if regions is not None:
+            logging.info(f"Using calibration profile {self.profile_key}")
+            return regions["health"], regions["mana"]
+        
+        logging.info(f"No calibration profile for {self.profile_key} - using default positions")
+        return (
+            self.parse_position(self.config.get("ScreenPositions", "health_bar", fallback="0.08,0.95,0.09,0.98")),
+            self.parse_position(self.config.get("ScreenPositions", "mana_bar", fallback="0.75,0.95,0.76,0.98")),
+        )
+
+    def check_display(self):
+        """
+        Switch calibration profiles if the resolution or UI scale changed
+        
+        Returns:
+            True if the display setup changed
+        """
+        screen_size = self.current_screen_size()
+        if not screen_size:
+            return False
+        key = profile_key(screen_size[0], screen_size[1], self.current_ui_scale())
+        if key == self.profile_key:
+            return False
+        
+        logging.info(f"Display changed from {self.profile_key} to {key}")
+        self.screen_width, self.screen_height = screen_size
+        self.profile_key = key
+        calibrated = self.profiles.get(key) is not None
+        self.health_bar_pos, self.mana_bar_pos = self.profile_positions()
+        
+        # Swap in the new regions in one step - the pipelines keep running
+        self.region_batch.place(self.screen_width, self.screen_height)
+        self.capture_planner.set_regions(self.capture_regions())
+        self.health_confirmation.reset()
+        self.mana_confirmation.reset()
+        self.health_predictor.reset()
+        self.mana_predictor.reset()
+        for region in self.regions:
+            region.confirmation.reset()
+        
+        if self.recorder is not None:
+            self.stop_recording()
+            self.start_recording()
+        
+        if calibrated:
+            self.add_message(f"{Fore.CYAN}Display changed to {key} - calibration profile loaded")
+        else:
+            self.add_message(f"{Fore.YELLOW}Display changed to {key} - no calibration for it, press C to calibrate")
+        return True
+
+    def create_scheduler(self, threshold):
+        """Create an adaptive polling schedule for a bar with the given threshold"""
+        return AdaptiveScheduler(
+            threshold,
+            min_interval=self.min_poll_interval,
+            max_interval=self.max_poll_interval,
+            safe_margin=self.poll_safe_margin
+        )
+
+    def create_predictor(self):
+        """Create a bar trend predictor from the [Prediction] settings"""
+        return TrendPredictor(
+            process_noise=self.config.getfloat("Prediction", "process_noise", fallback=4.0),
+            measurement_noise=self.config.getfloat("Prediction", "measurement_noise", fallback=0.02),
+            min_samples=self.config.getint("Prediction", "min_samples", fallback=3),
+            verify_window=self.config.getfloat("Prediction", "verify_window", fallback=1.0)
+        )
+
+    def prediction_horizon(self, name):
+        """
+        Seconds ahead a bar's level is projected: the configured latency, or
+        the time until its next sample plus the last capture-to-decision latency
+        """
+        latency = self.settings.prediction_latency
+        if latency is not None:
+            return latency
+        scheduler = self.health_scheduler if name == "health" else self.mana_scheduler
+        horizon = scheduler.interval
+        pipeline = self.pipelines.get(name)
+        if pipeline is not None and pipeline.latencies:
+            horizon += pipeline.latencies[-1]
+        return horizon
+
+    def format_prediction_stats(self, stats):
+        """One-line summary of TrendPredictor.stats()"""
+        summary = f"{stats['fires']} fires, {stats['hits']} hits, {stats['false_triggers']} false triggers"
+        if stats["mean_lead_ms"] is not None:
+            summary += f", lead time mean {stats['mean_lead_ms']:.0f}ms median {stats['median_lead_ms']:.0f}ms"
+        return summary
+
+    def predict_low(self, name, predictor, level, threshold, low, now):
+        """
+        Feed a reading to a bar's trend predictor
+
+        Returns:
+            (predicted, trigger) - whether the bar is projected below the
+            threshold, and whether that should use a flask in this mode
+        """
+        mode = self.settings.prediction_mode
+        if mode == PREDICT_OFF:
+            return False, False
+        predictor.update(level, now)
+        predicted = predictor.check(threshold, self.prediction_horizon(name), now, low)
+        return predicted, predicted and mode == PREDICT_ON
+
+    def bar_regions(self):
+        """Screen regions monitored each cycle, keyed by bar name"""
+        regions = {"health": self.health_bar_pos, "mana": self.mana_bar_pos}
+        
+        # The row profile doesn't depend on strip width, so it can be
+        # measured from just a few center columns of each bar
+        if self.detection_method == "profile" and self.profile_columns > 0:
+            for name, (x1, y1, x2, y2) in regions.items():
+                if x2 - x1 > self.profile_columns:
+                    center = (x1 + x2) // 2
+                    x1 = center - self.profile_columns // 2
+                    regions[name] = (x1, y1, x1 + self.profile_columns, y2)
+        return regions
+
+    def capture_regions(self):
+        """Every screen region grabbed each cycle: the bars and the extra regions"""
+        regions = self.bar_regions()
+        regions.update(self.region_batch.capture_boxes)
+        return regions
+
     def setup_hotkeys(self):
         """
         Set up keyboard hotkeys with robust error handling
         """
         try:
             # Define global hooks for key functions
-            global toggle_function, calibrate_function, debug_function
+            global toggle_function, calibrate_function, auto_calibrate_function, debug_function, history_function
             
             # Store reference to the controller instance
             controller = self
@@ -199,6 +842,14 @@ class AutoPotController:
                     logging.error(f"Error in calibration function: {e}")
                     logging.error(traceback.format_exc())
                 
+            def auto_calibrate_function():
+                try:
+                    logging.info("Shift+C pressed - starting auto-calibration")
+                    controller.auto_calibrate()
+                except Exception as e:
+                    logging.error(f"Error in auto-calibration function: {e}")
+                    logging.error(traceback.format_exc())
+                
             def debug_function():
                 try:
                     logging.info("D pressed - toggling debug mode")
@@ -206,6 +857,14 @@ class AutoPotController:
                 except Exception as e:
                     logging.error(f"Error in debug function: {e}")
                     logging.error(traceback.format_exc())
+                
+            def history_function():
+                try:
+                    logging.info("H pressed - exporting history")
+                    controller.export_history()
+                except Exception as e:
+                    logging.error(f"Error in history function: {e}")
+                    logging.error(traceback.format_exc())
             
             # Clear any existing hotkeys
             keyboard.unhook_all()
@@ -213,9 +872,12 @@ class AutoPotController:
             # Register the hotkeys with the global functions
             keyboard.add_hotkey(self.toggle_key, toggle_function)
             keyboard.add_hotkey('c', calibrate_function)
+            keyboard.add_hotkey('shift+c', auto_calibrate_function)
             keyboard.add_hotkey('d', debug_function)
+            keyboard.add_hotkey('h', history_function)
             
-            logging.info(f"Hotkeys set up: {self.toggle_key} toggle, C calibrate, D debug")
+            logging.info(f"Hotkeys set up: {self.toggle_key} toggle, C calibrate, Shift+C auto-calibrate, "
+                         f"D debug, H export history")
         except Exception as e:
             logging.error(f"Error setting up hotkeys: {e}")
             logging.error(traceback.format_exc())
@@ -225,27 +887,66 @@ class AutoPotController:
         try:
             self.debug_mode = not self.debug_mode
             self.config["Debug"]["enabled"] = str(self.debug_mode)
-            with open("poe2_autopot_config.ini", "w") as f:
-                self.config.write(f)
+            self.save_config()
                 
             self.add_message(f"{Fore.MAGENTA}Debug mode {'ON' if self.debug_mode else 'OFF'}")
             logging.info(f"Debug mode {'enabled' if self.debug_mode else 'disabled'}")
             
-            # Create debug folder if debug mode is enabled
-            if self.debug_mode and not os.path.exists("debug"):
-                os.makedirs("debug")
+            # Record frames only while debug mode is on
+            if self.debug_mode:
+                self.start_recording()
+            else:
+                self.stop_recording()
         except Exception as e:
             logging.error(f"Error toggling debug mode: {e}")
             logging.error(traceback.format_exc())
 
+    def start_recording(self):
+        """Start recording every captured bar region to the recordings folder"""
+        if not self.record_frames or self.recorder is not None:
+            return
+        try:
+            regions = self.bar_regions()
+            shapes = {name: (y2 - y1, x2 - x1) for name, (x1, y1, x2, y2) in regions.items()}
+            path = os.path.join("recordings", time.strftime("%Y%m%d_%H%M%S"))
+            self.recorder = FrameRecorder(path, regions, shapes)
+            self.add_message(f"{Fore.MAGENTA}Recording frames to {path}")
+        except Exception as e:
+            logging.error(f"Error starting frame recording: {e}")
+            logging.error(traceback.format_exc())
+            self.recorder = None
+
+    def stop_recording(self):
+        """Stop the frame recording if one is running"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            try:
+                recorder.close()
+            except Exception as e:
+                logging.error(f"Error closing frame recording: {e}")
+
+    def export_history(self):
+        """Export the reading and flask history to a timestamped directory"""
+        try:
+            path = self.history.export(self.history_dir, self.history_formats)
+            counts = ", ".join(f"{bar} {len(ring)}" for bar, ring in self.history.readings.items())
+            self.add_message(f"{Fore.CYAN}History exported to {path}")
+            logging.info(f"History exported to {path} - readings: {counts}, events: {len(self.history.events)}")
+            return path
+        except Exception as e:
+            logging.error(f"Error exporting history: {e}")
+            logging.error(traceback.format_exc())
+            self.add_message(f"{Fore.RED}History export failed: {str(e)[:50]}")
+            return None
+
     def add_message(self, message):
         """Add a message to the log"""
         try:
             timestamp = time.strftime("%H:%M:%S")
-            self.messages.append(f"[{timestamp}] {message}")
-            if len(self.messages) > self.max_messages:
-                self.messages.pop(0)  # Remove oldest message
-            print(message)  # Also print to console for immediate feedback
+            self.display_events.publish(EVENT_MESSAGE, f"[{timestamp}] {message}")
+            # Print directly only when the display isn't drawing the message log
+            if not self.headless and (not self.display_active or self.display_paused):
+                print(message)
             
             # Add to log file if it's important
             if "error" in message.lower() or "fail" in message.lower():
@@ -262,12 +963,16 @@ class AutoPotController:
             
             if self.active:
                 self.active = False
+                # Signal the bar pipelines right away so no flask is used after this
+                for pipeline in self.pipelines.values():
+                    pipeline.stop(timeout=0)
+                self.input_dispatcher.clear()
                 self.add_message(f"{Fore.RED}Auto-potion DEACTIVATED")
                 logging.info("Auto-potion deactivated")
                 # FIXED: This line had the error - using monitor_thread
                 if self.monitor_thread and self.monitor_thread.is_alive():
                     logging.info("Stopping monitor thread")
-                    self.monitor_thread = None
+                    self.monitor_stop.set()
             else:
                 self.active = True
                 self.add_message(f"{Fore.GREEN}Auto-potion ACTIVATED")
@@ -276,9 +981,13 @@ class AutoPotController:
                 
                 # Start monitoring in a new thread
                 # FIXED: This line had the error - using monitor_thread
-                if not self.monitor_thread or not self.monitor_thread.is_alive():
+                if not self.monitor_thread or not self.monitor_thread.is_alive() or self.monitor_stop.is_set():
+                    # After a quick off/on the previous loop may still be winding down
+                    if self.monitor_thread and self.monitor_thread.is_alive():
+                        self.monitor_thread.join(RESTART_TIMEOUT)
                     logging.info("Starting monitor thread")
-                    self.monitor_thread = threading.Thread(target=self.monitor_loop)
+                    self.monitor_stop = threading.Event()
+                    self.monitor_thread = threading.Thread(target=self.monitor_loop, args=(self.monitor_stop,))
                     self.monitor_thread.daemon = True
                     self.monitor_thread.start()
                     logging.info("Monitor thread started")
@@ -287,386 +996,488 @@ class AutoPotController:
             logging.error(traceback.format_exc())
             self.add_message(f"{Fore.RED}Error toggling: {str(e)[:50]}")
 
-    def save_debug_image(self, img, name):
-        """Save an image for debugging"""
+    def capture_frames(self, user):
+        """
+        Every region of the grab shared by the pipelines, recording the bars
+        of every new grab while debug recording is on
+        
+        Args:
+            user: Name of the pipeline asking
+        """
+        frames, fresh = self.shared_capture.frames(user)
+        recorder = self.recorder
+        if fresh and recorder is not None:
+            recorder.record({name: frames[name] for name in recorder.names if name in frames})
+        return frames
+
+    def capture_bar(self, name):
+        """One bar's region from the grab shared by the pipelines"""
+        return self.capture_frames(name).get(name)
+
+    def capture_region_batch(self):
+        """Measure the extra regions from the grab shared by the pipelines"""
+        return self.region_batch.read_frames(self.capture_frames("regions"))
+
+    def pipeline_error(self, error):
+        """Report an error from a bar pipeline - the pipeline itself keeps running"""
+        self.add_message(f"{Fore.RED}Monitor error: {str(error)[:50]}")
+
+    def save_debug_image(self, img, name, force=False):
+        """
+        Queue an image (PIL image or RGB array) for debugging
+        
+        Args:
+            img: Image to save
+            name: File name; a timestamp is added so earlier images are kept
+            force: Save even if the frame isn't picked by debug image sampling
+        """
         if self.debug_mode:
             try:
-                if not os.path.exists("debug"):
-                    os.makedirs("debug")
-                img.save(f"debug/{name}")
-                logging.debug(f"Saved debug image: {name}")
+                self.debug_images.submit(name, img, force)
             except Exception as e:
-                logging.error(f"Error saving debug image: {e}")
+                logging.error(f"Error queueing debug image: {e}")
 
-    def check_health_level(self):
-        """Health level detection specially optimized for POE2"""
-        try:
-            # Capture health bar region
-            img = ImageGrab.grab(bbox=self.health_bar_pos)
-            if not img:
-                logging.warning("Failed to capture health bar region")
-                return self.current_health
-                    
-            # Save debug image
-            if self.debug_mode:
-                self.save_debug_image(img, "health_capture.png")
-                    
-            # Convert to numpy array
-            img_array = np.array(img)
-            if img_array.size == 0:
-                logging.warning("Empty health bar image")
-                return self.current_health
-            
-            # POE2-specific detection based on red pixels
-            height, width, _ = img_array.shape
-            
-            # First pass: detect if any red pixels exist (to handle the 0% case)
-            has_red_pixels = False
-            for y in range(height):
-                for x in range(width):
-                    r, g, b = img_array[y, x]
-                    if r > 60 and r > g*1.5 and r > b*1.5:
-                        has_red_pixels = True
-                        break
-                if has_red_pixels:
-                    break
-            
-            if not has_red_pixels:
-                # No red pixels at all - health is likely 0%
-                if self.debug_mode:
-                    self.add_message(f"{Fore.MAGENTA}No health pixels detected - possible 0%")
-                return 0.0
-            
-            # Simple approach: Count red pixels and compare to total size
-            red_pixels = 0
-            total_pixels = height * width
-            
-            # POE2 health is typically red
-            for y in range(height):
-                for x in range(width):
-                    r, g, b = img_array[y, x]
-                    # Less strict red detection - POE2 health can be various shades
-                    if r > 60 and r > max(g, b)*1.3:
-                        red_pixels += 1
-            
-            # Calculate percentage - POE2 health bar may not fill entire capture area
-            health_percent = min(1.0, max(0.0, red_pixels / (total_pixels * 0.8)))
-            
-            # Adjust for POE2's health bar visual characteristics
-            health_percent = health_percent * 1.2  # Scale to account for partially filled capture area
-            health_percent = min(1.0, health_percent)  # Cap at 100%
-            
-            # Apply light smoothing to avoid jitter
-            if abs(health_percent - self.current_health) < 0.4:
-                smoothed_health = 0.7 * health_percent + 0.3 * self.current_health
-            else:
-                # For larger jumps, check if health seems to be very low or very high
-                if health_percent < 0.1 or health_percent > 0.9:
-                    # Give more weight to extreme values as they're likely correct
-                    smoothed_health = 0.85 * health_percent + 0.15 * self.current_health
-                else:
-                    # For mid-range jumps, be more conservative
-                    logging.warning(f"Health jump: {self.current_health:.2f} -> {health_percent:.2f}")
-                    smoothed_health = 0.5 * health_percent + 0.5 * self.current_health
-            
-            health_percent = smoothed_health
+    def measure_bar(self, img_array, color, presence, cache):
+        """
+        Classify a bar strip, reusing the last result for an unchanged frame
+        
+        Args:
+            img_array: RGB array of the bar region
+            color: ColorClassifier for the bar's fill color
+            presence: Stricter ColorClassifier for the "any colored pixel" check
+            cache: MeasurementCache of the bar
             
-            if self.debug_mode:
-                self.add_message(f"{Fore.MAGENTA}Health: {red_pixels}/{total_pixels} = {health_percent:.2f}")
-                logging.debug(f"Health calculation: {red_pixels}/{total_pixels} = {health_percent:.2f}")
-            
-            # Use health potion if needed
-            current_time = time.time()
-            if (health_percent < self.health_threshold and 
-                current_time - self.health_last_used > self.health_cooldown):
-                # Add a small delay to verify reading is stable
-                time.sleep(0.1)
-                verification = self.quick_check_health()
-                if verification < self.health_threshold * 1.2:  # 20% safety margin
-                    self.add_message(f"{Fore.RED}Using health potion at {health_percent:.0%}")
-                    logging.info(f"Using health potion at {health_percent:.0%}")
-                    keyboard.press_and_release(self.health_potion_key)
-                    self.health_last_used = current_time
-            
-            return health_percent
+        Returns:
+            Tuple of (raw level or None if no colored pixels, debug description)
+        """
+        fingerprint = None
+        if self.skip_unchanged_frames:
+            fingerprint = detection.frame_fingerprint(img_array)
+            measurement = cache.get(fingerprint)
+            if measurement is not None:
+                return measurement
         
-        except Exception as e:
-            logging.error(f"Error checking health level: {e}")
-            logging.error(traceback.format_exc())
-            if self.debug_mode:
-                self.add_message(f"{Fore.RED}Health error: {str(e)[:50]}")
-            return self.current_health
+        # Classify every pixel once with the lookup tables
+        index = detection.quantize(img_array, color.bits)
+        
+        # First pass: detect if any colored pixels exist (to handle the 0% case)
+        if not presence.lookup(index).any():
+            measurement = (None, "no colored pixels")
+        else:
+            measurement = self.measure_level(color.lookup(index))
+        
+        if fingerprint is not None:
+            cache.put(fingerprint, measurement)
+        return measurement
 
-    def quick_check_health(self):
-        """Quick verification check for health level - simpler method"""
-        try:
-            img = ImageGrab.grab(bbox=self.health_bar_pos)
-            if not img:
-                return self.current_health
-            
-            img_array = np.array(img)
-            if img_array.size == 0:
-                return self.current_health
+    def measure_level(self, mask):
+        """
+        Raw fill level of a bar strip with the configured detection method
+        
+        Args:
+            mask: Boolean mask of the bar region's colored pixels
             
-            # Very simple check - just count red pixels
-            red_pixels = 0
-            total_pixels = img_array.shape[0] * img_array.shape[1]
+        Returns:
+            Tuple of (level 0.0-1.0, short description for debug output)
+        """
+        height, width = mask.shape[:2]
+        
+        if self.detection_method == "count":
+            # Count colored pixels and compare to total size
+            colored_pixels = int(np.count_nonzero(mask))
+            total_pixels = height * width
             
-            for y in range(img_array.shape[0]):
-                for x in range(img_array.shape[1]):
-                    r, g, b = img_array[y, x]
-                    if r > 60 and r > max(g, b)*1.3:
-                        red_pixels += 1
+            # POE2 bars may not fill the entire capture area
+            level = float(detection.count_fill_level(colored_pixels, total_pixels))
+            return level, f"{colored_pixels}/{total_pixels}"
+        
+        # Find the liquid surface from the per-row fill profile
+        profile = detection.row_profile(mask)
+        level = detection.profile_fill_level(profile)
+        return level, f"{level * height:.1f}/{height} rows"
+
+    def smooth_level(self, measured, previous, label):
+        """
+        Blend a new bar reading with the previous one to avoid jitter
+        
+        Args:
+            measured: Level computed from the current frame (0.0-1.0)
+            previous: Previous smoothed level
+            label: Bar name used in log messages
             
-            return min(1.0, max(0.0, red_pixels / (total_pixels * 0.7)))
+        Returns:
+            Smoothed level
+        """
+        if abs(measured - previous) < 0.4:
+            return 0.7 * measured + 0.3 * previous
+        
+        # For larger jumps, check if the level seems to be very low or very high
+        if measured < 0.1 or measured > 0.9:
+            # Give more weight to extreme values as they're likely correct
+            return 0.85 * measured + 0.15 * previous
+        
+        # For mid-range jumps, be more conservative
+        logging.warning(f"{label} jump: {previous:.2f} -> {measured:.2f}")
+        return 0.5 * measured + 0.5 * previous
+
+    def press_key(self, key, priority=PRIORITY_REGION, window=0.0, now=None):
+        """
+        Queue a potion keypress for the input dispatcher (skipped in dry-run mode)
         
-        except Exception:
-            return self.current_health
+        Args:
+            key: Key to press
+            priority: Dispatch priority - health keys are sent before mana keys
+            window: Cooldown during which repeated requests for the key are coalesced
+            now: Decision time on the controller clock
+        """
+        if not self.dry_run:
+            self.input_dispatcher.submit(key, priority, window, now)
 
-    def check_mana_level(self):
-        """Mana level detection optimized for POE2"""
+    def check_bar_level(self, name, img_array=None):
+        """
+        Measure a health or mana bar and use its potion when it is low
+        
+        Args:
+            name: "health" or "mana"
+            img_array: RGB array of the bar region, usually a view into the
+                grab shared by the pipelines. Captured on demand when not given.
+        
+        Returns:
+            The bar's smoothed level (0.0-1.0)
+        """
+        label = name.capitalize()
+        current = getattr(self, f"current_{name}")
         try:
-            # Capture mana bar region
-            img = ImageGrab.grab(bbox=self.mana_bar_pos)
-            if not img:
-                logging.warning("Failed to capture mana bar region")
-                return self.current_mana
+            # Capture the bar region if the pipeline didn't provide it
+            if img_array is None:
+                img_array = self.capture_planner.capture([name]).get(name)
+            if img_array is None:
+                logging.warning(f"Failed to capture {name} bar region")
+                return current
                     
             # Save debug image
             if self.debug_mode:
-                self.save_debug_image(img, "mana_capture.png")
+                self.save_debug_image(img_array, f"{name}_capture.png")
                     
-            # Convert to numpy array
-            img_array = np.array(img)
             if img_array.size == 0:
-                logging.warning("Empty mana bar image")
-                return self.current_mana
-            
-            # POE2-specific detection based on blue pixels
-            height, width, _ = img_array.shape
-            
-            # First pass: detect if any blue pixels exist (to handle the 0% case)
-            has_blue_pixels = False
-            for y in range(height):
-                for x in range(width):
-                    r, g, b = img_array[y, x]
-                    if b > 60 and b > r*1.5 and b > g*1.5:
-                        has_blue_pixels = True
-                        break
-                if has_blue_pixels:
-                    break
-            
-            if not has_blue_pixels:
-                # No blue pixels at all - mana is likely 0%
+                logging.warning(f"Empty {name} bar image")
+                return current
+            
+            # Health is red and mana blue in POE2 - detection tolerates various shades
+            raw_level, detail = self.measure_bar(
+                img_array,
+                getattr(self, f"{name}_color"),
+                getattr(self, f"{name}_presence"),
+                getattr(self, f"{name}_measurements")
+            )
+            
+            if raw_level is None:
+                # No colored pixels at all - the bar is likely at 0%
                 if self.debug_mode:
-                    self.add_message(f"{Fore.MAGENTA}No mana pixels detected - possible 0%")
+                    self.add_message(f"{Fore.MAGENTA}No {name} pixels detected - possible 0%")
+                self.history.record_reading(name, self.clock(), None, 0.0)
                 return 0.0
             
-            # Simple approach: Count blue pixels and compare to total size
-            blue_pixels = 0
-            total_pixels = height * width
-            
-            # POE2 mana is typically blue
-            for y in range(height):
-                for x in range(width):
-                    r, g, b = img_array[y, x]
-                    # Less strict blue detection - POE2 mana can be various shades
-                    if b > 60 and b > max(r, g)*1.3:
-                        blue_pixels += 1
-            
-            # Calculate percentage - POE2 mana bar may not fill entire capture area
-            mana_percent = min(1.0, max(0.0, blue_pixels / (total_pixels * 0.8)))
-            
-            # Adjust for POE2's mana bar visual characteristics
-            mana_percent = mana_percent * 1.2  # Scale to account for partially filled capture area
-            mana_percent = min(1.0, mana_percent)  # Cap at 100%
-            
             # Apply light smoothing to avoid jitter
-            if abs(mana_percent - self.current_mana) < 0.4:
-                smoothed_mana = 0.7 * mana_percent + 0.3 * self.current_mana
-            else:
-                # For larger jumps, check if mana seems to be very low or very high
-                if mana_percent < 0.1 or mana_percent > 0.9:
-                    # Give more weight to extreme values as they're likely correct
-                    smoothed_mana = 0.85 * mana_percent + 0.15 * self.current_mana
-                else:
-                    # For mid-range jumps, be more conservative
-                    logging.warning(f"Mana jump: {self.current_mana:.2f} -> {mana_percent:.2f}")
-                    smoothed_mana = 0.5 * mana_percent + 0.5 * self.current_mana
-            
-            mana_percent = smoothed_mana
+            level = self.smooth_level(raw_level, current, label)
             
             if self.debug_mode:
-                self.add_message(f"{Fore.MAGENTA}Mana: {blue_pixels}/{total_pixels} = {mana_percent:.2f}")
-                logging.debug(f"Mana calculation: {blue_pixels}/{total_pixels} = {mana_percent:.2f}")
-            
-            # Use mana potion if needed
-            current_time = time.time()
-            if (mana_percent < self.mana_threshold and 
-                current_time - self.mana_last_used > self.mana_cooldown):
-                # Add a small delay to verify reading is stable
-                time.sleep(0.1)
-                verification = self.quick_check_mana()
-                if verification < self.mana_threshold * 1.2:  # 20% safety margin
-                    self.add_message(f"{Fore.BLUE}Using mana potion at {mana_percent:.0%}")
-                    logging.info(f"Using mana potion at {mana_percent:.0%}")
-                    keyboard.press_and_release(self.mana_potion_key)
-                    self.mana_last_used = current_time
-            
-            return mana_percent
+                self.add_message(f"{Fore.MAGENTA}{label}: {detail} = {level:.2f}")
+                logging.debug(f"{label} calculation: {detail} = {level:.2f}")
+            
+            # Use the potion once enough recent readings confirm the bar is low
+            current_time = self.clock()
+            settings = self.settings
+            threshold = getattr(settings, f"{name}_threshold")
+            cooldown = getattr(settings, f"{name}_cooldown")
+            confirmation = getattr(self, f"{name}_confirmation")
+            low = level < threshold
+            predicted, predicted_trigger = self.predict_low(
+                name, getattr(self, f"{name}_predictor"), raw_level, threshold, low, current_time
+            )
+            confirmed = confirmation.update(low) or predicted_trigger
+            used = confirmed and current_time - getattr(self, f"{name}_last_used") > cooldown
+            if used:
+                reason = " (predicted)" if predicted_trigger and not low else ""
+                self.add_message(f"{BAR_COLORS[name]}Using {name} potion at {level:.0%}{reason}")
+                logging.info(f"Using {name} potion at {level:.0%}{reason}")
+                self.press_key(getattr(settings, f"{name}_potion_key"), BAR_PRIORITIES[name], cooldown, current_time)
+                setattr(self, f"{name}_last_used", current_time)
+                confirmation.reset()
+                self.history.record_event(name, current_time, level)
+                if self.debug_mode:
+                    self.debug_images.trigger(f"{name}_capture.png")
+            
+            self.history.record_reading(
+                name, current_time, raw_level, level, decision_flags(low, confirmed, used, predicted)
+            )
+            return level
         
         except Exception as e:
-            logging.error(f"Error checking mana level: {e}")
+            logging.error(f"Error checking {name} level: {e}")
             logging.error(traceback.format_exc())
             if self.debug_mode:
-                self.add_message(f"{Fore.RED}Mana error: {str(e)[:50]}")
-            return self.current_mana
+                self.add_message(f"{Fore.RED}{label} error: {str(e)[:50]}")
+            return current
 
-    def quick_check_mana(self):
-        """Quick verification check for mana level - simpler method"""
-        try:
-            img = ImageGrab.grab(bbox=self.mana_bar_pos)
-            if not img:
-                return self.current_mana
-            
-            img_array = np.array(img)
-            if img_array.size == 0:
-                return self.current_mana
-            
-            # Very simple check - just count blue pixels
-            blue_pixels = 0
-            total_pixels = img_array.shape[0] * img_array.shape[1]
-            
-            for y in range(img_array.shape[0]):
-                for x in range(img_array.shape[1]):
-                    r, g, b = img_array[y, x]
-                    if b > 60 and b > max(r, g)*1.3:
-                        blue_pixels += 1
+    def check_regions(self, reading):
+        """
+        Decide and act on every extra region from one batched reading
+        
+        Args:
+            reading: (levels, present) arrays from RegionBatch.read_frames(), None if
+                the capture failed
             
-            return min(1.0, max(0.0, blue_pixels / (total_pixels * 0.7)))
+        Returns:
+            Smallest distance of any region from its trigger, which drives
+            the regions' polling schedule
+        """
+        if reading is None:
+            return min(region.margin(region.level) for region in self.regions)
         
-        except Exception:
-            return self.current_mana
-    def display_loop(self):
-        """More compact and efficient display with HP and MP on separate lines"""
-        last_display = ""
-        last_display_time = 0
-        display_refresh_rate = 0.5  # Update display twice per second
+        levels, present = reading
+        current_time = self.clock()
+        margin = 1.0
+        for region, raw, seen in zip(self.regions, levels.tolist(), present.tolist()):
+            # No colored pixels at all reads as empty, as for health and mana
+            level = self.smooth_level(raw, region.level, region.name) if seen else 0.0
+            if int(level * 100) != int(region.level * 100):
+                self.display_events.publish(EVENT_LEVEL, (REGION_PREFIX + region.name, level))
+            region.level = level
+            confirmed = region.confirmation.update(region.is_triggered(level))
+            if confirmed and region.key and current_time - region.last_used > region.cooldown:
+                self.add_message(f"{Fore.MAGENTA}Using {region.name} at {level:.0%}")
+                logging.info(f"Using {region.name} ({region.key}) at {level:.0%}")
+                self.press_key(region.key, PRIORITY_REGION, region.cooldown, current_time)
+                region.last_used = current_time
+                region.confirmation.reset()
+            margin = min(margin, region.margin(level))
+        return margin
+
+    def update_level(self, name, level):
+        """Store a bar's new level, telling the display when its shown percentage changes"""
+        attribute = f"current_{name}"
+        if int(getattr(self, attribute) * 100) != int(level * 100):
+            self.display_events.publish(EVENT_LEVEL, (name, level))
+        setattr(self, attribute, level)
+
+    def apply_display_events(self, events):
+        """Update the displayed levels and messages from channel events (display thread only)"""
+        for kind, payload in events:
+            if kind == EVENT_LEVEL:
+                name, level = payload
+                self.display_levels[name] = level
+            elif kind == EVENT_MESSAGE:
+                self.display_messages.append(payload)
+
+    def display_refresh_interval(self, current_time):
+        """
+        Seconds until the display has to redraw even without a new event
+        
+        Returns:
+            The countdown tick while a flask cooldown runs or debug statistics
+            are shown, None when only events change the display
+        """
+        settings = self.settings
+        counting = (current_time - self.health_last_used < settings.health_cooldown
+                    or current_time - self.mana_last_used < settings.mana_cooldown)
+        if counting or self.debug_mode:
+            return max(self.renderer.frame_interval, DISPLAY_TICK)
+        return None
+
+    def display_lines(self, current_time):
+        """Build the status display as a list of lines"""
+        lines = ["", f"{Fore.CYAN}{'=' * 50}"]
+        
+        # Status with color - more compact format
+        status = "ACTIVE" if self.active else "INACTIVE"
+        status_color = Fore.GREEN if self.active else Fore.RED
+        lines.append(f"{Fore.CYAN}POE2 AUTO-POTION: {status_color}{status}{Style.RESET_ALL}")
+        
+        # Health bar on its own line
+        health_level = self.display_levels["health"]
+        mana_level = self.display_levels["mana"]
+        health_percent = int(health_level * 100)
+        health_color = Fore.GREEN
+        if health_percent < 30:
+            health_color = Fore.RED
+        elif health_percent < 70:
+            health_color = Fore.YELLOW
+        lines.append(f"HP: {self.bar_templates.bar(health_level, health_color)} {health_percent}%")
+        
+        # Mana bar on its own line
+        mana_percent = int(mana_level * 100)
+        lines.append(f"MP: {self.bar_templates.bar(mana_level, Fore.BLUE)} {mana_percent}%")
+        
+        # Extra regions on one line
+        if self.regions:
+            lines.append("Regions: " + " | ".join(
+                f"{region.name} {self.display_levels.get(REGION_PREFIX + region.name, 1.0):.0%}"
+                for region in self.regions
+            ))
+        
+        # Cooldowns on one line
+        health_cooldown = max(0, self.health_cooldown - (current_time - self.health_last_used))
+        mana_cooldown = max(0, self.mana_cooldown - (current_time - self.mana_last_used))
+        lines.append(f"Cooldowns - HP: {health_cooldown:.1f}s | MP: {mana_cooldown:.1f}s")
         
+        # Compact monitoring regions and sampling rates
+        if self.debug_mode:
+            lines.append(f"Profile: {self.profile_key}")
+            lines.append(f"HP Region: {self.health_bar_pos} | MP Region: {self.mana_bar_pos}")
+            lines.append(f"Sample rate - HP: {self.health_scheduler.sample_rate():.1f}/s | "
+                         f"MP: {self.mana_scheduler.sample_rate():.1f}/s")
+            lines.append(f"Unchanged frames - HP: {self.health_measurements.hit_rate():.0%} | "
+                         f"MP: {self.mana_measurements.hit_rate():.0%}")
+            log_stats = log_listener.stats()
+            lines.append(f"Log queue: {log_stats['queued']} queued | {log_stats['dropped']} dropped")
+            input_stats = self.input_dispatcher.stats()
+            if input_stats["p95_ms"] is not None:
+                lines.append(f"Keys: {input_stats['sent']} sent | {input_stats['coalesced']} coalesced | "
+                             f"latency p95 {input_stats['p95_ms']:.1f}ms")
+            event_stats = self.display_events.stats()
+            if event_stats["lag_p95_ms"] is not None:
+                lines.append(f"Display events: lag p50 {event_stats['lag_p50_ms']:.1f}ms "
+                             f"p95 {event_stats['lag_p95_ms']:.1f}ms | {event_stats['dropped']} dropped")
+            image_stats = self.debug_images.stats()
+            lines.append(f"Debug images ({self.debug_images.mode}): {image_stats['written']} written | "
+                         f"{image_stats['dropped']} dropped")
+        
+        # Log file information
+        lines.append(f"Log: {os.path.basename(self.log_filename)}")
+        
+        # Message log with minimal decoration
+        lines.append(f"{Fore.CYAN}{'=' * 50}")
+        lines.extend(self.display_messages)
+        
+        # Controls in compact form
+        lines.append(f"{Fore.CYAN}{'=' * 50}")
+        lines.append(f"{self.toggle_key.upper()}: Toggle | C: Calibrate (Shift: auto) | D: Debug | H: History | Ctrl+C: Exit")
+        return lines
+
+    def display_loop(self):
+        """
+        Redraws the status display when display events arrive, capped at the
+        configured frame rate
+        """
         try:
+            refresh = None
+            last_frame = 0.0
             while self.display_active:
                 try:
-                    current_time = time.time()
-                    
-                    # Only update display at refresh rate
-                    if current_time - last_display_time < display_refresh_rate:
-                        time.sleep(0.1)
-                        continue
-                        
-                    last_display_time = current_time
-                    
-                    # Create a compact but informative display
-                    display = "\n"
-                    display += f"{Fore.CYAN}{'=' * 50}\n"
-                    
-                    # Status with color - more compact format
-                    status = "ACTIVE" if self.active else "INACTIVE"
-                    status_color = Fore.GREEN if self.active else Fore.RED
-                    display += f"{Fore.CYAN}POE2 AUTO-POTION: {status_color}{status}{Style.RESET_ALL}\n"
-                    
-                    # Health bar on its own line
-                    health_percent = int(self.current_health * 100)
-                    health_color = Fore.GREEN
-                    if health_percent < 30:
-                        health_color = Fore.RED
-                    elif health_percent < 70:
-                        health_color = Fore.YELLOW
-                    
-                    # More compact bar display
-                    bar_width = 25  # Slightly longer bars for separate lines
-                    health_filled = int(bar_width * self.current_health)
-                    health_bar = f"{health_color}{'#' * health_filled}{'-' * (bar_width - health_filled)}{Style.RESET_ALL}"
-                    display += f"HP: {health_bar} {health_percent}%\n"
-                    
-                    # Mana bar on its own line
-                    mana_percent = int(self.current_mana * 100)
-                    mana_filled = int(bar_width * self.current_mana)
-                    mana_bar = f"{Fore.BLUE}{'#' * mana_filled}{'-' * (bar_width - mana_filled)}{Style.RESET_ALL}"
-                    display += f"MP: {mana_bar} {mana_percent}%\n"
-                    
-                    # Cooldowns on one line
-                    health_cooldown = max(0, self.health_cooldown - (current_time - self.health_last_used))
-                    mana_cooldown = max(0, self.mana_cooldown - (current_time - self.mana_last_used))
-                    
-                    display += f"Cooldowns - HP: {health_cooldown:.1f}s | MP: {mana_cooldown:.1f}s\n"
-                    
-                    # Compact monitoring regions
-                    if self.debug_mode:
-                        display += f"HP Region: {self.health_bar_pos} | MP Region: {self.mana_bar_pos}\n"
-                    
-                    # Log file information
-                    display += f"Log: {os.path.basename(self.log_filename)}\n"
-                    
-                    # Message log with minimal decoration
-                    display += f"{Fore.CYAN}{'=' * 50}\n"
+                    self.display_events.wait(refresh)
+                    # Cap the frame rate - events published meanwhile go into this frame
+                    delay = last_frame + self.renderer.frame_interval - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self.apply_display_events(self.display_events.drain())
                     
-                    for msg in self.messages:
-                        display += msg + "\n"
-                        
-                    # Controls in compact form
-                    display += f"{Fore.CYAN}{'=' * 50}\n"
-                    display += f"{self.toggle_key.upper()}: Toggle | C: Calibrate | D: Debug | Ctrl+C: Exit\n"
-                    
-                    # Only update if display has changed
-                    if display != last_display:
-                        # Clear console and show new display
-                        if os.name == 'nt':  # Windows
-                            os.system('cls')
-                        else:  # Unix/Linux/MacOS
-                            os.system('clear')
-                        
-                        print(display, end='')
-                        last_display = display
-                    
-                    time.sleep(0.1)
+                    current_time = time.time()
+                    # Calibration owns the console while it runs
+                    if not self.display_paused:
+                        self.renderer.render(self.display_lines(current_time))
+                        last_frame = time.monotonic()
+                    refresh = self.display_refresh_interval(current_time)
                 except Exception as e:
                     logging.error(f"Error updating display: {e}")
                     logging.error(traceback.format_exc())
                     time.sleep(1)  # Wait a bit before trying again
-                
+            
+            stats = self.renderer.stats()
+            event_stats = self.display_events.stats()
+            logging.info(
+                f"Display stopped - {stats['frames']} frames, {stats['lines']} lines, "
+                f"{stats['bytes']} bytes, {stats['seconds'] * 1000:.1f}ms rendering, "
+                f"{event_stats['consumed']} events in {event_stats['wakeups']} wakeups"
+            )
         except Exception as e:
             logging.error(f"Fatal error in display loop: {e}")
             logging.error(traceback.format_exc())
+        finally:
+            # The console is free again
+            set_console_logging(True)
             
-    def monitor_loop(self):
-        """Main monitoring loop with error logging"""
+    def monitor_loop(self, stop=None):
+        """
+        Supervises the per-bar monitoring pipelines with error logging
+        
+        Args:
+            stop: Stop event of this loop, the current one if not given
+        """
+        if stop is None:
+            stop = self.monitor_stop
+        pipelines = list(self.pipelines.values())
         try:
             self.add_message(f"{Fore.GREEN}Monitoring started...")
             logging.info("Monitoring loop started")
             
             last_status_time = 0
             status_update_interval = 5.0  # Update status every 5 seconds
+            last_dropped_logs = log_listener.queue.dropped
+            last_display_check = time.time()
+            
+            for pipeline in pipelines:
+                pipeline.start()
             
-            while self.active:
+            while self.active and not stop.is_set():
                 try:
                     current_time = time.time()
                     
-                    # Check health and use potion if needed
-                    health_percent = self.check_health_level()
-                    self.current_health = health_percent
+                    # Restart any pipeline whose thread died - other bars keep running
+                    for pipeline in pipelines:
+                        if not pipeline.is_alive():
+                            logging.warning(f"{pipeline.name} pipeline stopped unexpectedly - restarting")
+                            pipeline.start()
                     
-                    # Check mana and use potion if needed
-                    mana_percent = self.check_mana_level()
-                    self.current_mana = mana_percent
+                    # Follow resolution / UI scale changes without stopping the pipelines
+                    if current_time - last_display_check > self.display_check_interval:
+                        self.check_display()
+                        last_display_check = current_time
                     
                     # Update status periodically
                     if current_time - last_status_time > status_update_interval and not self.debug_mode:
                         # Only update status message occasionally to avoid spam
-                        self.add_message(f"HP: {health_percent:.0%} MP: {mana_percent:.0%}")
+                        self.add_message(f"HP: {self.current_health:.0%} MP: {self.current_mana:.0%}")
+                        for name, cache in (("health", self.health_measurements), ("mana", self.mana_measurements)):
+                            logging.info(
+                                f"{name} unchanged frames: {cache.hits} reused / {cache.misses} classified "
+                                f"({cache.hit_rate():.0%})"
+                            )
+                        for pipeline in pipelines:
+                            stats = pipeline.latency_stats()
+                            if stats:
+                                logging.info(
+                                    f"{pipeline.name} pipeline - {pipeline.scheduler.sample_rate():.1f} samples/s, "
+                                    f"latency p50 {stats['p50_ms']:.1f}ms p95 {stats['p95_ms']:.1f}ms, "
+                                    f"{pipeline.errors} errors"
+                                )
+                        if self.prediction_mode != PREDICT_OFF:
+                            for name, predictor in (("health", self.health_predictor), ("mana", self.mana_predictor)):
+                                logging.info(f"{name} prediction ({self.prediction_mode}) - "
+                                             f"{self.format_prediction_stats(predictor.stats())}")
+                        input_stats = self.input_dispatcher.stats()
+                        if input_stats["p95_ms"] is not None:
+                            logging.info(
+                                f"input dispatch - {input_stats['sent']} sent, {input_stats['coalesced']} coalesced, "
+                                f"{input_stats['errors']} errors, latency p50 {input_stats['p50_ms']:.1f}ms "
+                                f"p95 {input_stats['p95_ms']:.1f}ms"
+                            )
+                        event_stats = self.display_events.stats()
+                        if self.display_active and event_stats["lag_p95_ms"] is not None:
+                            logging.info(
+                                f"display events - lag p50 {event_stats['lag_p50_ms']:.1f}ms "
+                                f"p95 {event_stats['lag_p95_ms']:.1f}ms, {event_stats['dropped']} dropped"
+                            )
+                        log_stats = log_listener.stats()
+                        if log_stats["dropped"] > last_dropped_logs:
+                            logging.warning(
+                                f"Log queue full - {log_stats['dropped'] - last_dropped_logs} records dropped "
+                                f"({log_stats['dropped']} total)"
+                            )
+                            last_dropped_logs = log_stats["dropped"]
                         last_status_time = current_time
                     
-                    # Sleep between checks
-                    time.sleep(0.2)
+                    stop.wait(0.25)
                 except Exception as e:
                     logging.error(f"Error in monitoring cycle: {e}")
                     logging.error(traceback.format_exc())
@@ -679,6 +1490,11 @@ class AutoPotController:
             logging.error(traceback.format_exc())
             self.active = False
             self.add_message(f"{Fore.RED}Fatal monitor error: {str(e)[:50]}")
+        finally:
+            # After a quick off/on the pipelines belong to the next loop already
+            if stop is self.monitor_stop:
+                for pipeline in pipelines:
+                    pipeline.stop()
 
     def start_calibration(self):
         """Start the calibration process with error logging"""
@@ -690,11 +1506,10 @@ class AutoPotController:
             
             logging.info("Starting calibration process")
             
-            # Clear terminal to make sure directions are visible
-            if os.name == 'nt':  # Windows
-                os.system('cls')
-            else:  # Unix/Linux/MacOS
-                os.system('clear')
+            # Pause the display and clear terminal to make sure directions are visible
+            self.display_paused = True
+            set_console_logging(True)
+            clear_console()
             
             print(f"{Fore.YELLOW}{'=' * 50}")
             print(f"{Fore.YELLOW}POE2 CALIBRATION STARTED")
@@ -710,12 +1525,14 @@ class AutoPotController:
             self.config = self.load_config()
             
             # Update positions
-            self.health_bar_pos = self.parse_position(
-                self.config.get("ScreenPositions", "health_bar")
-            )
-            self.mana_bar_pos = self.parse_position(
-                self.config.get("ScreenPositions", "mana_bar")
-            )
+            self.profiles = ProfileStore(self.config)
+            self.health_bar_pos, self.mana_bar_pos = self.profile_positions()
+            self.capture_planner.set_regions(self.capture_regions())
+            
+            # Region shapes changed - start a new recording for them
+            if self.recorder is not None:
+                self.stop_recording()
+                self.start_recording()
             
             logging.info(f"Calibration complete. New positions - Health: {self.health_bar_pos}, Mana: {self.mana_bar_pos}")
             self.add_message(f"{Fore.GREEN}Calibration complete!")
@@ -730,6 +1547,106 @@ class AutoPotController:
             
             # Make sure we restore hotkeys
             self.setup_hotkeys()
+        finally:
+            # Hand the console back to the display with a full redraw
+            self.renderer.invalidate()
+            set_console_logging(not self.display_active)
+            self.display_paused = False
+            self.display_events.publish(EVENT_REDRAW)
+
+    def save_bar_positions(self, health_bar_pos, mana_bar_pos):
+        """
+        Store calibrated bar regions in the config file and start using them
+        
+        Args:
+            health_bar_pos, mana_bar_pos: (x1, y1, x2, y2) screen pixel regions
+        """
+        # Convert to normalized coordinates - these are also the defaults for
+        # display setups without a profile of their own
+        self.config['ScreenPositions']['health_bar'] = to_normalized(health_bar_pos, self.screen_width, self.screen_height)
+        self.config['ScreenPositions']['mana_bar'] = to_normalized(mana_bar_pos, self.screen_width, self.screen_height)
+        self.profiles.save(self.profile_key, {"health": health_bar_pos, "mana": mana_bar_pos})
+        self.save_config()
+        logging.info(f"Calibration configuration saved (profile {self.profile_key})")
+        
+        # Update the positions in the current instance
+        self.health_bar_pos = health_bar_pos
+        self.mana_bar_pos = mana_bar_pos
+        self.capture_planner.set_regions(self.capture_regions())
+
+    def auto_calibrate(self):
+        """
+        Locate both orbs from a single full-screen grab, without user input
+        
+        An orb located with a confidence below MIN_LOCATE_CONFIDENCE keeps
+        its current position.
+        
+        Returns:
+            Dict of "health"/"mana" -> autolocate result, or None if an orb
+            wasn't found or neither was located reliably
+        """
+        was_active = self.active
+        try:
+            if was_active:
+                self.toggle()  # Turn off while the regions change
+            
+            start = time.perf_counter()
+            frame = self.frame_source.grab((0, 0, self.screen_width, self.screen_height))
+            if frame is None:
+                self.add_message(f"{Fore.RED}Auto-calibration failed: could not capture the screen")
+                return None
+            
+            found = autolocate.locate_orbs(frame, {
+                "health": detection.get_classifier("health_calibration"),
+                "mana": detection.get_classifier("mana_calibration"),
+            })
+            elapsed = (time.perf_counter() - start) * 1000
+            
+            missing = [name for name, orb in found.items() if orb is None]
+            if missing:
+                logging.warning(f"Auto-calibration could not find the {' and '.join(missing)} orb ({elapsed:.0f}ms)")
+                self.add_message(f"{Fore.RED}Auto-calibration failed: no {' or '.join(missing)} orb found")
+                return None
+            
+            # An unreliable orb keeps its current position
+            positions = {"health": self.health_bar_pos, "mana": self.mana_bar_pos}
+            unreliable = []
+            for name, orb in found.items():
+                logging.info(
+                    f"Auto-located {name} orb: strip {orb['region']}, diameter {orb['diameter']}px, "
+                    f"fill {orb['fill']:.0%}, confidence {orb['confidence']:.2f}"
+                )
+                if orb["confidence"] < detection.MIN_LOCATE_CONFIDENCE:
+                    unreliable.append(name)
+                    self.add_message(f"{Fore.YELLOW}Auto-located {name} orb is unreliable "
+                                     f"(confidence {orb['confidence']:.0%}) - keeping its current position")
+                else:
+                    positions[name] = orb["region"]
+
+            if len(unreliable) == len(found):
+                logging.warning(f"Auto-calibration kept the current positions: no reliable orb ({elapsed:.0f}ms)")
+                self.add_message(f"{Fore.RED}Auto-calibration failed: no reliable orb found")
+                return None
+
+            self.save_bar_positions(positions["health"], positions["mana"])
+            
+            # Region shapes changed - start a new recording for them
+            if self.recorder is not None:
+                self.stop_recording()
+                self.start_recording()
+            
+            logging.info(f"Auto-calibration complete in {elapsed:.0f}ms")
+            self.add_message(f"{Fore.GREEN}Auto-calibration complete ({elapsed:.0f}ms)")
+            return found
+        except Exception as e:
+            logging.error(f"Error in auto-calibration: {e}")
+            logging.error(traceback.format_exc())
+            self.add_message(f"{Fore.RED}Auto-calibration error: {str(e)[:50]}")
+            return None
+        finally:
+            # Restore monitoring if it was active
+            if was_active and not self.active:
+                self.toggle()
 
     def run_calibration(self):
         """Enhanced calibration that precisely identifies the bar positions"""
@@ -897,52 +1814,29 @@ class AutoPotController:
             
             # Save configuration
             try:
-                # Convert to normalized coordinates
-                norm_health = (
-                    health_bar_pos[0]/self.screen_width,
-                    health_bar_pos[1]/self.screen_height,
-                    health_bar_pos[2]/self.screen_width,
-                    health_bar_pos[3]/self.screen_height
-                )
-                
-                norm_mana = (
-                    mana_bar_pos[0]/self.screen_width,
-                    mana_bar_pos[1]/self.screen_height,
-                    mana_bar_pos[2]/self.screen_width,
-                    mana_bar_pos[3]/self.screen_height
-                )
-                
-                self.config['ScreenPositions']['health_bar'] = f"{norm_health[0]:.4f},{norm_health[1]:.4f},{norm_health[2]:.4f},{norm_health[3]:.4f}"
-                self.config['ScreenPositions']['mana_bar'] = f"{norm_mana[0]:.4f},{norm_mana[1]:.4f},{norm_mana[2]:.4f},{norm_mana[3]:.4f}"
-                
-                with open('poe2_autopot_config.ini', 'w') as f:
-                    self.config.write(f)
-                    
+                self.save_bar_positions(health_bar_pos, mana_bar_pos)
                 print(f"\n{Fore.GREEN}Configuration saved successfully!")
-                logging.info("Calibration configuration saved")
-                
-                # Update the positions in the current instance
-                self.health_bar_pos = health_bar_pos
-                self.mana_bar_pos = mana_bar_pos
                 
                 # Test calibration
                 print(f"\n{Fore.CYAN}Testing calibration...")
                 
+                frames = self.capture_planner.capture()
+                
                 # Test health level
-                health_img = ImageGrab.grab(bbox=self.health_bar_pos)
-                if health_img:
+                health_img = frames.get("health")
+                if health_img is not None:
                     if self.debug_mode:
-                        self.save_debug_image(health_img, "health_calibration.png")
-                    health_percent = self.check_health_level()
+                        self.save_debug_image(health_img, "health_calibration.png", force=True)
+                    health_percent = self.check_bar_level("health", health_img)
                     print(f"{Fore.RED}Health level: {health_percent:.0%}")
                     logging.info(f"Calibration test - Health level: {health_percent:.0%}")
                 
                 # Test mana level
-                mana_img = ImageGrab.grab(bbox=self.mana_bar_pos)
-                if mana_img:
+                mana_img = frames.get("mana")
+                if mana_img is not None:
                     if self.debug_mode:
-                        self.save_debug_image(mana_img, "mana_calibration.png")
-                    mana_percent = self.check_mana_level()
+                        self.save_debug_image(mana_img, "mana_calibration.png", force=True)
+                    mana_percent = self.check_bar_level("mana", mana_img)
                     print(f"{Fore.BLUE}Mana level: {mana_percent:.0%}")
                     logging.info(f"Calibration test - Mana level: {mana_percent:.0%}")
                 
@@ -1002,90 +1896,46 @@ class AutoPotController:
             
             # Capture a larger area to analyze
             scan_area = (scan_x_min, scan_y_min, scan_x_max, scan_y_max)
-            img = ImageGrab.grab(bbox=scan_area)
+            img_array = self.frame_source.grab(scan_area)
             
-            if not img:
+            if img_array is None:
                 logging.warning(f"Failed to capture {bar_type} bar scan area")
                 return None
                 
             # Save debug image
             if self.debug_mode:
-                self.save_debug_image(img, f"{bar_type}_scan_area.png")
+                self.save_debug_image(img_array, f"{bar_type}_scan_area.png", force=True)
                 
-            # Convert to numpy array
-            img_array = np.array(img)
             if img_array.size == 0:
                 logging.warning(f"Empty {bar_type} bar image")
                 return None
                 
-            # Define color thresholds based on bar type
-            if bar_type == "health":
-                # For health (red)
-                def is_target_color(r, g, b):
-                    return r > 50 and r > max(g, b) * 1.5
-            else:
-                # For mana (blue)
-                def is_target_color(r, g, b):
-                    return b > 50 and b > max(r, g) * 1.5
+            # Classify the scan area with the bar's calibration color table
+            # (red for health, blue for mana)
+            is_target = detection.get_classifier(f"{bar_type}_calibration").mask(img_array)
                     
-            # Find the exact center of the bar (x-coordinate)
-            color_counts_by_x = {}
-            for x in range(img_array.shape[1]):
-                count = 0
-                for y in range(img_array.shape[0]):
-                    r, g, b = img_array[y, x]
-                    if is_target_color(r, g, b):
-                        count += 1
-                color_counts_by_x[x] = count
-                
-            # Find the x with maximum color count
-            if not color_counts_by_x:
-                logging.warning(f"No {bar_type} color found in scan area")
-                return None
-                
-            max_count_x = max(color_counts_by_x.items(), key=lambda x: x[1])
-            if max_count_x[1] == 0:
+            # Locate the bar from column histograms and its edges in a band around the center
+            location = detection.locate_bar(is_target, expected_rows=max(1, y_max - y_min))
+            if location is None:
                 logging.warning(f"No {bar_type} color found in scan area")
                 return None
                 
-            refined_center_x = scan_x_min + max_count_x[0]
-            logging.info(f"Refined {bar_type} bar center X: {refined_center_x}")
-            
-            # Find the exact top and bottom of the bar (y-coordinates)
-            # Start by scanning from the center x position
-            y_scan_width = 2  # Check a small x range around the center
-            y_scan_min = max(0, refined_center_x - y_scan_width)
-            y_scan_max = min(img_array.shape[1] - 1, refined_center_x + y_scan_width)
-            
-            # Find top edge
-            refined_top = None
-            for y in range(img_array.shape[0]):
-                for x_offset in range(y_scan_min, y_scan_max + 1):
-                    x = min(max(0, x_offset), img_array.shape[1] - 1)
-                    r, g, b = img_array[y, x]
-                    if is_target_color(r, g, b):
-                        refined_top = scan_y_min + y
-                        break
-                if refined_top is not None:
-                    break
-                    
-            # Find bottom edge
-            refined_bottom = None
-            for y in range(img_array.shape[0] - 1, -1, -1):
-                for x_offset in range(y_scan_min, y_scan_max + 1):
-                    x = min(max(0, x_offset), img_array.shape[1] - 1)
-                    r, g, b = img_array[y, x]
-                    if is_target_color(r, g, b):
-                        refined_bottom = scan_y_min + y
-                        break
-                if refined_bottom is not None:
-                    break
-                    
-            if refined_top is None or refined_bottom is None:
-                logging.warning(f"Could not find {bar_type} bar edges")
-                return None
-                
-            logging.info(f"Refined {bar_type} bar Y range: {refined_top} to {refined_bottom}")
+            refined_center_x = scan_x_min + location["column"]
+            refined_top = scan_y_min + location["top"]
+            refined_bottom = scan_y_min + location["bottom"]
+            confidence = location["confidence"]
+            logging.info(
+                f"Refined {bar_type} bar center X: {scan_x_min + location['center']:.2f}, "
+                f"Y edges: {scan_y_min + location['top_edge']:.2f} to {scan_y_min + location['bottom_edge']:.2f}, "
+                f"confidence {confidence:.2f}"
+            )
+            
+            if confidence < detection.MIN_LOCATE_CONFIDENCE:
+                print(f"{Fore.YELLOW}Detected {bar_type} bar is unreliable (confidence {confidence:.0%}) - "
+                      f"make sure the bar is full and unobstructed, or recalibrate")
+                logging.warning(f"Unreliable {bar_type} bar detection (confidence {confidence:.2f})")
+            else:
+                print(f"{Fore.GREEN}Detected {bar_type} bar (confidence {confidence:.0%})")
             
             # Create a narrow strip centered on the detected bar
             strip_width = 5
@@ -1103,28 +1953,65 @@ class AutoPotController:
             logging.error(traceback.format_exc())
             return None
 
+def control_address(address=None):
+    """Control API address - the given one, else [Control] address from the config file"""
+    if address:
+        return address
+    config = configparser.ConfigParser()
+    config.read(CONFIG_PATH)
+    return config.get("Control", "address", fallback="").strip() or default_address()
+
+
 def main():
     """
     Main function with error logging
     """
+    parser = argparse.ArgumentParser(description="PoE2 auto-flask utility")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run without console display or hotkeys, controlled through the control API")
+    parser.add_argument("--control", metavar="ADDRESS",
+                        help="Control API socket path or pipe name (default: [Control] address)")
+    parser.add_argument("--command", choices=COMMANDS,
+                        help="Send a command to a running headless instance, print the reply and exit")
+    args = parser.parse_args()
+    
+    if args.command:
+        try:
+            reply = send_command(control_address(args.control), args.command)
+        except OSError as e:
+            print(json.dumps({"ok": False, "error": f"no instance listening: {e}"}))
+            sys.exit(1)
+        print(json.dumps(reply, separators=(",", ":")))
+        sys.exit(0 if reply.get("ok") else 1)
+    
+    controller = None
     try:
-        # Clear terminal
-        if os.name == 'nt':  # Windows
-            os.system('cls')
-        else:  # Unix/Linux/MacOS
-            os.system('clear')
-        
-        print(f"{Fore.CYAN}{'=' * 50}")
-        print(f"{Fore.CYAN}POE2 AUTO-POTION UTILITY")
-        print(f"{Fore.CYAN}{'=' * 50}\n")
+        if not args.headless:
+            # Clear terminal
+            if os.name == 'nt':  # Windows
+                os.system('cls')
+            else:  # Unix/Linux/MacOS
+                os.system('clear')
+            
+            print(f"{Fore.CYAN}{'=' * 50}")
+            print(f"{Fore.CYAN}POE2 AUTO-POTION UTILITY")
+            print(f"{Fore.CYAN}{'=' * 50}\n")
         
         # Create the controller
-        controller = AutoPotController()
+        controller = AutoPotController(headless=args.headless)
+        if args.headless:
+            controller.start_control(control_address(args.control))
+        elif not controller.display_active:
+            # The status display shows the controls itself
+            print(f"{Fore.YELLOW}Press Ctrl+C to exit")
         
-        # Keep the program running
-        print(f"{Fore.YELLOW}Press Ctrl+C to exit")
-        while True:
-            time.sleep(0.5)
+        # Wait for Ctrl+C, SIGTERM or a shutdown command, waking once a second
+        # to pick up config edits (and for Ctrl+C, which can't interrupt a
+        # blocking wait on Windows)
+        signal.signal(signal.SIGTERM, lambda signum, frame: controller.shutdown_event.set())
+        while not controller.shutdown_event.wait(controller.config_watcher.interval):
+            controller.check_config()
+        logging.info("Shutdown requested")
     except KeyboardInterrupt:
         logging.info("Program terminated by user (Ctrl+C)")
         print(f"\n{Fore.YELLOW}Exiting...")
@@ -1133,7 +2020,19 @@ def main():
         logging.error(traceback.format_exc())
         print(f"\n{Fore.RED}Error: {e}")
         traceback.print_exc()
-        input(f"{Fore.YELLOW}Press Enter to exit...{Style.RESET_ALL}")
+        # A headless instance has nobody at the console to press Enter
+        if not args.headless:
+            input(f"{Fore.YELLOW}Press Enter to exit...{Style.RESET_ALL}")
+    finally:
+        if controller is not None:
+            if controller.export_history_on_exit:
+                controller.export_history()
+            if controller.control_server is not None:
+                controller.control_server.close()
+            # Flush a recording that is still running
+            controller.stop_recording()
+            controller.debug_images.close()
+            controller.input_dispatcher.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
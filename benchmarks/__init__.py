@@ -0,0 +1 @@
+"""Performance benchmarks for PoE2-AutoFlask. Run from the repository root."""
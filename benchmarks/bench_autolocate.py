@@ -0,0 +1,77 @@
+"""
+Automatic orb location benchmark.
+
+Runs autolocate.locate_orbs on synthetic full-screen fixtures (both orbs
+plus orb-colored UI elements, with pixel noise) at every resolution and
+several fill levels, and reports the time taken and how far the detected
+monitoring strips are from the true orb geometry.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_autolocate
+    python -m benchmarks.bench_autolocate --resolution 4k --noise 10
+"""
+import argparse
+import sys
+import time
+
+import autolocate
+import detection
+import synthetic
+
+FILL_CASES = ((1.0, 1.0), (0.5, 0.3), (0.2, 0.8), (0.1, 0.15))
+# A strip counts as correct within this fraction of the orb diameter
+MAX_ERROR = 0.05
+
+
+def strip_error(found, bbox):
+    """Largest center/top/bottom offset of a detected strip, relative to the orb diameter"""
+    x1, y1, x2, y2 = bbox
+    rx1, ry1, rx2, ry2 = found["region"]
+    offset = max(abs((rx1 + rx2) / 2 - (x1 + x2) / 2), abs(ry1 - y1), abs(ry2 - (y2 - 1)))
+    return offset / (y2 - y1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PoE2-AutoFlask automatic orb location benchmark")
+    parser.add_argument("--resolution", action="append", choices=list(synthetic.RESOLUTIONS),
+                        help="Limit to a resolution (repeatable)")
+    parser.add_argument("--noise", type=float, default=6, help="Pixel noise standard deviation")
+    parser.add_argument("--seeds", type=int, default=3, help="Fixtures per case")
+    args = parser.parse_args()
+
+    detection.register_bar_classifiers()
+    classifiers = {
+        "health": detection.get_classifier("health_calibration"),
+        "mana": detection.get_classifier("mana_calibration"),
+    }
+
+    failures = 0
+    print(f"{'case':<22} {'ms':>7}  {'health err':>10} {'conf':>5}  {'mana err':>10} {'conf':>5}")
+    for resolution in args.resolution or list(synthetic.RESOLUTIONS):
+        for health_fill, mana_fill in FILL_CASES:
+            for seed in range(args.seeds):
+                frame, truth = synthetic.render_fixture(resolution, health_fill, mana_fill, args.noise, seed)
+                start = time.perf_counter()
+                found = autolocate.locate_orbs(frame, classifiers)
+                elapsed = (time.perf_counter() - start) * 1000
+
+                columns = []
+                for name in ("health", "mana"):
+                    if found[name] is None:
+                        columns.append(f"{'missed':>10} {'':>5}")
+                        failures += 1
+                        continue
+                    error = strip_error(found[name], truth[name])
+                    failures += error > MAX_ERROR
+                    columns.append(f"{error:>10.1%} {found[name]['confidence']:>5.2f}")
+                case = f"{resolution} {health_fill:.2f}/{mana_fill:.2f} #{seed}"
+                print(f"{case:<22} {elapsed:>7.1f}  {columns[0]}  {columns[1]}")
+
+    if failures:
+        print(f"{failures} orb(s) missed or placed more than {MAX_ERROR:.0%} of the diameter off")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
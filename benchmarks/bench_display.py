@@ -0,0 +1,154 @@
+"""
+Console display benchmark.
+
+Renders the status display while the health bar drains and refills (a new
+frame on every step, as during a fight) through each render mode and reports
+CPU time per frame, including child processes spawned to clear the console:
+
+    full        - clear the console and reprint everything (original behavior)
+    incremental - redraw only the changed lines with ANSI cursor addressing
+
+It then runs the display thread against a publisher thread changing the
+health level at several rates (0 is an idle monitor) and reports how often
+the display woke up, how many frames it drew and the consumer lag from
+publishing a change to the display taking it. The display used to wake
+10 times a second whatever happened.
+
+Console output is sent to the null device while timing.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_display
+    python -m benchmarks.bench_display --frames 500
+    python -m benchmarks.bench_display --rates 0 20 200 --seconds 3 --max-fps 10
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+from benchmarks.bench_pipeline import make_controller
+from capture import SyntheticFrameSource
+from display import ConsoleRenderer, MODE_FULL, MODE_INCREMENTAL
+from events import EventChannel
+
+
+def cpu_seconds():
+    """CPU time used by this process and its finished children"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def bench_mode(controller, mode, frames):
+    """Render frames in one mode with stdout redirected to the null device"""
+    renderer = ConsoleRenderer(mode, max_fps=0)
+    levels = [abs(1.0 - 2.0 * (i % 100) / 100.0) for i in range(frames)]
+    now = time.time()
+
+    sys.stdout.flush()
+    saved = os.dup(1)
+    null = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(null, 1)
+    try:
+        cpu_start = cpu_seconds()
+        wall_start = time.perf_counter()
+        for i, level in enumerate(levels):
+            controller.update_level("health", level)
+            controller.apply_display_events(controller.display_events.drain())
+            renderer.render(controller.display_lines(now + i * 0.1))
+        sys.stdout.flush()
+        wall = time.perf_counter() - wall_start
+        cpu = cpu_seconds() - cpu_start
+    finally:
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(null)
+
+    stats = renderer.stats()
+    return {
+        "frames": stats["frames"],
+        "cpu_ms_per_frame": cpu * 1000.0 / frames,
+        "wall_ms_per_frame": wall * 1000.0 / frames,
+        "bytes_per_frame": stats["bytes"] / max(stats["frames"], 1),
+    }
+
+
+def bench_events(controller, rate, seconds, max_fps):
+    """
+    Run the display loop while another thread publishes health levels
+
+    Args:
+        rate: Level changes published per second, 0 for none
+        seconds: How long to run
+        max_fps: Display frame rate cap
+
+    Returns:
+        Dict with wakeups_per_s, frames, events and the EventChannel lag stats
+    """
+    controller.display_events = EventChannel()
+    with open(os.devnull, "w") as null:
+        controller.renderer = ConsoleRenderer(MODE_INCREMENTAL, max_fps, stream=null)
+        controller.display_active = True
+        display = threading.Thread(target=controller.display_loop)
+        display.start()
+
+        start = time.perf_counter()
+        i = 0
+        while time.perf_counter() - start < seconds:
+            if rate:
+                # Every step changes the displayed percentage
+                controller.update_level("health", 1.0 - (i % 100) / 100.0)
+                i += 1
+                time.sleep(1.0 / rate)
+            else:
+                time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+        controller.display_active = False
+        controller.display_events.close()
+        display.join()
+
+    stats = controller.display_events.stats()
+    stats["wakeups_per_s"] = stats["wakeups"] / elapsed
+    stats["frames"] = controller.renderer.stats()["frames"]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PoE2-AutoFlask console display benchmark")
+    parser.add_argument("--frames", type=int, default=200, help="Frames rendered per mode")
+    parser.add_argument("--rates", type=float, nargs="+", default=[0, 20, 200],
+                        help="Level changes per second published to the display thread")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duration of each event run")
+    parser.add_argument("--max-fps", type=float, default=4.0, help="Display frame rate cap for the event runs")
+    args = parser.parse_args()
+
+    controller = make_controller(SyntheticFrameSource())
+    controller.health_last_used = controller.mana_last_used = 0
+
+    results = {mode: bench_mode(controller, mode, args.frames) for mode in (MODE_FULL, MODE_INCREMENTAL)}
+
+    print(f"{'mode':<12} {'frames':>7} {'cpu ms/frame':>13} {'wall ms/frame':>14} {'bytes/frame':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<12} {r['frames']:>7} {r['cpu_ms_per_frame']:>13.3f} "
+              f"{r['wall_ms_per_frame']:>14.3f} {r['bytes_per_frame']:>12.0f}")
+
+    full = results[MODE_FULL]["cpu_ms_per_frame"]
+    incremental = results[MODE_INCREMENTAL]["cpu_ms_per_frame"]
+    if incremental > 0:
+        print(f"Incremental rendering uses {full / incremental:.1f}x less CPU per frame")
+
+    print()
+    print(f"{'rate/s':>7} {'events':>7} {'wakeups/s':>10} {'frames':>7} {'lag p50 ms':>11} "
+          f"{'lag p95 ms':>11} {'dropped':>8}")
+    for rate in args.rates:
+        r = bench_events(controller, rate, args.seconds, args.max_fps)
+        p50 = f"{r['lag_p50_ms']:.1f}" if r["lag_p50_ms"] is not None else "-"
+        p95 = f"{r['lag_p95_ms']:.1f}" if r["lag_p95_ms"] is not None else "-"
+        print(f"{rate:>7.0f} {r['published']:>7} {r['wakeups_per_s']:>10.1f} {r['frames']:>7} "
+              f"{p50:>11} {p95:>11} {r['dropped']:>8}")
+
+
+if __name__ == "__main__":
+    main()
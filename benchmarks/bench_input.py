@@ -0,0 +1,119 @@
+"""
+Input dispatch benchmark.
+
+Sends flask keys through a fake keyboard whose every send blocks for a
+configurable time (slow key injection) and compares:
+
+    inline     - the key is sent on the monitoring thread, as before
+    dispatched - the key is queued for the InputDispatcher thread
+
+For each it reports how long the monitoring thread is held up per key and
+the time from the decision to the key being sent. It also checks that a
+health key queued behind mana keys is sent first, and that repeated
+requests within the cooldown window are coalesced into one key.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_input
+    python -m benchmarks.bench_input --delay 0.02 --keys 100
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from dispatcher import PRIORITY_HEALTH, PRIORITY_MANA, FakeKeyboard, InputDispatcher
+
+
+def summarize(values):
+    """Mean and p95 of a list of seconds, in milliseconds"""
+    ms = np.array(values) * 1000.0
+    return {"mean_ms": float(ms.mean()), "p95_ms": float(np.percentile(ms, 95))}
+
+
+def bench_inline(keys, delay, interval):
+    """Send keys on the calling thread"""
+    backend = FakeKeyboard(delay)
+    blocked, latencies = [], []
+    for i in range(keys):
+        decided = time.perf_counter()
+        backend.send("1")
+        sent = time.perf_counter()
+        blocked.append(sent - decided)
+        latencies.append(sent - decided)
+        time.sleep(interval)
+    return summarize(blocked), summarize(latencies)
+
+
+def bench_dispatched(keys, delay, interval):
+    """Queue keys for the dispatcher thread"""
+    dispatcher = InputDispatcher(FakeKeyboard(delay))
+    blocked = []
+    for i in range(keys):
+        start = time.perf_counter()
+        dispatcher.submit("1", PRIORITY_HEALTH)
+        blocked.append(time.perf_counter() - start)
+        time.sleep(interval)
+    dispatcher.close(timeout=keys * delay + 1.0)
+    return summarize(blocked), summarize(list(dispatcher.latencies))
+
+
+def check_priority(delay):
+    """Whether a health key queued after mana keys is sent before them"""
+    backend = FakeKeyboard(delay)
+    dispatcher = InputDispatcher(backend)
+    # The first key occupies the dispatcher while the rest queue up
+    dispatcher.submit("2", PRIORITY_MANA)
+    time.sleep(delay / 2)
+    dispatcher.submit("3", PRIORITY_MANA)
+    dispatcher.submit("4", PRIORITY_MANA)
+    dispatcher.submit("1", PRIORITY_HEALTH)
+    dispatcher.close(timeout=5 * delay + 1.0)
+    return [key for key, _ in backend.sent]
+
+
+def check_coalescing(requests, window):
+    """Keys sent for repeated requests of one key within a cooldown window"""
+    backend = FakeKeyboard()
+    dispatcher = InputDispatcher(backend)
+    now = 100.0
+    for i in range(requests):
+        dispatcher.submit("1", PRIORITY_HEALTH, window, now=now + i * window / requests / 2)
+    dispatcher.close()
+    return len(backend.sent), dispatcher.coalesced
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PoE2-AutoFlask input dispatch benchmark")
+    parser.add_argument("--keys", type=int, default=50, help="Keys sent per mode")
+    parser.add_argument("--delay", type=float, default=0.01, help="Seconds each fake key send blocks")
+    parser.add_argument("--interval", type=float, default=0.02, help="Seconds between decisions")
+    args = parser.parse_args()
+
+    print(f"Fake keyboard: {args.delay * 1000:.1f}ms per key, a decision every {args.interval * 1000:.1f}ms")
+    print(f"{'mode':<11} {'blocked mean ms':>16} {'blocked p95 ms':>15} {'latency mean ms':>16} {'latency p95 ms':>15}")
+    for mode, bench in (("inline", bench_inline), ("dispatched", bench_dispatched)):
+        blocked, latency = bench(args.keys, args.delay, args.interval)
+        print(f"{mode:<11} {blocked['mean_ms']:>16.3f} {blocked['p95_ms']:>15.3f} "
+              f"{latency['mean_ms']:>16.3f} {latency['p95_ms']:>15.3f}")
+
+    failed = False
+    order = check_priority(max(args.delay, 0.01))
+    print(f"Send order for mana 2, then mana 3, mana 4, health 1 while busy: {' '.join(order)}")
+    if order != ["2", "1", "3", "4"]:
+        print("Health key was not sent ahead of the queued mana keys")
+        failed = True
+
+    sent, coalesced = check_coalescing(10, 4.0)
+    print(f"10 requests within one cooldown window: {sent} sent, {coalesced} coalesced")
+    if sent != 1:
+        print("Repeated requests were not coalesced")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
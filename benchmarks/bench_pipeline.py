@@ -0,0 +1,226 @@
+"""
+Per-stage micro-benchmarks for the detection pipeline.
+
+Drives each stage of AutoPotController with synthetic bar images at 1080p,
+1440p and 4K strip sizes and several fill levels, and reports throughput
+and p50/p95/p99 latency per stage:
+
+    capture   - planned capture of both bar regions
+    classify  - colored pixel presence check + fill level of the health strip
+    smooth    - reading smoothing
+    check     - full check_bar_level for health (classify, smooth, decide)
+    unchanged - check_bar_level on a health frame identical to the previous one
+    verify    - N-of-M trigger confirmation update
+    dispatch  - potion keypress path (dry-run, no key is sent)
+    cycle     - capture + check_bar_level for health and mana
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_pipeline                  # compare with baseline
+    python -m benchmarks.bench_pipeline --save-baseline  # store new baseline
+    python -m benchmarks.bench_pipeline --backend mss    # real screen capture
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+import detection
+import synthetic
+from capture import SyntheticFrameSource, create_frame_source
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+FILL_LEVELS = (0.1, 0.5, 0.9)
+STAGES = ("capture", "classify", "smooth", "check", "unchanged", "verify", "dispatch", "cycle")
+
+# A stage counts as regressed when its p95 latency grows by more than this
+REGRESSION_TOLERANCE = 0.25
+
+
+def time_stage(func, iterations, warmup=20):
+    """
+    Time repeated calls of func
+
+    Returns:
+        Dict with throughput and latency percentiles in microseconds
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = np.empty(iterations, dtype=np.int64)
+    timer = time.perf_counter_ns
+    for i in range(iterations):
+        start = timer()
+        func()
+        samples[i] = timer() - start
+
+    micros = samples / 1000.0
+    mean = float(micros.mean())
+    return {
+        "iterations": iterations,
+        "ops_per_sec": 1e6 / mean if mean > 0 else float("inf"),
+        "mean_us": mean,
+        "p50_us": float(np.percentile(micros, 50)),
+        "p95_us": float(np.percentile(micros, 95)),
+        "p99_us": float(np.percentile(micros, 99)),
+    }
+
+
+def make_controller(source):
+    """Headless controller suitable for benchmarking"""
+    from autopot import AutoPotController
+
+    controller = AutoPotController(source, interactive=False)
+    # Keep logging out of the measurements
+    logging.getLogger().setLevel(logging.ERROR)
+    controller.debug_mode = False
+    controller.dry_run = True
+    # Every stage classifies in full unless it opts into unchanged-frame reuse
+    controller.skip_unchanged_frames = False
+    return controller
+
+
+def bench_case(controller, source, resolution, fill, iterations):
+    """Benchmark every stage for one resolution / fill level"""
+    size, regions = synthetic.bar_regions(resolution)
+    if isinstance(source, SyntheticFrameSource):
+        source.set_frame(synthetic.render_screen(size, [
+            (regions["health"], fill, synthetic.HEALTH_COLOR),
+            (regions["mana"], fill, synthetic.MANA_COLOR),
+        ]))
+
+    controller.health_bar_pos = regions["health"]
+    controller.mana_bar_pos = regions["mana"]
+    controller.capture_planner.set_regions(controller.capture_regions())
+
+    strip = controller.capture_planner.capture(["health"])["health"].copy()
+    readings = [fill, min(1.0, fill + 0.05), max(0.0, fill - 0.05)]
+
+    def classify():
+        index = detection.quantize(strip, controller.health_color.bits)
+        if controller.health_presence.lookup(index).any():
+            controller.measure_level(controller.health_color.lookup(index))
+
+    def smooth():
+        controller.smooth_level(readings[0], readings[1], "Health")
+
+    def check():
+        controller.current_health = fill
+        controller.check_bar_level("health", strip)
+
+    def unchanged():
+        controller.skip_unchanged_frames = True
+        controller.current_health = fill
+        controller.check_bar_level("health", strip)
+        controller.skip_unchanged_frames = False
+
+    def cycle():
+        frames = controller.capture_planner.capture()
+        controller.check_bar_level("health", frames.get("health"))
+        controller.check_bar_level("mana", frames.get("mana"))
+
+    stages = {
+        "capture": controller.capture_planner.capture,
+        "classify": classify,
+        "smooth": smooth,
+        "check": check,
+        "unchanged": unchanged,
+        "verify": lambda: controller.health_confirmation.update(fill < controller.health_threshold),
+        "dispatch": lambda: controller.press_key(controller.health_potion_key),
+        "cycle": cycle,
+    }
+    return {name: time_stage(func, iterations) for name, func in stages.items()}
+
+
+def run(backend="synthetic", iterations=2000, resolutions=None):
+    """Run the full benchmark matrix"""
+    resolutions = resolutions or list(synthetic.RESOLUTIONS)
+    if backend == "synthetic":
+        source = SyntheticFrameSource()
+    else:
+        source = create_frame_source(backend)
+    controller = make_controller(source)
+
+    results = {}
+    for resolution in resolutions:
+        for fill in FILL_LEVELS:
+            key = f"{resolution}/fill={fill:.1f}"
+            results[key] = bench_case(controller, source, resolution, fill, iterations)
+    source.close()
+
+    return {
+        "meta": {
+            "backend": backend,
+            "iterations": iterations,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def print_report(report, baseline=None):
+    """Print a per-case, per-stage table, flagging p95 regressions"""
+    regressions = []
+    base_results = (baseline or {}).get("results", {})
+    print(f"{'case':<18} {'stage':<9} {'ops/s':>12} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}  vs baseline")
+    for case, stages in report["results"].items():
+        for stage in STAGES:
+            r = stages[stage]
+            compare = ""
+            base = base_results.get(case, {}).get(stage)
+            if base:
+                change = r["p95_us"] / base["p95_us"] - 1 if base["p95_us"] > 0 else 0.0
+                compare = f"{change:+.0%}"
+                if change > REGRESSION_TOLERANCE:
+                    compare += "  REGRESSION"
+                    regressions.append((case, stage, change))
+            print(f"{case:<18} {stage:<9} {r['ops_per_sec']:>12,.0f} {r['p50_us']:>9.1f} "
+                  f"{r['p95_us']:>9.1f} {r['p99_us']:>9.1f}  {compare}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PoE2-AutoFlask detection pipeline benchmarks")
+    parser.add_argument("--backend", default="synthetic", help="Capture backend (synthetic, pil, mss)")
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed calls per stage")
+    parser.add_argument("--resolution", action="append", choices=list(synthetic.RESOLUTIONS),
+                        help="Limit to a resolution (repeatable)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if any stage regressed against the baseline")
+    args = parser.parse_args()
+
+    report = run(args.backend, args.iterations, args.resolution)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed by more than {REGRESSION_TOLERANCE:.0%} at p95")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Batched region monitoring benchmark.
+
+Lays out 2, 8 and 32 bar strips along the bottom of a synthetic screen and
+compares the cost of one monitoring cycle over all of them:
+
+    per-region - each region grabbed and classified on its own, as the
+                 health and mana pipelines do
+    batched    - RegionBatch.read(): one planned grab, one array pass
+    decide     - batched read plus AutoPotController.check_regions (smoothing,
+                 verification and trigger decisions, dry-run)
+
+With the synthetic backend a grab is only an array slice, so the numbers
+show the classification cost alone; with a real capture backend (pil, mss)
+every per-region grab also pays the screen grab overhead. The batched
+levels are checked against the per-region ones on synthetic screens.
+
+Usage (from the repository root):
+
+    python -m benchmarks.bench_regions
+    python -m benchmarks.bench_regions --counts 2 8 32 64 --resolution 4k
+    python -m benchmarks.bench_regions --columns 4     # profile from 4 center columns
+    python -m benchmarks.bench_regions --backend mss   # real screen capture
+"""
+import argparse
+import sys
+
+import numpy as np
+
+import detection
+import synthetic
+from benchmarks.bench_pipeline import make_controller, time_stage
+from capture import SyntheticFrameSource, create_frame_source
+from regions import RegionBatch, RegionSpec, color_model
+from triggers import ConfirmationFilter
+
+COLORS = (("red", synthetic.HEALTH_COLOR), ("blue", synthetic.MANA_COLOR), ("green", (40, 170, 60)))
+
+
+def region_layout(resolution, count):
+    """
+    Screen size and pixel boxes of count strips side by side, flask-bar style
+
+    Returns:
+        ((width, height), [(x1, y1, x2, y2), ...])
+    """
+    width, height = synthetic.RESOLUTIONS[resolution]
+    strip_height, strip_width = synthetic.strip_size(resolution)
+    y2 = int(height * 0.98)
+    spacing = min(strip_width * 2, (width - strip_width) // max(1, count))
+    x0 = (width - spacing * count) // 2
+    return (width, height), [
+        (x0 + i * spacing, y2 - strip_height, x0 + i * spacing + strip_width, y2) for i in range(count)
+    ]
+
+
+def bench_count(controller, resolution, count, iterations, backend="synthetic", columns=0, seed=0):
+    """
+    Benchmark one region count
+
+    Returns:
+        (stage results, largest batched vs per-region level difference or
+        None with a real capture backend)
+    """
+    rng = np.random.default_rng(seed)
+    size, boxes = region_layout(resolution, count)
+    fills = rng.uniform(0.05, 1.0, count)
+    colors = [COLORS[i % len(COLORS)] for i in range(count)]
+    if backend == "synthetic":
+        source = SyntheticFrameSource(synthetic.render_screen(
+            size, [(box, fill, rgb) for box, fill, (_, rgb) in zip(boxes, fills, colors)]
+        ), size=size)
+    else:
+        source = create_frame_source(backend)
+
+    regions = []
+    for i, (box, (model, _)) in enumerate(zip(boxes, colors)):
+        color, presence = color_model(model, controller.lut_bits)
+        region = RegionSpec(f"region{i}", "0,0,1,1", color, presence, threshold=0.0, key="0")
+        region.confirmation = ConfirmationFilter(2, 3)
+        regions.append(region)
+    batch = RegionBatch(regions, controller.detection_method, "single", source, columns=columns)
+    batch.set_boxes({region.name: box for region, box in zip(regions, boxes)})
+    controller.regions = regions
+    # Per-region measurements use the same (possibly narrowed) boxes
+    boxes = [batch.boxes[region.name] for region in regions]
+
+    caches = [detection.MeasurementCache() for _ in regions]
+
+    def per_region():
+        return [
+            controller.measure_bar(source.grab(box), region.color, region.presence, cache)[0]
+            for region, box, cache in zip(regions, boxes, caches)
+        ]
+
+    difference = None
+    if backend == "synthetic":
+        separate = np.array([level if level is not None else 0.0 for level in per_region()])
+        levels, present = batch.read()
+        difference = float(np.abs(np.where(present, levels, 0.0) - separate).max())
+
+    results = {
+        "per-region": time_stage(per_region, iterations),
+        "batched": time_stage(batch.read, iterations),
+        "decide": time_stage(lambda: controller.check_regions(batch.read()), iterations),
+    }
+    return results, difference
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PoE2-AutoFlask batched region benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[2, 8, 32], help="Region counts to compare")
+    parser.add_argument("--resolution", choices=list(synthetic.RESOLUTIONS), default="1080p")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=0, help="Center columns measured per region (0 for all)")
+    parser.add_argument("--backend", default="synthetic", help="Capture backend (synthetic, pil, mss)")
+    args = parser.parse_args()
+
+    controller = make_controller(SyntheticFrameSource())
+    stages = ("per-region", "batched", "decide")
+    print(f"{'regions':>7}  " + "  ".join(f"{stage + ' us':>14}" for stage in stages)
+          + f"  {'batched us/region':>17}  {'max diff':>8}")
+    mismatches = 0
+    for count in args.counts:
+        results, difference = bench_count(
+            controller, args.resolution, count, args.iterations, args.backend, args.columns
+        )
+        mismatches += difference is not None and difference > 1e-9
+        means = [results[stage]["mean_us"] for stage in stages]
+        print(f"{count:>7}  " + "  ".join(f"{mean:>14.1f}" for mean in means)
+              + f"  {results['batched']['mean_us'] / count:>17.1f}  "
+              + (f"{difference:>8.4f}" if difference is not None else f"{'-':>8}"))
+
+    if mismatches:
+        print("Batched levels differ from per-region measurements")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Detector and smoothing accuracy evaluation.
+
+Runs combinations of a detector (detection method and color ratio) and a
+smoothing filter over a labelled synthetic corpus - bar strips with a known
+fill level per frame, pixel noise, text overlays, tints and damage flashes
+(see synthetic.render_corpus) - and reports for each combination:
+
+    mae       - mean absolute error of the smoothed level against the truth
+    overlay, tint, flash
+              - mean absolute error on frames with that effect
+    lag       - mean frames after a step in the level until the output is
+                within STEP_TOLERANCE of the new level, over the steps where
+                it gets there before the next step
+    unsettled - steps where the output never gets within STEP_TOLERANCE
+                before the next step (a biased reading, not a slow one),
+                out of all steps
+    us/frame  - mean cost of detection plus smoothing per frame
+
+Detectors are given as "<method>" or "<method>:<ratio>", e.g. "profile" or
+"count:1.5" (default ratio detection.COUNT_RATIO). Filters are "legacy"
+(the controller's smooth_level), "none", "ema:<weight of the new reading>"
+and "kalman" (the level tracked by triggers.TrendPredictor).
+
+Usage (from the repository root):
+
+    python -m benchmarks.eval_detection
+    python -m benchmarks.eval_detection --detector profile --detector profile:1.5 --filter legacy --filter ema:0.5
+    python -m benchmarks.eval_detection --save-corpus corpus.npz --frames 2000
+    python -m benchmarks.eval_detection --corpus corpus.npz
+"""
+import argparse
+import time
+
+import numpy as np
+
+import detection
+import synthetic
+from benchmarks.bench_pipeline import make_controller
+from capture import SyntheticFrameSource
+from triggers import TrendPredictor
+
+DEFAULT_DETECTORS = ("profile", "count")
+DEFAULT_FILTERS = ("legacy", "none", "ema:0.5", "kalman")
+# A change of at least this much between frames counts as a step
+STEP_SIZE = 0.1
+# Output within this distance of the new level ends a step response
+STEP_TOLERANCE = 0.05
+# Assumed time between corpus frames, for the Kalman filter
+FRAME_INTERVAL = 0.05
+
+
+def make_detector(controller, spec, bar="health"):
+    """
+    Build a frame -> raw level function from a detector spec
+
+    Returns:
+        Callable taking an RGB strip and returning the raw level, or None
+        when the strip has no colored pixels at all
+    """
+    method, _, ratio = spec.partition(":")
+    if method not in ("profile", "count"):
+        raise ValueError(f"Unknown detection method '{method}'")
+    channel = detection.RED if bar == "health" else detection.BLUE
+    color = detection.channel_classifier(
+        f"eval_{bar}", channel, float(ratio) if ratio else detection.COUNT_RATIO,
+        bits=controller.health_color.bits
+    )
+    presence = controller.health_presence if bar == "health" else controller.mana_presence
+    cache = detection.MeasurementCache()
+
+    def detect(img):
+        controller.detection_method = method
+        return controller.measure_bar(img, color, presence, cache)[0]
+    return detect
+
+
+def make_filter(controller, spec):
+    """
+    Build a smoothing filter from a filter spec
+
+    Returns:
+        Callable taking (raw level, previous output, frame number) and
+        returning the new output
+    """
+    name, _, arg = spec.partition(":")
+    if name == "legacy":
+        return lambda raw, previous, i: controller.smooth_level(raw, previous, "Eval")
+    if name == "none":
+        return lambda raw, previous, i: raw
+    if name == "ema":
+        weight = float(arg or 0.5)
+        return lambda raw, previous, i: weight * raw + (1.0 - weight) * previous
+    if name == "kalman":
+        predictor = TrendPredictor()
+
+        def kalman(raw, previous, i):
+            predictor.update(raw, i * FRAME_INTERVAL)
+            return min(1.0, max(0.0, predictor.level))
+        return kalman
+    raise ValueError(f"Unknown filter '{spec}'")
+
+
+def step_lags(levels, outputs):
+    """
+    Frames each step in the true level takes to show in the output
+
+    Returns:
+        (lags, unsettled) - array of lags of the steps whose output settles
+        within STEP_TOLERANCE before the next step, and the number of steps
+        that never settle
+    """
+    steps = np.flatnonzero(np.abs(np.diff(levels)) >= STEP_SIZE) + 1
+    ends = list(steps[1:]) + [len(levels)]
+    lags = []
+    unsettled = 0
+    for start, end in zip(steps, ends):
+        settled = np.flatnonzero(np.abs(outputs[start:end] - levels[start:end]) <= STEP_TOLERANCE)
+        if len(settled):
+            lags.append(settled[0])
+        else:
+            # Never reaching the new level is an error in the reading, and
+            # counting the whole segment as lag would hide it among the lags
+            unsettled += 1
+    return np.array(lags, dtype=np.float64), unsettled
+
+
+def evaluate(controller, corpus, detector_spec, filter_spec, bar="health"):
+    """
+    Run one detector/filter combination over a corpus
+
+    Returns:
+        Dict with mae, effect_mae (effect name -> error, None without such
+        frames), lag_frames (mean over the settled steps, None without
+        any), steps, unsettled_steps and us_per_frame
+    """
+    detect = make_detector(controller, detector_spec, bar)
+    smooth = make_filter(controller, filter_spec)
+    frames, levels = corpus["frames"], corpus["levels"]
+
+    outputs = np.empty(len(frames))
+    previous = 1.0
+    timer = time.perf_counter
+    elapsed = 0.0
+    for i, img in enumerate(frames):
+        start = timer()
+        raw = detect(img)
+        # Same as the controller: no colored pixels at all reads as empty
+        previous = 0.0 if raw is None else smooth(raw, previous, i)
+        elapsed += timer() - start
+        outputs[i] = previous
+
+    errors = np.abs(outputs - levels)
+    effect_mae = {}
+    for name, bit in synthetic.EFFECTS.items():
+        with_effect = (corpus["effects"] & bit) > 0
+        effect_mae[name] = float(errors[with_effect].mean()) if with_effect.any() else None
+    lags, unsettled = step_lags(levels, outputs)
+    return {
+        "mae": float(errors.mean()),
+        "effect_mae": effect_mae,
+        "lag_frames": float(lags.mean()) if len(lags) else None,
+        "steps": len(lags) + unsettled,
+        "unsettled_steps": unsettled,
+        "us_per_frame": elapsed / len(frames) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PoE2-AutoFlask detector and smoothing evaluation")
+    parser.add_argument("--detector", action="append", help="Detector spec, e.g. profile or count:1.5 (repeatable)")
+    parser.add_argument("--filter", action="append", help="Filter spec, e.g. legacy or ema:0.5 (repeatable)")
+    parser.add_argument("--bar", choices=("health", "mana"), default="health", help="Bar color to render")
+    parser.add_argument("--corpus", help="Evaluate a corpus saved with --save-corpus")
+    parser.add_argument("--save-corpus", metavar="PATH", help="Save the generated corpus to this .npz file")
+    parser.add_argument("--resolution", choices=list(synthetic.RESOLUTIONS), default="1080p")
+    parser.add_argument("--scenario", choices=synthetic.SCENARIOS, default="mixed")
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=6, help="Pixel noise standard deviation")
+    parser.add_argument("--no-effects", action="store_true", help="Render without overlays, tints and flashes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = synthetic.load_corpus(args.corpus)
+    else:
+        color = synthetic.HEALTH_COLOR if args.bar == "health" else synthetic.MANA_COLOR
+        corpus = synthetic.render_corpus(
+            args.resolution, color, args.frames, args.scenario,
+            effects=() if args.no_effects else tuple(synthetic.EFFECTS), noise=args.noise, seed=args.seed
+        )
+        if args.save_corpus:
+            synthetic.save_corpus(args.save_corpus, corpus)
+            print(f"Corpus saved to {args.save_corpus}")
+
+    controller = make_controller(SyntheticFrameSource())
+    frames = corpus["frames"]
+    print(f"{len(frames)} frames of {frames.shape[2]}x{frames.shape[1]}, "
+          f"{np.count_nonzero(corpus['effects'])} with effects")
+    effect_names = list(synthetic.EFFECTS)
+    print(f"{'detector':<14} {'filter':<10} {'mae':>6} "
+          + "".join(f"{name:>8}" for name in effect_names) + f" {'lag':>6} {'unsettled':>10} {'us/frame':>9}")
+    for detector_spec in args.detector or DEFAULT_DETECTORS:
+        for filter_spec in args.filter or DEFAULT_FILTERS:
+            result = evaluate(controller, corpus, detector_spec, filter_spec, args.bar)
+            effects = "".join(
+                f"{error:>8.3f}" if error is not None else f"{'-':>8}"
+                for error in (result["effect_mae"][name] for name in effect_names)
+            )
+            lag = f"{result['lag_frames']:.2f}" if result["lag_frames"] is not None else "-"
+            unsettled = f"{result['unsettled_steps']}/{result['steps']}"
+            print(f"{detector_spec:<14} {filter_spec:<10} {result['mae']:>6.3f}{effects} "
+                  f"{lag:>6} {unsettled:>10} {result['us_per_frame']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+Screen capture for PoE2-AutoFlask.
+
+Frame sources provide raw RGB pixels for a screen box from some backend
+(PIL, mss, an in-memory frame or recorded files). The capture planner
+decides how to capture every configured bar region in a monitoring cycle -
+either one grab of the bounding box that covers all of them, or one grab
+per region - and hands each detector a NumPy view sliced out of the
+captured frame. SharedCapture lets the per-bar pipelines, which run on
+their own schedules, share those grabs.
+"""
+import glob
+import logging
+import os
+import threading
+import time
+import numpy as np
+from PIL import ImageGrab, Image
+
+# Frame source backends
+BACKEND_PIL = "pil"
+BACKEND_MSS = "mss"
+BACKEND_SYNTHETIC = "synthetic"
+BACKEND_REPLAY = "replay"
+
+# Capture modes
+MODE_AUTO = "auto"
+MODE_SINGLE = "single"
+MODE_SEPARATE = "separate"
+CAPTURE_MODES = (MODE_AUTO, MODE_SINGLE, MODE_SEPARATE)
+
+# Fixed cost of one grab round trip, expressed as an equivalent number of
+# pixels. Screen grabs are dominated by the per-call overhead (device context
+# setup, blit, conversion), so a wider single grab is usually cheaper than
+# several small ones until the extra area gets very large.
+DEFAULT_GRAB_OVERHEAD_PIXELS = 250000
+
+# Frames per second the replay backend plays its frames at
+DEFAULT_REPLAY_FPS = 30.0
+# Longest a shared grab is reused by other pipelines, in seconds
+DEFAULT_SHARED_AGE = 0.05
+
+
+def bbox_area(bbox):
+    """Area in pixels of an (x1, y1, x2, y2) box"""
+    x1, y1, x2, y2 = bbox
+    return max(0, x2 - x1) * max(0, y2 - y1)
+
+
+def union_bbox(bboxes):
+    """Smallest (x1, y1, x2, y2) box containing every given box"""
+    return (
+        min(b[0] for b in bboxes),
+        min(b[1] for b in bboxes),
+        max(b[2] for b in bboxes),
+        max(b[3] for b in bboxes),
+    )
+
+
+class FrameSource:
+    """
+    Base class for screen frame providers
+
+    Subclasses implement grab() and may report the size of the screen they
+    capture, which the controller uses instead of asking pyautogui.
+    """
+    name = "base"
+
+    def grab(self, bbox):
+        """
+        Capture a screen box
+
+        Args:
+            bbox: (x1, y1, x2, y2) box in screen coordinates
+
+        Returns:
+            (height, width, 3) uint8 RGB array, or None if the capture failed
+        """
+        raise NotImplementedError
+
+    def screen_size(self):
+        """(width, height) of the captured screen, or None if unknown"""
+        return None
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class PILFrameSource(FrameSource):
+    """Captures with PIL.ImageGrab - works everywhere PIL can grab the screen"""
+    name = BACKEND_PIL
+
+    def grab(self, bbox):
+        img = ImageGrab.grab(bbox=bbox)
+        if not img:
+            return None
+        frame = np.asarray(img)
+        if frame.ndim != 3:
+            return None
+        return frame[..., :3]
+
+
+class MSSFrameSource(FrameSource):
+    """
+    Captures with mss, which uses BitBlt on Windows and MIT-SHM shared
+    memory on X11 (so it also works under Xvfb)
+
+    mss handles are not safe to share between threads, so each thread that
+    grabs gets its own handle.
+    """
+    name = BACKEND_MSS
+
+    def __init__(self):
+        import mss  # Optional dependency - ImportError tells the caller to fall back
+        self._mss = mss
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+    def _handle(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._mss.mss()
+            self._local.sct = sct
+            with self._lock:
+                self._handles.append(sct)
+        return sct
+
+    def grab(self, bbox):
+        x1, y1, x2, y2 = bbox
+        shot = self._handle().grab({"left": x1, "top": y1, "width": x2 - x1, "height": y2 - y1})
+        # mss returns BGRA - reversing the first three channels gives an RGB view
+        return np.asarray(shot)[..., 2::-1]
+
+    def screen_size(self):
+        monitor = self._handle().monitors[1]
+        return monitor["width"], monitor["height"]
+
+    def close(self):
+        with self._lock:
+            for sct in self._handles:
+                sct.close()
+            self._handles = []
+        self._local = threading.local()
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Serves crops of an in-memory full-screen frame
+
+    The frame can be replaced at any time with set_frame(), or generated on
+    every grab by a renderer callable that returns a full-screen array.
+    """
+    name = BACKEND_SYNTHETIC
+
+    def __init__(self, frame=None, renderer=None, size=(1920, 1080)):
+        """
+        Args:
+            frame: (height, width, 3) uint8 array used as the screen
+            renderer: Optional callable returning a new screen array per grab
+            size: (width, height) of the blank screen used when no frame is given
+        """
+        self.renderer = renderer
+        if frame is None:
+            frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        self.frame = np.asarray(frame)
+
+    def set_frame(self, frame):
+        """Replace the screen contents"""
+        self.frame = np.asarray(frame)
+
+    def grab(self, bbox):
+        if self.renderer is not None:
+            self.frame = np.asarray(self.renderer())
+        x1, y1, x2, y2 = bbox
+        return self.frame[y1:y2, x1:x2, :3]
+
+    def screen_size(self):
+        return self.frame.shape[1], self.frame.shape[0]
+
+
+class ReplayFrameSource(FrameSource):
+    """
+    Replays previously saved screen frames from disk
+
+    Accepts a directory or glob of image files (played in name order), or a
+    single .npy file holding a (frames, height, width, 3) stack. The frames
+    play at a fixed rate from the first grab on, and every grab returns a
+    crop of the frame showing at that moment - like a screen, however many
+    threads grab from it and however often. Bars grabbed at the same time
+    always come from the same frame.
+    """
+    name = BACKEND_REPLAY
+
+    def __init__(self, path, origin=(0, 0), loop=True, fps=DEFAULT_REPLAY_FPS, clock=time.monotonic):
+        """
+        Args:
+            path: Directory, glob pattern or .npy file with the frames
+            origin: Screen (x, y) of the frames' top-left corner, for
+                recordings of a sub-region rather than the full screen
+            loop: Restart from the first frame after the last one
+            fps: Frames played per second
+            clock: Time source, in seconds
+        """
+        self.origin = origin
+        self.loop = loop
+        self.fps = fps
+        self.clock = clock
+        self.start = None
+        self._lock = threading.Lock()
+
+        if path.endswith(".npy"):
+            self.frames = np.load(path, mmap_mode="r")
+        else:
+            pattern = os.path.join(path, "*.png") if os.path.isdir(path) else path
+            files = sorted(glob.glob(pattern))
+            self.frames = [np.asarray(Image.open(f).convert("RGB")) for f in files]
+
+        if len(self.frames) == 0:
+            raise ValueError(f"No replay frames found at {path}")
+        logging.info(f"Loaded {len(self.frames)} replay frames from {path}")
+
+    def frame_index(self):
+        """Index of the frame showing now, None once a non-looping replay ended"""
+        now = self.clock()
+        with self._lock:
+            if self.start is None:
+                self.start = now
+        index = int((now - self.start) * self.fps)
+        if index >= len(self.frames):
+            if not self.loop:
+                return None
+            index %= len(self.frames)
+        return index
+
+    def grab(self, bbox):
+        index = self.frame_index()
+        if index is None:
+            return None
+        frame = self.frames[index]
+
+        x1, y1, x2, y2 = bbox
+        ox, oy = self.origin
+        return np.asarray(frame[y1 - oy:y2 - oy, x1 - ox:x2 - ox, :3])
+
+    def screen_size(self):
+        height, width = self.frames[0].shape[:2]
+        return width + self.origin[0], height + self.origin[1]
+
+
+def create_frame_source(backend, **options):
+    """
+    Build a frame source by backend name, falling back to PIL
+
+    Args:
+        backend: "pil", "mss", "synthetic" or "replay"
+        options: Backend-specific constructor arguments
+
+    Returns:
+        FrameSource instance
+    """
+    try:
+        if backend == BACKEND_MSS:
+            return MSSFrameSource()
+        if backend == BACKEND_SYNTHETIC:
+            return SyntheticFrameSource(**options)
+        if backend == BACKEND_REPLAY:
+            return ReplayFrameSource(**options)
+        if backend != BACKEND_PIL:
+            logging.warning(f"Unknown capture backend '{backend}', using '{BACKEND_PIL}'")
+    except ImportError as e:
+        logging.warning(f"Capture backend '{backend}' unavailable ({e}), using '{BACKEND_PIL}'")
+    except Exception as e:
+        logging.error(f"Error creating capture backend '{backend}': {e}, using '{BACKEND_PIL}'")
+    return PILFrameSource()
+
+
+class CapturePlanner:
+    """
+    Plans and performs the screen grabs for a set of named regions
+    """
+
+    def __init__(self, regions=None, mode=MODE_AUTO,
+                 grab_overhead_pixels=DEFAULT_GRAB_OVERHEAD_PIXELS, source=None):
+        """
+        Args:
+            regions: Dict of region name -> (x1, y1, x2, y2) screen box
+            mode: "auto" to pick the cheaper plan, "single" to always use one
+                combined grab, "separate" to grab each region on its own
+            grab_overhead_pixels: Per-grab overhead used by the "auto" cost model
+            source: FrameSource to grab from (PIL when not given)
+        """
+        if mode not in CAPTURE_MODES:
+            logging.warning(f"Unknown capture mode '{mode}', using '{MODE_AUTO}'")
+            mode = MODE_AUTO
+        self.mode = mode
+        self.source = source or PILFrameSource()
+        self.grab_overhead_pixels = grab_overhead_pixels
+        self.set_regions(regions or {})
+
+    def set_regions(self, regions):
+        """
+        Replace the monitored regions and invalidate cached plans
+
+        The regions and their plan cache are swapped as a single object, so
+        a capture running on another thread uses either the old or the new
+        layout, never a mix of both.
+        """
+        self._layout = (dict(regions), {})
+
+    @property
+    def regions(self):
+        return self._layout[0]
+
+    def grab_cost(self, bbox):
+        """Estimated cost of grabbing one box, in pixel equivalents"""
+        return self.grab_overhead_pixels + bbox_area(bbox)
+
+    def plan(self, names=None, layout=None):
+        """
+        Work out which boxes to grab for the requested regions
+
+        Args:
+            names: Region names to capture, or None for all regions
+            layout: (regions, plan cache) to plan for, the current one if not given
+
+        Returns:
+            List of (bbox, [region names]) tuples, one per grab
+        """
+        regions, plans = layout or self._layout
+        names = tuple(regions) if names is None else tuple(names)
+        cached = plans.get(names)
+        if cached is not None:
+            return cached
+
+        boxes = [regions[name] for name in names]
+        if len(boxes) <= 1:
+            plan = [(box, [name]) for name, box in zip(names, boxes)]
+        else:
+            combined = union_bbox(boxes)
+            single_cost = self.grab_cost(combined)
+            separate_cost = sum(self.grab_cost(box) for box in boxes)
+
+            use_single = self.mode == MODE_SINGLE or (
+                self.mode == MODE_AUTO and single_cost <= separate_cost
+            )
+            if use_single:
+                plan = [(combined, list(names))]
+            else:
+                plan = [(box, [name]) for name, box in zip(names, boxes)]
+
+            logging.debug(
+                f"Capture plan for {list(names)}: {len(plan)} grab(s) "
+                f"(single cost {single_cost}, separate cost {separate_cost})"
+            )
+
+        plans[names] = plan
+        return plan
+
+    def capture(self, names=None):
+        """
+        Capture the requested regions
+
+        Returns:
+            Dict of region name -> (height, width, 3) uint8 array. Regions
+            sharing a grab are views into the same frame, so they are sampled
+            at the same instant and no pixel data is copied per region. A
+            region is missing from the result if its grab failed.
+        """
+        layout = self._layout
+        regions = layout[0]
+        frames = {}
+        for bbox, region_names in self.plan(names, layout):
+            frame = self.source.grab(bbox)
+            if frame is None:
+                logging.warning(f"Failed to capture screen region {bbox}")
+                continue
+            if frame.size == 0:
+                logging.warning(f"Empty capture for screen region {bbox}")
+                continue
+
+            for name in region_names:
+                x1, y1, x2, y2 = regions[name]
+                frames[name] = frame[y1 - bbox[1]:y2 - bbox[1], x1 - bbox[0]:x2 - bbox[0]]
+        return frames
+
+
+class SharedCapture:
+    """
+    One planned grab of every region, shared by the bar pipelines
+
+    Each pipeline asks for the frames when its next reading is due. The
+    first request grabs every region together; requests from the other
+    pipelines within max_age seconds reuse that grab, so bars read at about
+    the same time see the same instant. A pipeline that already used the
+    current grab always gets a new one, so no reading repeats a frame.
+    """
+
+    def __init__(self, planner, max_age=DEFAULT_SHARED_AGE):
+        """
+        Args:
+            planner: CapturePlanner covering every monitored region
+            max_age: Seconds a grab is reused by the other pipelines
+        """
+        self.planner = planner
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._frames = None
+        self._regions = None
+        self._taken = 0.0
+        self._users = set()
+
+        # Statistics
+        self.grabs = 0
+        self.shared = 0
+
+    def frames(self, user, now=None):
+        """
+        Frames of every region for one pipeline's reading
+
+        Args:
+            user: Name of the pipeline asking
+            now: time.monotonic() time of the request
+
+        Returns:
+            (frames, fresh) - the dict from CapturePlanner.capture(), and
+            whether it was grabbed for this request rather than reused
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            # Grabs from before a region change can't be reused
+            regions = self.planner.regions
+            fresh = (self._frames is None or user in self._users or regions is not self._regions
+                     or now - self._taken > self.max_age)
+            if fresh:
+                # Pipelines asking meanwhile wait for this grab and share it
+                self._frames = self.planner.capture()
+                self._regions = regions
+                self._taken = now
+                self._users = set()
+                self.grabs += 1
+            else:
+                self.shared += 1
+            self._users.add(user)
+            return self._frames, fresh
@@ -0,0 +1,172 @@
+"""
+Local control API for PoE2-AutoFlask.
+
+A running instance - normally one started with --headless, which has no
+console display or hotkeys - listens on a local Unix socket (a named pipe
+on Windows). Every request is one JSON object naming a command, and every
+reply is one compact JSON object:
+
+    {"command": "status"}
+    {"ok": true, "active": false, "health": 0.82, ...}
+
+Commands:
+
+    status          - whether auto-potion is on, current levels, rates and latencies
+    toggle          - turn auto-potion on or off
+    reload-config   - re-read the config file (see Live reload)
+    calibrate-auto  - locate both orbs from a full-screen grab
+    shutdown        - stop the program
+
+Requests are handled one at a time, so commands never overlap each other.
+"""
+import json
+import logging
+import os
+import threading
+import traceback
+from multiprocessing.connection import Client, Listener
+
+COMMANDS = ("status", "toggle", "reload-config", "calibrate-auto", "shutdown")
+
+PIPE_PREFIX = "\\\\.\\pipe\\"
+
+
+def default_address():
+    """Named pipe on Windows, a socket file in the working directory elsewhere"""
+    if os.name == "nt":
+        return PIPE_PREFIX + "poe2_autoflask"
+    return "poe2_autoflask.sock"
+
+
+def encode(reply):
+    """Compact JSON bytes for a reply"""
+    return json.dumps(reply, separators=(",", ":")).encode("utf-8")
+
+
+def send_command(address, command, **arguments):
+    """
+    Send one command to a running instance
+
+    Args:
+        address: Socket path or pipe name the instance listens on
+        command: One of COMMANDS
+        arguments: Extra request fields
+
+    Returns:
+        The reply as a dict
+    """
+    with Client(address) as connection:
+        connection.send_bytes(encode(dict(arguments, command=command)))
+        return json.loads(connection.recv_bytes().decode("utf-8"))
+
+
+class ControlServer:
+    """
+    Serves control requests on a local socket or named pipe
+    """
+
+    def __init__(self, address, handlers):
+        """
+        Args:
+            address: Socket path or pipe name to listen on
+            handlers: Dict of command name -> callable taking the request
+                dict and returning the reply dict
+        """
+        self.address = address
+        self.handlers = handlers
+        self.command_lock = threading.Lock()
+        self.listener = None
+        self.thread = None
+        self._stop = False
+        self.requests = 0
+
+    def start(self):
+        """Start listening, replacing a socket file left behind by a previous run"""
+        is_socket_file = not self.address.startswith(PIPE_PREFIX)
+        if is_socket_file and os.path.exists(self.address):
+            try:
+                Client(self.address).close()
+            except OSError:
+                os.remove(self.address)  # Nobody is listening on it
+            else:
+                raise RuntimeError(f"Another instance is already listening on {self.address}")
+
+        self.listener = Listener(self.address)
+        if is_socket_file:
+            # Only the user running the program may send commands
+            os.chmod(self.address, 0o600)
+        self._stop = False
+        self.thread = threading.Thread(target=self.run, name="control-server")
+        self.thread.daemon = True
+        self.thread.start()
+        logging.info(f"Control API listening on {self.address}")
+
+    def close(self, timeout=1.0):
+        """Stop listening and remove the socket file"""
+        if self.listener is None:
+            return
+        self._stop = True
+        # accept() doesn't return when the listener is closed from another
+        # thread, so wake it with a connection of our own
+        try:
+            Client(self.address).close()
+        except OSError:
+            pass
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self.listener.close()
+        self.listener = None
+        self.thread = None
+
+    def run(self):
+        while not self._stop:
+            try:
+                connection = self.listener.accept()
+            except OSError as e:
+                if self._stop:
+                    break
+                logging.error(f"Control API accept error: {e}")
+                continue
+            if self._stop:
+                connection.close()
+                break
+            thread = threading.Thread(target=self.serve, args=(connection,), name="control-client")
+            thread.daemon = True
+            thread.start()
+
+    def serve(self, connection):
+        """Answer requests on one connection until the client closes it"""
+        with connection:
+            while True:
+                try:
+                    data = connection.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                connection.send_bytes(encode(self.handle(data)))
+
+    def handle(self, data):
+        """
+        Run one request
+
+        Returns:
+            Reply dict - {"ok": false, "error": ...} if the request failed
+        """
+        try:
+            request = json.loads(data.decode("utf-8"))
+            command = request.get("command") if isinstance(request, dict) else None
+        except ValueError as e:
+            return {"ok": False, "error": f"invalid request: {e}"}
+
+        handler = self.handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"unknown command '{command}'", "commands": list(self.handlers)}
+
+        self.requests += 1
+        logging.info(f"Control command: {command}")
+        try:
+            with self.command_lock:
+                return handler(request)
+        except Exception as e:
+            logging.error(f"Error running control command '{command}': {e}")
+            logging.error(traceback.format_exc())
+            return {"ok": False, "error": str(e)}
@@ -0,0 +1,193 @@
+"""
+Background debug image writer for PoE2-AutoFlask.
+
+Monitoring threads hand raw RGB arrays to DebugImageWriter.submit(), which
+only decides whether to keep the frame and queues a copy. A background
+thread encodes the PNGs and writes them under timestamped names, so debug
+mode no longer changes the timing of the checks it is meant to debug.
+
+Sampling modes:
+
+    every   - keep every Nth frame of each stream
+    trigger - keep the frames just before and after a flask is used
+    off     - keep nothing (one-off images such as calibration are still written)
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from PIL import Image
+
+SAMPLE_EVERY = "every"
+SAMPLE_TRIGGER = "trigger"
+SAMPLE_OFF = "off"
+SAMPLING_MODES = (SAMPLE_EVERY, SAMPLE_TRIGGER, SAMPLE_OFF)
+
+DEFAULT_QUEUE_SIZE = 64
+
+
+class DebugImageWriter:
+    """
+    Samples debug frames and writes them as PNG files on a background thread
+    """
+
+    def __init__(self, directory="debug", mode=SAMPLE_EVERY, every=10, trigger_frames=5,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Args:
+            directory: Directory the images are written to
+            mode: "every", "trigger" or "off"
+            every: With "every", keep one frame in this many per stream
+            trigger_frames: With "trigger", frames kept before and after each flask use
+            queue_size: Maximum frames waiting to be written; the oldest is dropped when full
+        """
+        self.directory = directory
+        self.mode = mode if mode in SAMPLING_MODES else SAMPLE_EVERY
+        self.every = max(1, every)
+        self.trigger_frames = max(0, trigger_frames)
+
+        self.queue = deque()
+        self.queue_size = max(1, queue_size)
+        self.condition = threading.Condition()
+
+        # Per-stream sampling state
+        self.frame_counts = {}
+        self.recent = {}      # Frames kept for the pre-trigger window
+        self.post_trigger = {}
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._stop = False
+        self.thread = None
+
+    def submit(self, name, img, force=False):
+        """
+        Offer a frame for writing
+
+        Args:
+            name: Image name, e.g. "health_capture.png" - also the sampling stream
+            img: RGB array or PIL image
+            force: Write regardless of the sampling mode
+
+        Returns:
+            True if the frame was queued
+        """
+        stamp = time.time()
+        if force:
+            self._enqueue(name, stamp, img)
+            return True
+
+        if self.mode == SAMPLE_EVERY:
+            count = self.frame_counts.get(name, 0)
+            self.frame_counts[name] = count + 1
+            if count % self.every:
+                return False
+            self._enqueue(name, stamp, img)
+            return True
+
+        if self.mode == SAMPLE_TRIGGER:
+            remaining = self.post_trigger.get(name, 0)
+            if remaining:
+                self.post_trigger[name] = remaining - 1
+                self._enqueue(name, stamp, img)
+                return True
+            if self.trigger_frames:
+                recent = self.recent.get(name)
+                if recent is None:
+                    recent = self.recent[name] = deque(maxlen=self.trigger_frames)
+                recent.append((stamp, self._copy(img)))
+        return False
+
+    def trigger(self, name):
+        """
+        Mark a flask use on a stream: queue the frames leading up to it and
+        keep the ones that follow
+        """
+        if self.mode != SAMPLE_TRIGGER:
+            return
+        recent = self.recent.get(name)
+        while recent:
+            stamp, img = recent.popleft()
+            self._enqueue(name, stamp, img, copy=False)
+        self.post_trigger[name] = self.trigger_frames
+
+    def _copy(self, img):
+        # Capture buffers are reused, so keep a private copy of arrays
+        return img.copy()
+
+    def _enqueue(self, name, stamp, img, copy=True):
+        if copy:
+            img = self._copy(img)
+        with self.condition:
+            if self.thread is None:
+                self._start()
+            if len(self.queue) >= self.queue_size:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append((name, stamp, img))
+            self.condition.notify()
+
+    def _start(self):
+        self._stop = False
+        self.thread = threading.Thread(target=self.run, name="debug-image-writer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self, timeout=2.0):
+        """Write what is still queued and stop the writer thread"""
+        with self.condition:
+            self._stop = True
+            self.condition.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+        self.thread = None
+
+    def run(self):
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            with self.condition:
+                while not self.queue and not self._stop:
+                    self.condition.wait()
+                if not self.queue:
+                    break
+                name, stamp, img = self.queue.popleft()
+            self.write(name, stamp, img)
+
+    def filename(self, name, stamp):
+        """Timestamped file name for a frame, e.g. health_capture_20250101_120000_123.png"""
+        stem, ext = os.path.splitext(name)
+        millis = int((stamp % 1) * 1000)
+        return f"{stem}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(stamp))}_{millis:03d}{ext or '.png'}"
+
+    def write(self, name, stamp, img):
+        """Encode and write one frame"""
+        try:
+            if not isinstance(img, Image.Image):
+                img = Image.fromarray(img)
+            path = os.path.join(self.directory, self.filename(name, stamp))
+            # Several frames can share a millisecond - never overwrite one
+            base, ext = os.path.splitext(path)
+            suffix = 1
+            while os.path.exists(path):
+                path = f"{base}_{suffix}{ext}"
+                suffix += 1
+            img.save(path)
+            self.written += 1
+            logging.debug(f"Saved debug image: {os.path.basename(path)}")
+        except Exception as e:
+            self.errors += 1
+            logging.error(f"Error saving debug image: {e}")
+
+    def stats(self):
+        """Writer statistics"""
+        return {
+            "queued": len(self.queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
@@ -0,0 +1,514 @@
+"""
+Vectorized bar detection helpers for PoE2-AutoFlask.
+
+Every function here works on whole (height, width, 3) uint8 RGB arrays at
+once instead of walking pixels in Python, while keeping the exact thresholds
+used by the original per-pixel loops.
+
+Color tests can also be baked into ColorClassifier lookup tables indexed by
+quantized RGB, so classifying a frame is a single table lookup. Classifiers
+are registered by name ("health", "mana", ...) so new bar types can add
+their own.
+"""
+import hashlib
+import logging
+import math
+import os
+import zlib
+import numpy as np
+
+# Channel indices in an RGB array
+RED = 0
+GREEN = 1
+BLUE = 2
+
+# Default thresholds shared by the health and mana detectors
+MIN_CHANNEL_VALUE = 60
+PRESENCE_RATIO = 1.5  # Strict ratio used for the "any colored pixel" pre-check
+COUNT_RATIO = 1.3     # Looser ratio used when counting colored pixels
+
+# Thresholds used when searching for a bar during calibration
+CALIBRATION_MIN_VALUE = 50
+CALIBRATION_RATIO = 1.5
+
+_ratio_tables = {}
+
+
+def _ratio_table(ratio):
+    """
+    Lookup table mapping max(other channels) -> floor(max * ratio).
+
+    For an integer channel value v, `v > m * ratio` is equivalent to
+    `v > floor(m * ratio)`, so comparing against this table reproduces the
+    float comparison of the original loops bit for bit.
+    """
+    table = _ratio_tables.get(ratio)
+    if table is None:
+        table = np.array([math.floor(m * ratio) for m in range(256)], dtype=np.int16)
+        _ratio_tables[ratio] = table
+    return table
+
+
+def color_mask(img_array, channel, ratio=COUNT_RATIO, min_value=MIN_CHANNEL_VALUE):
+    """
+    Boolean mask of pixels dominated by one color channel
+
+    A pixel matches when `value > min_value and value > max(others) * ratio`,
+    which is the same test the per-pixel detection loops used.
+
+    Args:
+        img_array: (height, width, 3+) uint8 RGB array
+        channel: RED, GREEN or BLUE
+        ratio: How much the channel must exceed the strongest other channel
+        min_value: Minimum channel value for a pixel to count
+
+    Returns:
+        (height, width) boolean array
+    """
+    pixels = img_array[..., :3]
+    value = pixels[..., channel]
+    others = [c for c in (RED, GREEN, BLUE) if c != channel]
+    strongest_other = np.maximum(pixels[..., others[0]], pixels[..., others[1]])
+    limit = _ratio_table(ratio)[strongest_other]
+    return (value > min_value) & (value > limit)
+
+
+def has_color(img_array, channel, ratio=PRESENCE_RATIO, min_value=MIN_CHANNEL_VALUE):
+    """Return True if any pixel in the array is dominated by the given channel"""
+    return bool(color_mask(img_array, channel, ratio, min_value).any())
+
+
+def count_color(img_array, channel, ratio=COUNT_RATIO, min_value=MIN_CHANNEL_VALUE):
+    """Count the pixels dominated by the given channel"""
+    return int(np.count_nonzero(color_mask(img_array, channel, ratio, min_value)))
+
+
+def row_profile(mask):
+    """
+    Fraction of colored pixels in each row of a bar strip
+
+    Args:
+        mask: (height, width) boolean mask of colored pixels
+
+    Returns:
+        (height,) float array, top row first
+    """
+    if mask.shape[1] == 0:
+        return np.zeros(mask.shape[0])
+    return mask.sum(axis=1, dtype=np.int32) / mask.shape[1]
+
+
+def profile_fill_level(profile, row_threshold=0.5):
+    """
+    Fill level of a bar that fills from the bottom, from its row profile
+
+    The liquid surface is the row that best splits the profile into empty
+    rows above and filled rows below (fewest rows on the wrong side), which
+    is robust to stray colored pixels above the surface and dark spots below
+    it. The partially covered rows on either side of the surface are then
+    added fractionally, so the level moves smoothly between whole rows.
+
+    Args:
+        profile: Per-row colored fraction, top row first (see row_profile)
+        row_threshold: Coverage at which a row counts as filled
+
+    Returns:
+        Fill level 0.0-1.0, independent of the strip width
+    """
+    profile = np.asarray(profile, dtype=np.float64)
+    height = len(profile)
+    if height == 0:
+        return 0.0
+
+    filled = profile >= row_threshold
+    # filled_above[k] = filled rows in [0, k); empty_below[k] = empty rows in [k, height)
+    filled_above = np.concatenate(([0], np.cumsum(filled)))
+    rows_below = height - np.arange(height + 1)
+    empty_below = rows_below - (filled_above[-1] - filled_above)
+    surface = int(np.argmin(filled_above + empty_below))
+
+    if surface == height:
+        # Nothing filled - only a partially covered bottom row can count
+        level = min(profile[-1], row_threshold)
+    else:
+        level = (height - surface - 1) + min(1.0, profile[surface])
+        if surface > 0:
+            level += min(profile[surface - 1], row_threshold)
+    return float(min(1.0, max(0.0, level / height)))
+
+
+def profile_fill_levels(profiles, heights, row_threshold=0.5):
+    """
+    profile_fill_level() for several bars in one array pass
+
+    Bars of different heights share one matrix: each bar's rows sit at the
+    bottom of its row, padded with empty rows at the top. Empty rows above
+    a bar never move its liquid surface, so the result is the same as
+    measuring each bar on its own.
+
+    Args:
+        profiles: (bars, rows) per-row colored fraction, top row first
+        heights: (bars,) number of real rows of each bar
+        row_threshold: Coverage at which a row counts as filled
+
+    Returns:
+        (bars,) fill levels 0.0-1.0
+    """
+    profiles = np.asarray(profiles, dtype=np.float64)
+    count, height = profiles.shape
+    if height == 0:
+        return np.zeros(count)
+
+    filled = profiles >= row_threshold
+    filled_above = np.zeros((count, height + 1), dtype=np.int64)
+    np.cumsum(filled, axis=1, out=filled_above[:, 1:])
+    rows_below = height - np.arange(height + 1)
+    empty_below = rows_below - (filled_above[:, -1:] - filled_above)
+    surface = np.argmin(filled_above + empty_below, axis=1)
+
+    bars = np.arange(count)
+    level = (height - surface - 1) + np.minimum(1.0, profiles[bars, np.minimum(surface, height - 1)])
+    above = np.minimum(profiles[bars, np.maximum(surface - 1, 0)], row_threshold)
+    level += np.where(surface > 0, above, 0.0)
+    # Nothing filled - only a partially covered bottom row can count
+    level = np.where(surface == height, np.minimum(profiles[:, -1], row_threshold), level)
+    return np.clip(level / np.maximum(heights, 1), 0.0, 1.0)
+
+
+def count_fill_level(colored_pixels, total_pixels):
+    """
+    Fill level from the number of colored pixels in a bar strip (scalars or arrays)
+
+    POE2 bars may not fill the entire capture area, so the count is scaled
+    up before clamping to 0.0-1.0.
+    """
+    level = np.clip(colored_pixels / (total_pixels * 0.8), 0.0, 1.0)
+    return np.minimum(1.0, level * 1.2)
+
+
+# Bar location during calibration
+# Columns on each side of the bar center used to find its top and bottom
+LOCATE_BAND = 2
+# Locations scoring below this are reported as unreliable
+MIN_LOCATE_CONFIDENCE = 0.6
+
+
+def locate_bar(mask, band=LOCATE_BAND, expected_rows=None):
+    """
+    Find a vertical bar in a calibration scan area
+
+    The bar column comes from the per-column histogram of colored pixels:
+    its center is the centroid of the run of columns around the tallest one
+    that reach at least half its height. The top and bottom are the first
+    and last rows colored anywhere in a narrow band around that center.
+    Edges are refined to sub-pixel positions from the coverage of the edge
+    rows.
+
+    The confidence (0.0-1.0) is the product of
+      - continuity: share of rows between top and bottom that are filled
+      - isolation: share of all colored pixels that belong to the bar's columns
+      - span: detected height relative to expected_rows, if given
+
+    Args:
+        mask: (height, width) boolean mask of bar-colored pixels
+        band: Columns on each side of the center used for the edges
+        expected_rows: Height the bar is expected to span, e.g. the marked range
+
+    Returns:
+        Dict with column, center, top, bottom (pixel indices, bottom inclusive),
+        top_edge, bottom_edge (sub-pixel boundaries) and confidence, or None
+        if there are no colored pixels
+    """
+    height, width = mask.shape[:2]
+    if height == 0 or width == 0:
+        return None
+    counts = mask.sum(axis=0, dtype=np.int32)
+    peak = int(np.argmax(counts))
+    peak_count = int(counts[peak])
+    if peak_count == 0:
+        return None
+
+    # Contiguous run of tall columns around the peak
+    tall = counts * 2 >= peak_count
+    left = peak - int(np.argmin(tall[peak::-1])) + 1 if not tall[:peak + 1].all() else 0
+    right = peak + int(np.argmin(tall[peak:])) if not tall[peak:].all() else width
+    columns = np.arange(left, right)
+    center = float((counts[left:right] * columns).sum() / counts[left:right].sum())
+    column = int(round(center))
+
+    # Rows covered in the band around the center
+    band_lo = max(0, column - band)
+    band_hi = min(width, column + band + 1)
+    coverage = mask[:, band_lo:band_hi].mean(axis=1)
+    rows = np.flatnonzero(coverage > 0)
+    top, bottom = int(rows[0]), int(rows[-1])
+
+    # Sub-pixel edges: an edge row counts by its coverage relative to a
+    # typical row inside the bar, which may be narrower than the band
+    full = float(np.median(coverage[top:bottom + 1]))
+    if full <= 0:
+        # Most rows between the first and last colored ones are empty, e.g.
+        # stray specks or a nearly empty bar - keep whole-row edges, no confidence
+        top_edge, bottom_edge, confidence = float(top), float(bottom + 1), 0.0
+    else:
+        top_edge = top + 1.0 - min(1.0, float(coverage[top]) / full)
+        bottom_edge = bottom + min(1.0, float(coverage[bottom]) / full)
+
+        continuity = float((coverage[top:bottom + 1] * 2 >= full).mean())
+        isolation = float(counts[left:right].sum() / counts.sum())
+        confidence = continuity * isolation
+        if expected_rows:
+            confidence *= min(1.0, (bottom_edge - top_edge) / expected_rows)
+
+    return {
+        "column": column,
+        "center": center,
+        "top": top,
+        "bottom": bottom,
+        "top_edge": top_edge,
+        "bottom_edge": bottom_edge,
+        "confidence": confidence,
+    }
+
+
+# Lookup table classifiers. 8 bits reproduces the color tests exactly;
+# fewer bits classify every pixel like the center of its color cube
+DEFAULT_LUT_BITS = 8
+LUT_CACHE_VERSION = 1
+
+
+def quantize(img_array, bits=DEFAULT_LUT_BITS):
+    """
+    Lookup table index of every pixel
+
+    Keeps the top `bits` bits of each channel and packs them as
+    (r << 2*bits) | (g << bits) | b.
+
+    Returns:
+        (height, width) integer index array
+    """
+    pixels = img_array[..., :3]
+    shift = 8 - bits
+    dtype = np.uint16 if bits <= 5 else np.uint32
+    r = pixels[..., RED].astype(dtype)
+    g = pixels[..., GREEN].astype(dtype)
+    b = pixels[..., BLUE].astype(dtype)
+    if shift:
+        r >>= shift
+        g >>= shift
+        b >>= shift
+    r <<= 2 * bits
+    g <<= bits
+    r |= g
+    r |= b
+    return r
+
+
+def lut_colors(bits):
+    """
+    Representative RGB color of every lookup table entry
+
+    Each entry stands for a cube of 2**(8-bits) values per channel and is
+    represented by the cube's center, so 8 bits gives an exact table.
+
+    Returns:
+        (2**(3*bits), 1, 3) uint8 array in table index order
+    """
+    levels = 1 << bits
+    step = 1 << (8 - bits)
+    values = (np.arange(levels) * step + step // 2).astype(np.uint8)
+    r, g, b = np.meshgrid(values, values, values, indexing="ij")
+    return np.stack((r.ravel(), g.ravel(), b.ravel()), axis=-1)[:, np.newaxis, :]
+
+
+def rgb_to_hsv(img_array):
+    """
+    Vectorized RGB -> HSV
+
+    Returns:
+        Tuple of (hue in degrees 0-360, saturation 0-1, value 0-1) arrays
+    """
+    rgb = img_array[..., :3].astype(np.float32) / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    value = rgb.max(axis=-1)
+    delta = value - rgb.min(axis=-1)
+    saturation = np.where(value > 0, delta / np.maximum(value, 1e-12), 0.0)
+
+    safe_delta = np.maximum(delta, 1e-12)
+    hue = np.where(
+        value == r, ((g - b) / safe_delta) % 6,
+        np.where(value == g, (b - r) / safe_delta + 2, (r - g) / safe_delta + 4)
+    ) * 60.0
+    hue = np.where(delta > 0, hue, 0.0)
+    return hue, saturation, value
+
+
+class ColorClassifier:
+    """
+    Pixel color test baked into a quantized RGB lookup table
+    """
+
+    def __init__(self, name, predicate, bits=DEFAULT_LUT_BITS, cache_key=None, cache_dir=None):
+        """
+        Args:
+            name: Classifier name, e.g. "health"
+            predicate: Callable taking an (N, 1, 3) uint8 RGB array and
+                returning an (N, 1) boolean mask
+            bits: Bits kept per channel (5 -> 32x32x32 table, 8 -> exact)
+            cache_key: String identifying the predicate; when given together
+                with cache_dir, the table is cached on disk under this key
+            cache_dir: Directory for cached tables
+        """
+        if not 1 <= bits <= 8:
+            raise ValueError(f"Lookup table bits must be between 1 and 8, got {bits}")
+        self.name = name
+        self.predicate = predicate
+        self.bits = bits
+        self.cache_key = cache_key
+        self.table = self._load_or_build(cache_dir)
+
+    def _cache_path(self, cache_dir):
+        digest = hashlib.sha1(f"{LUT_CACHE_VERSION}:{self.cache_key}".encode()).hexdigest()[:12]
+        return os.path.join(cache_dir, f"lut_{self.name}_{self.bits}bit_{digest}.npy")
+
+    def _load_or_build(self, cache_dir):
+        size = 1 << (3 * self.bits)
+        path = None
+        if cache_dir and self.cache_key:
+            path = self._cache_path(cache_dir)
+            if os.path.exists(path):
+                try:
+                    packed = np.load(path)
+                    return np.unpackbits(packed, count=size).astype(bool)
+                except Exception as e:
+                    logging.warning(f"Ignoring unreadable lookup table cache {path}: {e}")
+
+        table = np.ascontiguousarray(self.predicate(lut_colors(self.bits)).reshape(size), dtype=bool)
+
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(path, np.packbits(table))
+                logging.debug(f"Cached {self.name} lookup table at {path}")
+            except Exception as e:
+                logging.warning(f"Could not cache {self.name} lookup table: {e}")
+        return table
+
+    @classmethod
+    def from_hsv(cls, name, hue, saturation=(0.0, 1.0), value=(0.0, 1.0), **kwargs):
+        """
+        Classifier matching an HSV range
+
+        Args:
+            hue: (low, high) in degrees; low > high wraps around red, e.g. (340, 20)
+            saturation: (low, high) 0-1
+            value: (low, high) 0-1
+        """
+        def predicate(rgb):
+            h, s, v = rgb_to_hsv(rgb)
+            if hue[0] <= hue[1]:
+                in_hue = (h >= hue[0]) & (h <= hue[1])
+            else:
+                in_hue = (h >= hue[0]) | (h <= hue[1])
+            return (in_hue & (s >= saturation[0]) & (s <= saturation[1])
+                    & (v >= value[0]) & (v <= value[1]))
+
+        kwargs.setdefault("cache_key", f"hsv:{hue}:{saturation}:{value}")
+        return cls(name, predicate, **kwargs)
+
+    def lookup(self, index):
+        """Boolean mask for a precomputed quantize() index"""
+        return np.take(self.table, index)
+
+    def mask(self, img_array):
+        """(height, width) boolean mask of matching pixels"""
+        return np.take(self.table, quantize(img_array, self.bits))
+
+
+def channel_classifier(name, channel, ratio, min_value=MIN_CHANNEL_VALUE, **kwargs):
+    """Classifier for the color_mask() "dominant channel" test"""
+    kwargs.setdefault("cache_key", f"channel:{channel}:{ratio}:{min_value}")
+    return ColorClassifier(
+        name, lambda rgb: color_mask(rgb, channel, ratio, min_value), **kwargs
+    )
+
+
+_classifiers = {}
+
+
+def register_classifier(classifier):
+    """Make a classifier available by name, replacing any previous one"""
+    _classifiers[classifier.name] = classifier
+    return classifier
+
+
+def get_classifier(name):
+    """Registered classifier by name (KeyError if unknown)"""
+    return _classifiers[name]
+
+
+def register_bar_classifiers(bits=DEFAULT_LUT_BITS, cache_dir=None):
+    """
+    Register the built-in health and mana classifiers
+
+    Each bar gets a "<bar>" classifier for measuring its level, a
+    "<bar>_presence" classifier for the stricter "any colored pixel" check
+    and a "<bar>_calibration" classifier used to find the bar's edges.
+    """
+    for bar, channel in (("health", RED), ("mana", BLUE)):
+        register_classifier(channel_classifier(bar, channel, COUNT_RATIO, bits=bits, cache_dir=cache_dir))
+        register_classifier(channel_classifier(
+            f"{bar}_presence", channel, PRESENCE_RATIO, bits=bits, cache_dir=cache_dir
+        ))
+        register_classifier(channel_classifier(
+            f"{bar}_calibration", channel, CALIBRATION_RATIO,
+            min_value=CALIBRATION_MIN_VALUE, bits=bits, cache_dir=cache_dir
+        ))
+
+
+def frame_fingerprint(img_array):
+    """
+    Cheap fingerprint of a frame's pixels (CRC32 of the raw bytes plus shape)
+
+    Computing it is an order of magnitude cheaper than classifying the frame,
+    so it is used to detect frames identical to the previous one.
+    """
+    return img_array.shape, zlib.crc32(np.ascontiguousarray(img_array))
+
+
+class MeasurementCache:
+    """
+    Remembers the measurement of the last frame seen for one region
+
+    Only the raw measurement is reused - smoothing and trigger decisions
+    still run every cycle, so skipping classification never changes the
+    result.
+    """
+
+    def __init__(self):
+        self.fingerprint = None
+        self.measurement = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint):
+        """Measurement for this fingerprint, or None if the frame changed"""
+        if fingerprint == self.fingerprint:
+            self.hits += 1
+            return self.measurement
+        self.misses += 1
+        return None
+
+    def put(self, fingerprint, measurement):
+        """Store the measurement of a newly classified frame"""
+        self.fingerprint = fingerprint
+        self.measurement = measurement
+
+    def clear(self):
+        """Forget the stored frame, e.g. after the region moved"""
+        self.fingerprint = None
+        self.measurement = None
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,204 @@
+"""
+Asynchronous key dispatch for PoE2-AutoFlask.
+
+Monitoring threads decide that a flask is needed and hand the key to
+InputDispatcher.submit(), which only queues it. A background thread sends
+the keys through the input backend, so slow key injection never delays the
+next bar reading.
+
+Queued keys are sent by priority - health before mana before extra
+regions - and in submission order within a priority. A request for a key
+that was already requested within the earlier request's cooldown window
+is coalesced into it instead of being sent twice. The time from the
+decision to the key being sent is recorded for every key.
+"""
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Priorities, lower is sent first
+PRIORITY_HEALTH = 0
+PRIORITY_MANA = 1
+PRIORITY_REGION = 2
+
+BACKEND_KEYBOARD = "keyboard"
+BACKEND_FAKE = "fake"
+
+# Number of recent decision-to-send latencies kept for statistics
+LATENCY_HISTORY = 256
+
+
+class KeyboardBackend:
+    """Sends keys with the keyboard package"""
+    name = BACKEND_KEYBOARD
+
+    def __init__(self):
+        import keyboard
+        self._keyboard = keyboard
+
+    def send(self, key):
+        self._keyboard.press_and_release(key)
+
+
+class FakeKeyboard:
+    """
+    Records keys instead of sending them, for tests and benchmarks
+
+    A delay simulates slow key injection.
+    """
+    name = BACKEND_FAKE
+
+    def __init__(self, delay=0.0):
+        """
+        Args:
+            delay: Seconds each send blocks
+        """
+        self.delay = delay
+        self.sent = []  # (key, perf_counter time) in sending order
+
+    def send(self, key):
+        if self.delay:
+            time.sleep(self.delay)
+        self.sent.append((key, time.perf_counter()))
+
+
+def create_input_backend(backend):
+    """
+    Build an input backend by name, falling back to a fake keyboard when
+    the keyboard package is unavailable
+
+    Args:
+        backend: "keyboard" or "fake"
+    """
+    if backend == BACKEND_FAKE:
+        return FakeKeyboard()
+    if backend != BACKEND_KEYBOARD:
+        logging.warning(f"Unknown input backend '{backend}', using '{BACKEND_KEYBOARD}'")
+    try:
+        return KeyboardBackend()
+    except ImportError as e:
+        logging.error(f"Input backend '{BACKEND_KEYBOARD}' unavailable ({e}) - keys will not be sent")
+        return FakeKeyboard()
+
+
+class InputDispatcher:
+    """
+    Sends keys on a background thread in priority order
+    """
+
+    def __init__(self, backend):
+        """
+        Args:
+            backend: Object with a send(key) method, e.g. KeyboardBackend
+        """
+        self.backend = backend
+        self.queue = []  # Heap of (priority, sequence, key, decided)
+        self.sequence = 0
+        self.condition = threading.Condition()
+        self.thread = None
+        self._stop = False
+
+        # Key -> (request time, window) of the last request that was not coalesced
+        self.last_request = {}
+
+        # Statistics
+        self.sent = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+    def submit(self, key, priority=PRIORITY_REGION, window=0.0, now=None):
+        """
+        Queue a key to be sent - call when the decision is made, the
+        decision-to-send latency is measured from here
+
+        Args:
+            key: Key to send
+            priority: PRIORITY_HEALTH, PRIORITY_MANA or PRIORITY_REGION
+            window: Seconds during which further requests for the same key
+                are coalesced into this one, usually the flask cooldown
+            now: Request time on the clock the caller measures its cooldowns
+                with, time.monotonic() if not given
+
+        Returns:
+            False if the request was coalesced into an earlier one
+        """
+        decided = time.perf_counter()
+        if now is None:
+            now = time.monotonic()
+        with self.condition:
+            last = self.last_request.get(key)
+            if last is not None and now - last[0] < last[1]:
+                self.coalesced += 1
+                return False
+            self.last_request[key] = (now, window)
+            if self.thread is None:
+                self._start()
+            heapq.heappush(self.queue, (priority, self.sequence, key, decided))
+            self.sequence += 1
+            self.condition.notify()
+            return True
+
+    def _start(self):
+        self._stop = False
+        self.thread = threading.Thread(target=self.run, name="input-dispatcher")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self, timeout=1.0):
+        """Send what is still queued and stop the dispatcher thread"""
+        with self.condition:
+            self._stop = True
+            self.condition.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+        self.thread = None
+
+    def clear(self):
+        """
+        Drop the keys still queued, e.g. when auto-potion is turned off
+
+        Returns:
+            Number of keys dropped
+        """
+        with self.condition:
+            dropped = len(self.queue)
+            self.queue.clear()
+            return dropped
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self._stop:
+                    self.condition.wait()
+                if not self.queue:
+                    break
+                priority, _, key, decided = heapq.heappop(self.queue)
+            try:
+                self.backend.send(key)
+                self.latencies.append(time.perf_counter() - decided)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Error sending key '{key}': {e}")
+
+    def __len__(self):
+        return len(self.queue)
+
+    def stats(self):
+        """Dispatch counts and decision-to-send latency percentiles (None before the first key)"""
+        latencies = np.array(self.latencies) * 1000.0
+        return {
+            "queued": len(self.queue),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "max_ms": float(latencies.max()) if len(latencies) else None,
+        }
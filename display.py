@@ -0,0 +1,153 @@
+"""
+Console rendering for PoE2-AutoFlask.
+
+The incremental renderer keeps the last frame it drew and only rewrites the
+lines that changed, using ANSI cursor addressing (translated to console
+calls by colorama on Windows). This replaces clearing the whole console -
+which spawns a `cls`/`clear` shell process - on every change.
+"""
+import os
+import sys
+import time
+
+# Render modes
+MODE_INCREMENTAL = "incremental"
+MODE_FULL = "full"
+MODE_NONE = "none"
+RENDER_MODES = (MODE_INCREMENTAL, MODE_FULL, MODE_NONE)
+
+# ANSI control sequences
+CLEAR_SCREEN = "\x1b[2J"
+RESET_STYLE = "\x1b[0m"
+CLEAR_LINE = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+
+
+def move_cursor(row):
+    """Move the cursor to the start of a 1-based screen row"""
+    return f"\x1b[{row};1H"
+
+
+def clear_console():
+    """Clear the console by running the platform's clear command"""
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+
+class BarTemplates:
+    """
+    Preformatted text bars, built once per (fill, color) combination
+    """
+
+    def __init__(self, width=25, filled="#", empty="-", reset=""):
+        """
+        Args:
+            width: Bar width in characters
+            filled, empty: Characters for the filled and empty parts
+            reset: Sequence appended after the bar to reset the color
+        """
+        self.width = width
+        self.filled = filled
+        self.empty = empty
+        self.reset = reset
+        self._cache = {}
+
+    def bar(self, level, color=""):
+        """Text bar for a 0.0-1.0 level in the given color"""
+        filled = max(0, min(self.width, int(self.width * level)))
+        key = (filled, color)
+        text = self._cache.get(key)
+        if text is None:
+            text = f"{color}{self.filled * filled}{self.empty * (self.width - filled)}{self.reset}"
+            self._cache[key] = text
+        return text
+
+
+class ConsoleRenderer:
+    """
+    Draws a list of lines to the console at a capped frame rate
+    """
+
+    def __init__(self, mode=MODE_INCREMENTAL, max_fps=10.0, stream=None):
+        """
+        Args:
+            mode: "incremental" (redraw changed lines), "full" (clear the
+                console and reprint everything on change) or "none"
+            max_fps: Maximum redraws per second
+            stream: Output stream, defaults to sys.stdout
+        """
+        if mode not in RENDER_MODES:
+            mode = MODE_INCREMENTAL
+        self.mode = mode
+        self.frame_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.stream = stream
+        self.lines = None
+
+        # Statistics
+        self.frames_drawn = 0
+        self.lines_written = 0
+        self.bytes_written = 0
+        self.render_seconds = 0.0
+
+    def invalidate(self):
+        """Force a full redraw on the next frame, e.g. after something else printed"""
+        self.lines = None
+
+    def render(self, lines):
+        """
+        Draw a frame if it differs from the previous one
+
+        Args:
+            lines: List of text lines (may contain color codes)
+
+        Returns:
+            True if anything was written
+        """
+        if self.mode == MODE_NONE or lines == self.lines:
+            return False
+
+        start = time.perf_counter()
+        stream = self.stream or sys.stdout
+
+        if self.mode == MODE_FULL:
+            clear_console()
+            out = "\n".join(lines) + "\n"
+            changed = len(lines)
+        else:
+            parts = []
+            previous = self.lines
+            if previous is None:
+                parts.append(CLEAR_SCREEN)
+                previous = []
+
+            # Every line ends with a style reset, so a redrawn line never depends
+            # on colors left active by the lines above it
+            changed = 0
+            for row, line in enumerate(lines):
+                if row >= len(previous) or previous[row] != line:
+                    parts.append(f"{move_cursor(row + 1)}{line}{RESET_STYLE}{CLEAR_LINE}")
+                    changed += 1
+            # Park the cursor below the frame, clearing what's left of a longer one
+            parts.append(move_cursor(len(lines) + 1))
+            if len(lines) < len(previous):
+                parts.append(CLEAR_BELOW)
+            out = "".join(parts)
+
+        stream.write(out)
+        stream.flush()
+        self.lines = list(lines)
+
+        self.frames_drawn += 1
+        self.lines_written += changed
+        self.bytes_written += len(out)
+        self.render_seconds += time.perf_counter() - start
+        return True
+
+    def stats(self):
+        """Rendering statistics since creation"""
+        return {
+            "mode": self.mode,
+            "frames": self.frames_drawn,
+            "lines": self.lines_written,
+            "bytes": self.bytes_written,
+            "seconds": self.render_seconds,
+        }
@@ -0,0 +1,114 @@
+"""
+Event channel between the monitoring threads and the console display.
+
+Monitoring threads publish what the display shows - a bar's level when its
+displayed percentage changes, new messages, a request to redraw - into a
+bounded queue. The display thread blocks on the channel and only wakes when
+something was published, instead of polling on a timer, and it is the only
+thread that touches the state it draws.
+
+When the queue is full the oldest event is dropped and counted. The time
+from publishing an event to the display taking it (the consumer lag) is
+kept for the most recent events.
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Event kinds
+EVENT_LEVEL = "level"  # (name, level) - a bar or region level changed
+EVENT_MESSAGE = "message"  # Formatted message line
+EVENT_REDRAW = "redraw"  # Something else that is displayed changed
+
+DEFAULT_CAPACITY = 1024
+# Number of recent consumer lags kept for statistics
+LAG_HISTORY = 256
+
+
+class EventChannel:
+    """
+    Bounded, thread-safe event queue with a blocking consumer
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        Args:
+            capacity: Maximum events waiting for the consumer
+        """
+        self.capacity = max(1, capacity)
+        self.events = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Statistics
+        self.published = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.wakeups = 0
+        self.lags = deque(maxlen=LAG_HISTORY)
+
+    def publish(self, kind, payload=None):
+        """Queue an event, dropping the oldest one when full"""
+        with self.condition:
+            if len(self.events) >= self.capacity:
+                self.events.popleft()
+                self.dropped += 1
+            self.events.append((kind, payload, time.perf_counter()))
+            self.published += 1
+            self.condition.notify()
+
+    def wait(self, timeout=None):
+        """
+        Block until an event is pending, the channel is closed or the timeout expires
+
+        Args:
+            timeout: Seconds to wait at most, None to wait for an event
+
+        Returns:
+            True if events are pending
+        """
+        with self.condition:
+            if not self.events and not self.closed:
+                self.condition.wait(timeout)
+            self.wakeups += 1
+            return bool(self.events)
+
+    def drain(self):
+        """
+        Take every pending event without blocking
+
+        Returns:
+            List of (kind, payload) in publishing order
+        """
+        with self.condition:
+            events = list(self.events)
+            self.events.clear()
+        now = time.perf_counter()
+        self.lags.extend(now - published for _, _, published in events)
+        self.consumed += len(events)
+        return [(kind, payload) for kind, payload, _ in events]
+
+    def close(self):
+        """Wake the consumer for good, e.g. when the display stops"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __len__(self):
+        return len(self.events)
+
+    def stats(self):
+        """Event counts and consumer lag percentiles (None before the first event)"""
+        lags = np.array(self.lags) * 1000.0
+        return {
+            "published": self.published,
+            "consumed": self.consumed,
+            "dropped": self.dropped,
+            "pending": len(self.events),
+            "wakeups": self.wakeups,
+            "lag_p50_ms": float(np.percentile(lags, 50)) if len(lags) else None,
+            "lag_p95_ms": float(np.percentile(lags, 95)) if len(lags) else None,
+            "lag_max_ms": float(lags.max()) if len(lags) else None,
+        }
@@ -0,0 +1,177 @@
+"""
+Session history for PoE2-AutoFlask.
+
+Keeps the recent readings of every bar and every flask use in fixed-size
+ring buffers backed by NumPy structured arrays, so memory stays constant no
+matter how long a session runs. The buffers can be exported to CSV or NPZ
+for offline analysis (reaction time, wasted flasks, ...).
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+# Decision flags stored with every reading
+FLAG_LOW = 1        # Smoothed level was below the threshold
+FLAG_CONFIRMED = 2  # Trigger verification confirmed the bar is low
+FLAG_USED = 4       # A flask was used on this reading
+FLAG_PREDICTED = 8  # The trend predictor projected the bar below the threshold
+
+READING_DTYPE = np.dtype([
+    ("timestamp", "f8"),  # Controller clock, seconds
+    ("raw", "f4"),        # Measured level before smoothing, NaN without colored pixels
+    ("smoothed", "f4"),   # Level after smoothing
+    ("flags", "u1"),      # FLAG_* bits
+])
+
+EVENT_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("bar", "u1"),        # Index into SessionHistory.bars
+    ("level", "f4"),      # Smoothed level the flask was used at
+])
+
+DEFAULT_CAPACITY = 100000
+DEFAULT_EVENT_CAPACITY = 10000
+
+
+def decision_flags(low, confirmed, used, predicted=False):
+    """Pack the decisions taken on one reading into FLAG_* bits"""
+    return (
+        (FLAG_LOW if low else 0) | (FLAG_CONFIRMED if confirmed else 0) | (FLAG_USED if used else 0)
+        | (FLAG_PREDICTED if predicted else 0)
+    )
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of structured records, overwriting the oldest
+    """
+
+    def __init__(self, dtype, capacity):
+        self.data = np.zeros(max(1, capacity), dtype=dtype)
+        self.count = 0  # Total records ever appended
+        self.lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return len(self.data)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, record):
+        """Append one record given as a tuple in dtype field order"""
+        with self.lock:
+            self.data[self.count % self.capacity] = record
+            self.count += 1
+
+    def snapshot(self):
+        """Copy of the stored records, oldest first"""
+        with self.lock:
+            if self.count <= self.capacity:
+                return self.data[:self.count].copy()
+            start = self.count % self.capacity
+            return np.concatenate((self.data[start:], self.data[:start]))
+
+    def dropped(self):
+        """Number of records overwritten so far"""
+        return max(0, self.count - self.capacity)
+
+    def clear(self):
+        with self.lock:
+            self.count = 0
+
+
+class SessionHistory:
+    """
+    Reading history per bar plus a shared flask event history
+    """
+
+    def __init__(self, bars=("health", "mana"), capacity=DEFAULT_CAPACITY,
+                 event_capacity=DEFAULT_EVENT_CAPACITY):
+        """
+        Args:
+            bars: Names of the recorded bars
+            capacity: Readings kept per bar
+            event_capacity: Flask events kept in total
+        """
+        self.bars = tuple(bars)
+        self.readings = {bar: RingBuffer(READING_DTYPE, capacity) for bar in self.bars}
+        self.events = RingBuffer(EVENT_DTYPE, event_capacity)
+
+    def nbytes(self):
+        """Memory held by all buffers - fixed at construction"""
+        return sum(ring.data.nbytes for ring in self.readings.values()) + self.events.data.nbytes
+
+    def record_reading(self, bar, timestamp, raw, smoothed, flags=0):
+        """
+        Store one reading
+
+        Args:
+            bar: Bar name
+            timestamp: Controller clock time of the reading
+            raw: Measured level before smoothing, or None without colored pixels
+            smoothed: Level after smoothing
+            flags: FLAG_* bits
+        """
+        self.readings[bar].append((timestamp, np.nan if raw is None else raw, smoothed, flags))
+
+    def record_event(self, bar, timestamp, level):
+        """Store one flask use"""
+        self.events.append((timestamp, self.bars.index(bar), level))
+
+    def export_csv(self, directory):
+        """
+        Write readings_<bar>.csv per bar and events.csv
+
+        Returns:
+            List of written file paths
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for bar, ring in self.readings.items():
+            path = os.path.join(directory, f"readings_{bar}.csv")
+            records = ring.snapshot()
+            with open(path, "w") as f:
+                f.write("timestamp,raw,smoothed,low,confirmed,used,predicted\n")
+                for t, raw, smoothed, flags in records.tolist():
+                    f.write(f"{t:.6f},{raw:.4f},{smoothed:.4f},{int(bool(flags & FLAG_LOW))},"
+                            f"{int(bool(flags & FLAG_CONFIRMED))},{int(bool(flags & FLAG_USED))},"
+                            f"{int(bool(flags & FLAG_PREDICTED))}\n")
+            paths.append(path)
+
+        path = os.path.join(directory, "events.csv")
+        with open(path, "w") as f:
+            f.write("timestamp,bar,level\n")
+            for t, bar, level in self.events.snapshot().tolist():
+                f.write(f"{t:.6f},{self.bars[bar]},{level:.4f}\n")
+        paths.append(path)
+        return paths
+
+    def export_npz(self, path):
+        """
+        Write all buffers to one compressed .npz file
+
+        Arrays are named readings_<bar> and events; bar names are stored in "bars".
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        arrays = {f"readings_{bar}": ring.snapshot() for bar, ring in self.readings.items()}
+        np.savez_compressed(path, events=self.events.snapshot(), bars=np.array(self.bars), **arrays)
+        return path
+
+    def export(self, directory, formats=("csv", "npz")):
+        """
+        Export into a new timestamped subdirectory
+
+        Returns:
+            Directory the files were written to
+        """
+        target = os.path.join(directory, time.strftime("%Y%m%d_%H%M%S"))
+        if "csv" in formats:
+            self.export_csv(target)
+        if "npz" in formats:
+            self.export_npz(os.path.join(target, "history.npz"))
+        return target
@@ -0,0 +1,146 @@
+"""
+Per-bar monitoring pipelines for PoE2-AutoFlask.
+
+Every monitored bar runs its own capture -> classify -> decide -> act loop on
+its own thread and schedule, so a slow grab, error or blocking keypress on
+one bar never delays another bar's next reading.
+"""
+import logging
+import threading
+import time
+import traceback
+from collections import deque
+
+import numpy as np
+
+# Number of recent cycle latencies kept for statistics
+LATENCY_HISTORY = 256
+# Pause after a failed cycle before trying again
+ERROR_BACKOFF = 1.0
+# Longest wait for a stopped thread to finish its last cycle before a restart
+RESTART_TIMEOUT = 1.0
+
+
+class BarPipeline:
+    """
+    Monitoring loop for a single bar
+    """
+
+    def __init__(self, name, capture, check, scheduler, publish=None, on_error=None):
+        """
+        Args:
+            name: Bar name, e.g. "health"
+            capture: Callable returning the bar's RGB frame (or None)
+            check: Callable taking the frame, deciding/acting, returning the level
+            scheduler: AdaptiveScheduler deciding when the next sample is due
+            publish: Optional callable receiving each new level
+            on_error: Optional callable receiving exceptions from a cycle
+        """
+        self.name = name
+        self.capture = capture
+        self.check = check
+        self.scheduler = scheduler
+        self.publish = publish
+        self.on_error = on_error
+
+        # Latest reading, published as one (level, monotonic time) tuple so
+        # readers on other threads always see a consistent pair
+        self.reading = (None, 0.0)
+        self.cycles = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+        # Every thread gets its own stop event, so a thread that is still
+        # finishing its last cycle never sees the event of the next one
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """
+        Start the pipeline thread unless it is already running
+
+        Safe to call from several threads: a thread that was asked to stop
+        is waited for before the new one starts, and only one starts.
+        """
+        with self._lock:
+            thread = self.thread
+            if thread is not None and thread.is_alive():
+                if not self._stop.is_set():
+                    return
+                if thread is not threading.current_thread():
+                    thread.join(RESTART_TIMEOUT)
+                    if thread.is_alive():
+                        logging.warning(f"{self.name} pipeline still finishing its last cycle - starting anyway")
+            self._stop = threading.Event()
+            self.scheduler.reset()
+            self.thread = threading.Thread(target=self.run, args=(self._stop,), name=f"{self.name}-pipeline")
+            self.thread.daemon = True
+            self.thread.start()
+        logging.info(f"{self.name} pipeline started")
+
+    def stop(self, timeout=1.0):
+        """Ask the pipeline thread to stop and wait for it briefly"""
+        with self._lock:
+            self._stop.set()
+            thread = self.thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self, stop=None):
+        """
+        Pipeline loop - runs until stop() is called
+
+        Args:
+            stop: Stop event of this thread, the current one if not given
+        """
+        if stop is None:
+            stop = self._stop
+        while not stop.is_set():
+            try:
+                delay = self.scheduler.next_due - time.monotonic()
+                if delay > 0 and stop.wait(delay):
+                    break
+                self.run_cycle()
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Error in {self.name} pipeline: {e}")
+                logging.error(traceback.format_exc())
+                if self.on_error:
+                    self.on_error(e)
+                stop.wait(ERROR_BACKOFF)
+        logging.info(f"{self.name} pipeline stopped")
+
+    def run_cycle(self):
+        """Capture, check and publish one reading"""
+        start = time.monotonic()
+        frame = self.capture()
+        level = self.check(frame)
+        end = time.monotonic()
+
+        self.reading = (level, end)
+        if self.publish:
+            self.publish(level)
+        self.scheduler.update(level, start)
+        self.latencies.append(end - start)
+        self.cycles += 1
+        return level
+
+    def latency_stats(self):
+        """
+        Capture-to-decision latency of recent cycles
+
+        Returns:
+            Dict with p50/p95/max latency in milliseconds, or None without data
+        """
+        if not self.latencies:
+            return None
+        samples = np.array(self.latencies) * 1000.0
+        return {
+            "p50_ms": float(np.percentile(samples, 50)),
+            "p95_ms": float(np.percentile(samples, 95)),
+            "max_ms": float(samples.max()),
+        }
@@ -0,0 +1,107 @@
+"""
+Calibration profiles for PoE2-AutoFlask.
+
+Bar positions are stored per display setup in config sections named
+"Profile <width>x<height>@<ui scale>", e.g. [Profile 2560x1440@1.25], as
+exact pixel boxes for that resolution. All profiles are parsed once when
+loaded, so switching to another display setup is a dictionary lookup.
+"""
+import logging
+import os
+
+PROFILE_PREFIX = "Profile "
+BAR_KEYS = {"health": "health_bar", "mana": "mana_bar"}
+
+
+def profile_key(width, height, ui_scale=1.0):
+    """Profile name for a display setup, e.g. "2560x1440@1.25" """
+    return f"{width}x{height}@{ui_scale:.2f}"
+
+
+def parse_profile_key(key):
+    """(width, height, ui_scale) from a profile name"""
+    size, scale = key.split("@")
+    width, height = size.lower().split("x")
+    return int(width), int(height), float(scale)
+
+
+def detect_ui_scale():
+    """Operating system display scaling (1.0 = 100%), 1.0 where it can't be read"""
+    if os.name == "nt":
+        try:
+            import ctypes
+            return ctypes.windll.shcore.GetScaleFactorForDevice(0) / 100.0
+        except Exception as e:
+            logging.debug(f"Could not read display scaling: {e}")
+    return 1.0
+
+
+def to_pixels(pos_str, width, height):
+    """
+    Convert a normalized "x1,y1,x2,y2" position string to a pixel box
+
+    Returns:
+        (x1, y1, x2, y2) clamped to the screen, at least 5x10 pixels
+    """
+    x1, y1, x2, y2 = map(float, pos_str.split(","))
+    x1_px = max(0, min(int(x1 * width), width))
+    y1_px = max(0, min(int(y1 * height), height))
+    x2_px = max(0, min(int(x2 * width), width))
+    y2_px = max(0, min(int(y2 * height), height))
+
+    # Ensure valid rectangle
+    if x1_px >= x2_px:
+        x2_px = x1_px + 5
+    if y1_px >= y2_px:
+        y2_px = y1_px + 10
+
+    return (x1_px, y1_px, x2_px, y2_px)
+
+
+def to_normalized(bbox, width, height):
+    """Convert a pixel box to a normalized "x1,y1,x2,y2" position string"""
+    x1, y1, x2, y2 = bbox
+    return f"{x1 / width:.4f},{y1 / height:.4f},{x2 / width:.4f},{y2 / height:.4f}"
+
+
+class ProfileStore:
+    """
+    Calibrated bar regions per display setup
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config: ConfigParser holding the "Profile ..." sections
+        """
+        self.config = config
+        self.regions = {}
+        for section in config.sections():
+            if not section.startswith(PROFILE_PREFIX):
+                continue
+            key = section[len(PROFILE_PREFIX):]
+            try:
+                parse_profile_key(key)
+                self.regions[key] = {
+                    bar: tuple(int(v) for v in config[section][option].split(","))
+                    for bar, option in BAR_KEYS.items()
+                }
+            except Exception as e:
+                logging.error(f"Ignoring calibration profile '{key}': {e}")
+
+    def get(self, key):
+        """Pixel regions of a profile, or None if the setup was never calibrated"""
+        return self.regions.get(key)
+
+    def save(self, key, regions):
+        """
+        Store the pixel regions for a display setup in the config
+
+        Args:
+            key: Profile name from profile_key()
+            regions: Dict of "health"/"mana" -> (x1, y1, x2, y2) pixel box
+        """
+        self.config[PROFILE_PREFIX + key] = {
+            option: ",".join(str(int(v)) for v in regions[bar]) for bar, option in BAR_KEYS.items()
+        }
+        self.regions[key] = {bar: tuple(int(v) for v in regions[bar]) for bar in BAR_KEYS}
@@ -0,0 +1,285 @@
+"""
+Frame recording and replay for PoE2-AutoFlask.
+
+A recording is a directory holding every captured bar region of a session:
+
+    meta.json                  Region names, screen boxes and frame shapes
+    segment_0000_index.npy     (timestamp, region, slot) entry per frame
+    segment_0000_health.npy    (N, height, width, 3) uint8 health frames
+    segment_0000_mana.npy      (N, height, width, 3) uint8 mana frames
+    ...
+
+Segments are fixed-size memory-mapped .npy files, so recording is a memory
+copy into the page cache and a multi-hour session never needs to be held in
+memory or rewritten. Unused entries at the end of a segment keep a zero
+timestamp, which lets a recording cut short by a crash still be read back.
+
+Run `python recording.py <recording dir>` to replay a recording through the
+detectors as fast as the CPU allows.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+RECORDING_VERSION = 1
+DEFAULT_SEGMENT_FRAMES = 4096
+
+INDEX_DTYPE = np.dtype([("timestamp", "<f8"), ("region", "<u2"), ("slot", "<u4")])
+
+
+class FrameRecorder:
+    """
+    Appends captured region frames to a memory-mapped recording on disk
+    """
+
+    def __init__(self, path, regions, shapes, segment_frames=DEFAULT_SEGMENT_FRAMES):
+        """
+        Args:
+            path: Recording directory to create
+            regions: Dict of region name -> (x1, y1, x2, y2) screen box
+            shapes: Dict of region name -> (height, width) of its frames
+            segment_frames: Frames per region held by one segment file
+        """
+        self.path = path
+        self.names = list(regions)
+        self.region_ids = {name: i for i, name in enumerate(self.names)}
+        self.shapes = {name: (int(shapes[name][0]), int(shapes[name][1]), 3) for name in self.names}
+        self.segment_frames = segment_frames
+        self.frames_written = 0
+        self.frames_skipped = 0
+        self._lock = threading.Lock()
+        self._segment = -1
+        self._index = None
+        self._arrays = {}
+        self._entries = 0
+        self._slots = {}
+
+        os.makedirs(path, exist_ok=True)
+        meta = {
+            "version": RECORDING_VERSION,
+            "created": time.time(),
+            "regions": [
+                {"name": name, "bbox": list(regions[name]), "shape": list(self.shapes[name])}
+                for name in self.names
+            ],
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+        self._open_segment()
+        logging.info(f"Recording frames to {path}")
+
+    def _segment_file(self, name):
+        return os.path.join(self.path, f"segment_{self._segment:04d}_{name}.npy")
+
+    def _open_segment(self):
+        """Flush the current segment and start a new one"""
+        self._flush_segment()
+        self._segment += 1
+        open_memmap = np.lib.format.open_memmap
+        self._index = open_memmap(
+            self._segment_file("index"), mode="w+", dtype=INDEX_DTYPE,
+            shape=(self.segment_frames * len(self.names),)
+        )
+        self._arrays = {
+            name: open_memmap(
+                self._segment_file(name), mode="w+", dtype=np.uint8,
+                shape=(self.segment_frames,) + self.shapes[name]
+            )
+            for name in self.names
+        }
+        self._entries = 0
+        self._slots = {name: 0 for name in self.names}
+
+    def _flush_segment(self):
+        if self._index is not None:
+            self._index.flush()
+            for array in self._arrays.values():
+                array.flush()
+
+    def record(self, frames, timestamp=None):
+        """
+        Append one cycle's frames
+
+        Args:
+            frames: Dict of region name -> (height, width, 3) uint8 array
+            timestamp: Capture time, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            if self._index is None:
+                return
+            for name, frame in frames.items():
+                region_id = self.region_ids.get(name)
+                if region_id is None or frame is None or frame.shape != self.shapes[name]:
+                    self.frames_skipped += 1
+                    continue
+
+                if self._slots[name] >= self.segment_frames:
+                    self._open_segment()
+
+                slot = self._slots[name]
+                self._arrays[name][slot] = frame
+                self._index[self._entries] = (timestamp, region_id, slot)
+                self._slots[name] = slot + 1
+                self._entries += 1
+                self.frames_written += 1
+
+    def close(self):
+        """Flush and close the recording"""
+        with self._lock:
+            self._flush_segment()
+            self._index = None
+            self._arrays = {}
+        logging.info(
+            f"Recording closed: {self.frames_written} frames written, "
+            f"{self.frames_skipped} skipped ({self.path})"
+        )
+
+
+class FrameRecording:
+    """
+    Read-only, memory-mapped view of a recording directory
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.names = [region["name"] for region in self.meta["regions"]]
+        self.regions = {region["name"]: tuple(region["bbox"]) for region in self.meta["regions"]}
+
+        self.segments = []
+        for index_file in sorted(glob.glob(os.path.join(path, "segment_*_index.npy"))):
+            prefix = index_file[:-len("index.npy")]
+            index = np.load(index_file, mmap_mode="r")
+            # Unwritten entries keep a zero timestamp
+            used = int(np.count_nonzero(index["timestamp"]))
+            arrays = {name: np.load(f"{prefix}{name}.npy", mmap_mode="r") for name in self.names}
+            self.segments.append((index[:used], arrays))
+
+    def __len__(self):
+        return sum(len(index) for index, _ in self.segments)
+
+    def frames(self):
+        """Yield (timestamp, region name, frame) for every recorded frame in order"""
+        for index, arrays in self.segments:
+            for timestamp, region_id, slot in index:
+                name = self.names[region_id]
+                yield float(timestamp), name, arrays[name][slot]
+
+    def cycles(self):
+        """Yield (timestamp, {region name: frame}) grouped by capture time"""
+        current_time = None
+        current = {}
+        for timestamp, name, frame in self.frames():
+            if current and timestamp != current_time:
+                yield current_time, current
+                current = {}
+            current_time = timestamp
+            current[name] = frame
+        if current:
+            yield current_time, current
+
+
+def replay_recording(controller, path):
+    """
+    Stream a recording through the controller's detectors as fast as possible
+
+    The controller's clock follows the recorded timestamps so cooldowns behave
+    as they did live, and it runs in dry-run mode so no keys are pressed.
+
+    Args:
+        controller: AutoPotController to drive
+        path: Recording directory
+
+    Returns:
+        Dict with per-cycle readings and replay statistics
+    """
+    recording = FrameRecording(path)
+    timestamps, health, mana = [], [], []
+    potions = {"health": 0, "mana": 0}
+
+    saved_clock, saved_dry_run = controller.clock, controller.dry_run
+    replay_time = [0.0]
+    controller.clock = lambda: replay_time[0]
+    controller.dry_run = True
+    start = time.perf_counter()
+    try:
+        for timestamp, frames in recording.cycles():
+            replay_time[0] = timestamp
+            health_used, mana_used = controller.health_last_used, controller.mana_last_used
+
+            for name in ("health", "mana"):
+                if name in frames:
+                    setattr(controller, f"current_{name}", controller.check_bar_level(name, frames[name]))
+
+            potions["health"] += controller.health_last_used != health_used
+            potions["mana"] += controller.mana_last_used != mana_used
+            timestamps.append(timestamp)
+            health.append(controller.current_health)
+            mana.append(controller.current_mana)
+    finally:
+        controller.clock, controller.dry_run = saved_clock, saved_dry_run
+    elapsed = time.perf_counter() - start
+
+    cycles = len(timestamps)
+    duration = timestamps[-1] - timestamps[0] if cycles > 1 else 0.0
+    return {
+        "timestamps": np.array(timestamps),
+        "health": np.array(health),
+        "mana": np.array(mana),
+        "potions": potions,
+        "cycles": cycles,
+        "recorded_seconds": duration,
+        "replay_seconds": elapsed,
+        "cycles_per_second": cycles / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    """Replay a recording and print a summary"""
+    parser = argparse.ArgumentParser(description="Replay a PoE2-AutoFlask frame recording")
+    parser.add_argument("path", help="Recording directory")
+    parser.add_argument("--health-threshold", type=float, help="Override the health threshold")
+    parser.add_argument("--mana-threshold", type=float, help="Override the mana threshold")
+    parser.add_argument("--prediction", choices=["off", "shadow", "on"],
+                        help="Override the predictive triggering mode")
+    parser.add_argument("--export-history", metavar="DIR",
+                        help="Export the replayed readings and flask events to this directory")
+    args = parser.parse_args()
+
+    from autopot import AutoPotController
+
+    controller = AutoPotController(interactive=False)
+    controller.debug_mode = False
+    if args.health_threshold is not None:
+        controller.health_threshold = args.health_threshold
+    if args.mana_threshold is not None:
+        controller.mana_threshold = args.mana_threshold
+    if args.prediction is not None:
+        controller.prediction_mode = args.prediction
+
+    result = replay_recording(controller, args.path)
+    print(f"Replayed {result['cycles']} cycles ({result['recorded_seconds']:.1f}s of gameplay) "
+          f"in {result['replay_seconds']:.2f}s - {result['cycles_per_second']:.0f} cycles/s")
+    print(f"Health potions: {result['potions']['health']} | Mana potions: {result['potions']['mana']}")
+    if result["cycles"]:
+        print(f"Health min/mean: {result['health'].min():.0%}/{result['health'].mean():.0%} | "
+              f"Mana min/mean: {result['mana'].min():.0%}/{result['mana'].mean():.0%}")
+    if controller.prediction_mode != "off":
+        for name, predictor in (("Health", controller.health_predictor), ("Mana", controller.mana_predictor)):
+            print(f"{name} prediction: {controller.format_prediction_stats(predictor.stats())}")
+    if args.export_history:
+        print(f"History exported to {controller.history.export(args.export_history)}")
+
+
+if __name__ == "__main__":
+    main()
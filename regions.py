@@ -0,0 +1,377 @@
+"""
+Region registry for PoE2-AutoFlask.
+
+Besides the health and mana bars, any number of extra screen regions can be
+monitored - energy shield, a second life flask, charge or buff indicators -
+each declared in its own config section:
+
+    [Region energy_shield]
+    position = 0.10,0.90,0.11,0.98
+    color = hsv:180-220,0.3,0.4
+    threshold = 0.5
+    key = 3
+    cooldown = 4.0
+    trigger = below
+
+All regions are grabbed together and classified in one batched array pass
+(RegionBatch), so the cost of a monitoring cycle grows much more slowly
+than the number of regions.
+"""
+import logging
+import re
+
+import numpy as np
+
+import detection
+from capture import CapturePlanner
+from profiles import to_pixels
+
+REGION_PREFIX = "Region "
+
+# When a region's key is pressed
+TRIGGER_BELOW = "below"  # The level drops below the threshold, like a flask
+TRIGGER_ABOVE = "above"  # The level rises above the threshold, e.g. a full charge bar
+TRIGGERS = (TRIGGER_BELOW, TRIGGER_ABOVE)
+
+COLOR_CHANNELS = {"red": detection.RED, "green": detection.GREEN, "blue": detection.BLUE}
+
+
+_color_models = {}
+
+
+def color_model(spec, bits=detection.DEFAULT_LUT_BITS, cache_dir=None):
+    """
+    Classifiers for a region's color model
+
+    Args:
+        spec: "health" or "mana" (the bar classifiers), "red", "green" or
+            "blue" (dominant channel), or "hsv:<hue from>-<hue to>[,<min
+            saturation>[,<min value>]]", e.g. "hsv:180-220,0.3,0.4"
+        bits: Lookup table bits
+        cache_dir: Lookup table cache directory
+
+    Returns:
+        (color, presence) ColorClassifiers - the second is the stricter
+        "any colored pixel" check
+    """
+    spec = spec.strip().lower()
+    if spec in ("health", "mana"):
+        return detection.get_classifier(spec), detection.get_classifier(f"{spec}_presence")
+
+    # Regions sharing a color model share its lookup tables
+    model = _color_models.get((spec, bits))
+    if model is not None:
+        return model
+
+    # Classifier names end up in lookup table cache file names
+    name = "region_" + re.sub(r"[^a-z0-9]+", "_", spec).strip("_")
+    if spec in COLOR_CHANNELS:
+        channel = COLOR_CHANNELS[spec]
+        color = detection.channel_classifier(name, channel, detection.COUNT_RATIO, bits=bits, cache_dir=cache_dir)
+        presence = detection.channel_classifier(
+            f"{name}_presence", channel, detection.PRESENCE_RATIO, bits=bits, cache_dir=cache_dir
+        )
+    elif spec.startswith("hsv:"):
+        parts = spec[4:].split(",")
+        hue = tuple(float(h) for h in parts[0].split("-"))
+        if len(hue) != 2:
+            raise ValueError(f"HSV color model needs a hue range, got '{parts[0]}'")
+        saturation = (float(parts[1]) if len(parts) > 1 else 0.0, 1.0)
+        value = (float(parts[2]) if len(parts) > 2 else 0.0, 1.0)
+        # The HSV range is already strict, so it also serves as the presence check
+        color = presence = detection.ColorClassifier.from_hsv(
+            name, hue, saturation, value, bits=bits, cache_dir=cache_dir
+        )
+    else:
+        raise ValueError(f"Unknown color model '{spec}'")
+
+    _color_models[(spec, bits)] = (color, presence)
+    return color, presence
+
+
+class RegionSpec:
+    """
+    One monitored region and its trigger state
+    """
+
+    def __init__(self, name, position, color, presence, threshold, key=None, cooldown=0.0,
+                 trigger=TRIGGER_BELOW):
+        """
+        Args:
+            name: Region name, from the section name
+            position: Normalized "x1,y1,x2,y2" position string
+            color: ColorClassifier for the region's fill color
+            presence: ColorClassifier for the "any colored pixel" check
+            threshold: Level at which the key is pressed
+            key: Key to press, or None to only monitor the region
+            cooldown: Seconds between presses
+            trigger: "below" or "above"
+        """
+        self.name = name
+        self.position = position
+        self.color = color
+        self.presence = presence
+        self.threshold = threshold
+        self.key = key
+        self.cooldown = cooldown
+        self.trigger = trigger
+
+        # Updated by the controller every cycle
+        self.level = 1.0
+        self.last_used = 0.0
+        self.confirmation = None
+
+    def is_triggered(self, level):
+        """Whether a level is on the trigger side of the threshold"""
+        if self.trigger == TRIGGER_ABOVE:
+            return level > self.threshold
+        return level < self.threshold
+
+    def margin(self, level):
+        """Distance of a level from triggering, negative once triggered"""
+        if self.trigger == TRIGGER_ABOVE:
+            return self.threshold - level
+        return level - self.threshold
+
+
+def load_regions(config, bits=detection.DEFAULT_LUT_BITS, cache_dir=None):
+    """
+    Read every [Region <name>] section
+
+    Sections that can't be parsed are logged and skipped.
+
+    Returns:
+        List of RegionSpec in config order
+    """
+    regions = []
+    for section in config.sections():
+        if not section.startswith(REGION_PREFIX):
+            continue
+        name = section[len(REGION_PREFIX):].strip()
+        options = config[section]
+        try:
+            if not options.getboolean("enabled", fallback=True):
+                continue
+            position = options["position"]
+            to_pixels(position, 1920, 1080)  # Validate the format
+            color, presence = color_model(options.get("color", "red"), bits, cache_dir)
+            trigger = options.get("trigger", TRIGGER_BELOW).strip().lower()
+            if trigger not in TRIGGERS:
+                raise ValueError(f"unknown trigger '{trigger}'")
+            regions.append(RegionSpec(
+                name,
+                position,
+                color,
+                presence,
+                threshold=options.getfloat("threshold", fallback=0.5),
+                key=options.get("key", "").strip() or None,
+                cooldown=options.getfloat("cooldown", fallback=0.0),
+                trigger=trigger
+            ))
+        except Exception as e:
+            logging.error(f"Ignoring region '{name}': {e}")
+    return regions
+
+
+class RegionBatch:
+    """
+    Measures the levels of many regions from one capture and one array pass
+
+    A cycle copies every region's pixels out of the planned grab into one
+    array, quantizes them once and classifies them with a single lookup
+    into the regions' tables stacked end to end (bit 0 of an entry is the
+    fill color, bit 1 the stricter presence check). Every row of every
+    region is then summed with one np.add.reduceat, and the liquid surface
+    of all regions is found together by detection.profile_fill_levels.
+    read() grabs the regions itself, read_frames() takes them from a grab
+    shared with the health and mana bars.
+    """
+
+    def __init__(self, regions, method="profile", capture_mode="auto", source=None, columns=0):
+        """
+        Args:
+            regions: RegionSpec list
+            method: "profile" or "count", as for the health and mana bars
+            capture_mode: CapturePlanner mode for grabbing the regions
+            source: FrameSource to grab from
+            columns: With "profile", measure only this many center columns
+                of wider regions (0 for all)
+        """
+        self.regions = list(regions)
+        self.method = method
+        self.columns = columns
+        self.planner = CapturePlanner(mode=capture_mode, source=source)
+        self._layout = None
+
+        bits = {r.color.bits for r in self.regions} | {r.presence.bits for r in self.regions}
+        if len(bits) > 1:
+            raise ValueError(f"Region color models use different lookup table bits: {sorted(bits)}")
+        self.bits = bits.pop() if bits else detection.DEFAULT_LUT_BITS
+
+        # One table per distinct color model, stacked end to end
+        tables, self.table_ids, models = [], [], {}
+        for region in self.regions:
+            model = (id(region.color), id(region.presence))
+            if model not in models:
+                models[model] = len(tables)
+                tables.append(region.color.table.astype(np.uint8) | (region.presence.table.astype(np.uint8) << 1))
+            self.table_ids.append(models[model])
+        self.table = np.concatenate(tables) if tables else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.regions)
+
+    @property
+    def boxes(self):
+        """Region name -> (x1, y1, x2, y2) pixel box that is measured"""
+        return self.planner.regions
+
+    @property
+    def capture_boxes(self):
+        """Measured boxes keyed by capture name, for a planner shared with other regions"""
+        return {REGION_PREFIX + name: bbox for name, bbox in self.boxes.items()}
+
+    def place(self, width, height):
+        """Convert the regions' normalized positions for a screen size"""
+        self.set_boxes({r.name: to_pixels(r.position, width, height) for r in self.regions})
+
+    def set_boxes(self, boxes):
+        """
+        Set the pixel boxes and rebuild the layout
+
+        The layout is swapped as a single object, so a read on another
+        thread uses either the old or the new boxes.
+        """
+        if not self.regions:
+            return
+        measured = {}
+        for region in self.regions:
+            x1, y1, x2, y2 = boxes[region.name]
+            # As for health and mana, the row profile only needs a few center columns
+            if self.method == "profile" and 0 < self.columns < x2 - x1:
+                x1 = (x1 + x2) // 2 - self.columns // 2
+                x2 = x1 + self.columns
+            measured[region.name] = (x1, y1, x2, y2)
+        self.planner.set_regions(measured)
+
+        table_size = 1 << (3 * self.bits)
+        order = {r.name: i for i, r in enumerate(self.regions)}
+        max_height = max(y2 - y1 for x1, y1, x2, y2 in measured.values())
+        grabs, offsets = [], []
+        row_starts, row_widths, pad_positions = [], [], []
+        region_starts, areas, heights = [], [], []
+        start = 0
+        # Plans keep the regions in config order, so results come out in that order too
+        for bbox, names in self.planner.plan():
+            slices = []
+            for name in names:
+                x1, y1, x2, y2 = measured[name]
+                height, width = y2 - y1, x2 - x1
+                area = height * width
+                slices.append((name, y1 - bbox[1], y2 - bbox[1], x1 - bbox[0], x2 - bbox[0], start, start + area))
+
+                offsets.append(np.full(area, self.table_ids[order[name]] * table_size, dtype=np.uint32))
+                row_starts.append(start + np.arange(height) * width)
+                row_widths.append(np.full(height, width))
+                # Regions sit at the bottom of their row of the profile matrix
+                pad_positions.append(len(region_starts) * max_height + max_height - height + np.arange(height))
+                region_starts.append(start)
+                areas.append(area)
+                heights.append(height)
+                start += area
+            grabs.append((bbox, slices))
+
+        self._layout = (
+            grabs,
+            start,
+            # Regions sharing one color model need no table offsets
+            np.concatenate(offsets) if len(set(self.table_ids)) > 1 else None,
+            np.concatenate(row_starts),
+            np.concatenate(row_widths).astype(np.float64),
+            np.concatenate(pad_positions),
+            np.array(region_starts),
+            np.array(areas),
+            np.array(heights),
+            max_height,
+        )
+
+    def read(self):
+        """
+        Grab and measure every region
+
+        Returns:
+            (levels, present) arrays in region order - present is False for
+            regions without any colored pixel - or None if a grab failed
+        """
+        layout = self._layout
+        if layout is None:
+            return None
+        source = self.planner.source
+        pixels = np.empty((layout[1], 3), dtype=np.uint8)
+        for bbox, slices in layout[0]:
+            frame = source.grab(bbox)
+            if frame is None or frame.size == 0:
+                logging.warning(f"Failed to capture region batch {bbox}")
+                return None
+            for _, top, bottom, left, right, start, end in slices:
+                pixels[start:end].reshape(bottom - top, right - left, 3)[...] = frame[top:bottom, left:right, :3]
+        return self.measure(pixels, layout)
+
+    def read_frames(self, frames):
+        """
+        Measure every region from frames grabbed elsewhere, e.g. the grab
+        the regions share with the health and mana bars
+
+        Args:
+            frames: Dict of capture name -> RGB array of exactly that box,
+                with the regions under the names of capture_boxes
+
+        Returns:
+            (levels, present) arrays in region order, or None if a region's
+            frame is missing or doesn't match its box
+        """
+        layout = self._layout
+        if layout is None:
+            return None
+        pixels = np.empty((layout[1], 3), dtype=np.uint8)
+        for _, slices in layout[0]:
+            for name, top, bottom, left, right, start, end in slices:
+                frame = frames.get(REGION_PREFIX + name)
+                if frame is None or frame.shape[:2] != (bottom - top, right - left):
+                    logging.warning(f"No frame for region {name}")
+                    return None
+                pixels[start:end].reshape(bottom - top, right - left, 3)[...] = frame[..., :3]
+        return self.measure(pixels, layout)
+
+    def measure(self, pixels, layout=None):
+        """
+        Measure gathered region pixels
+
+        Args:
+            pixels: (pixels, 3) RGB array, every region's pixels row by row
+            layout: Layout the pixels were gathered with, the current one if not given
+
+        Returns:
+            (levels, present) arrays in region order
+        """
+        (_, _, offsets, row_starts, row_widths, pad_positions,
+         region_starts, areas, heights, max_height) = layout or self._layout
+
+        index = detection.quantize(pixels, self.bits)
+        if offsets is not None:
+            # quantize() returns uint16 for small tables, too narrow for
+            # indexes into the stacked tables
+            index = index.astype(np.uint32)
+            index += offsets
+        classes = self.table.take(index)
+        # Any entry with the presence bit set
+        present = np.maximum.reduceat(classes, region_starts) >= 2
+        colored = classes & 1
+
+        if self.method == "count":
+            levels = detection.count_fill_level(np.add.reduceat(colored, region_starts, dtype=np.int64), areas)
+        else:
+            profiles = np.zeros(len(areas) * max_height)
+            profiles[pad_positions] = np.add.reduceat(colored, row_starts, dtype=np.int64) / row_widths
+            levels = detection.profile_fill_levels(profiles.reshape(len(areas), max_height), heights)
+        return levels, present
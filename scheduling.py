@@ -0,0 +1,113 @@
+"""
+Adaptive polling for PoE2-AutoFlask.
+
+Each bar gets its own sampling schedule: it is checked rarely while it is
+full and stable, and more often as it gets close to its threshold or drops
+quickly towards it. All times are time.monotonic() seconds.
+"""
+import time
+from collections import deque
+
+DEFAULT_MIN_INTERVAL = 0.05
+DEFAULT_MAX_INTERVAL = 0.5
+# Distance above the threshold at which a bar counts as completely safe
+DEFAULT_SAFE_MARGIN = 0.3
+# Sample at least this many times before a falling bar is projected to hit its threshold
+SAMPLES_BEFORE_THRESHOLD = 4
+# Smoothing applied to the measured rate of change
+SLOPE_SMOOTHING = 0.5
+# Window used for the effective sample rate
+RATE_WINDOW = 10.0
+
+
+class AdaptiveScheduler:
+    """
+    Picks the next sample time for one bar from its level, slope and threshold
+    """
+
+    def __init__(self, threshold, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, safe_margin=DEFAULT_SAFE_MARGIN):
+        """
+        Args:
+            threshold: Level (0.0-1.0) at which the bar's flask is used
+            min_interval: Shortest time between samples, in seconds
+            max_interval: Longest time between samples, in seconds
+            safe_margin: Distance above the threshold where max_interval applies
+        """
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.safe_margin = safe_margin
+
+        self.next_due = 0.0
+        self.interval = min_interval
+        self.slope = 0.0
+        self.last_level = None
+        self.last_time = None
+        self.samples = deque()
+
+    def next_interval(self, level):
+        """Interval until the next sample for a bar at the given level"""
+        margin = level - self.threshold
+        if margin <= 0:
+            return self.min_interval
+
+        # Scale with the distance to the threshold
+        span = self.max_interval - self.min_interval
+        interval = self.min_interval + span * min(1.0, margin / self.safe_margin)
+
+        # If falling, make sure we sample several times before crossing it
+        if self.slope < 0:
+            time_to_threshold = margin / -self.slope
+            interval = min(interval, time_to_threshold / SAMPLES_BEFORE_THRESHOLD)
+
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def update(self, level, now=None):
+        """
+        Record a sample and schedule the next one
+
+        Args:
+            level: Bar level just measured
+            now: time.monotonic() of the sample
+
+        Returns:
+            Monotonic time the next sample is due
+        """
+        if now is None:
+            now = time.monotonic()
+
+        if self.last_time is not None and now > self.last_time:
+            slope = (level - self.last_level) / (now - self.last_time)
+            self.slope = SLOPE_SMOOTHING * slope + (1 - SLOPE_SMOOTHING) * self.slope
+        self.last_level = level
+        self.last_time = now
+
+        self.samples.append(now)
+        while self.samples and now - self.samples[0] > RATE_WINDOW:
+            self.samples.popleft()
+
+        self.interval = self.next_interval(level)
+        self.next_due = now + self.interval
+        return self.next_due
+
+    def sample_rate(self, now=None):
+        """Effective samples per second over the last RATE_WINDOW seconds"""
+        if now is None:
+            now = time.monotonic()
+        # The pipeline thread appends while other threads read the rate, so
+        # iterate over a snapshot - copying a deque doesn't release the GIL
+        samples = tuple(self.samples)
+        recent = [t for t in samples if now - t <= RATE_WINDOW]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-6)
+
+    def reset(self):
+        """Forget history and make the bar due immediately"""
+        self.next_due = 0.0
+        self.interval = self.min_interval
+        self.slope = 0.0
+        self.last_level = None
+        self.last_time = None
+        self.samples.clear()
@@ -0,0 +1,201 @@
+"""
+Live settings for PoE2-AutoFlask.
+
+The values the monitoring threads use on every check - thresholds, flask
+keys, cooldowns, verification, polling and prediction settings - are held
+in one immutable Settings snapshot. The controller keeps a single reference
+to the current snapshot and every check reads that reference once, so a
+config reload only has to build and validate a complete new snapshot and
+swap the reference: readers never take a lock and never see a half-applied
+config.
+
+ConfigWatcher notices edits to the config file from its modification time
+and size, at most once per check interval.
+"""
+import logging
+import os
+import time
+from collections import namedtuple
+
+from triggers import PREDICTION_MODES
+
+CONFIG_PATH = "poe2_autopot_config.ini"
+
+# Sections only read at startup - changes to them need a restart
+STARTUP_SECTIONS = ("Capture", "Detection", "Display", "Logging", "History", "Calibration", "Input", "Control")
+STARTUP_PREFIXES = ("Region ",)
+
+# (field, section, option, type, default)
+FIELDS = (
+    ("health_threshold", "Thresholds", "health", float, 0.35),
+    ("mana_threshold", "Thresholds", "mana", float, 0.25),
+    ("health_potion_key", "Hotkeys", "health_potion", str, "1"),
+    ("mana_potion_key", "Hotkeys", "mana_potion", str, "2"),
+    ("health_cooldown", "Cooldowns", "health_potion", float, 4.0),
+    ("mana_cooldown", "Cooldowns", "mana_potion", float, 7.0),
+    ("confirm_frames", "Verification", "confirm_frames", int, 2),
+    ("window_frames", "Verification", "window_frames", int, 3),
+    ("min_poll_interval", "Polling", "min_interval", float, 0.05),
+    ("max_poll_interval", "Polling", "max_interval", float, 0.5),
+    ("poll_safe_margin", "Polling", "safe_margin", float, 0.3),
+    ("prediction_mode", "Prediction", "mode", str, "off"),
+    ("prediction_latency", "Prediction", "latency", str, "auto"),
+)
+
+
+class Settings(namedtuple("Settings", [field[0] for field in FIELDS])):
+    """
+    Immutable snapshot of the live settings
+
+    prediction_latency is None for "auto", otherwise seconds.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build a snapshot from a ConfigParser
+
+        Values that are missing use their default. Values that can't be
+        parsed or are out of range also fall back to their default and are
+        reported.
+
+        Returns:
+            (Settings, list of problem descriptions)
+        """
+        values, problems = {}, []
+        for name, section, option, kind, default in FIELDS:
+            raw = config.get(section, option, fallback=None)
+            if raw is None:
+                values[name] = default
+                continue
+            try:
+                values[name] = kind(raw.strip())
+            except ValueError:
+                problems.append(f"[{section}] {option} = {raw!r} is not a valid {kind.__name__}")
+                values[name] = default
+
+        values["prediction_mode"] = values["prediction_mode"].lower()
+        latency = values["prediction_latency"].lower()
+        try:
+            values["prediction_latency"] = None if latency == "auto" else float(latency)
+        except ValueError:
+            problems.append(f"[Prediction] latency = {latency!r} is neither 'auto' nor a number")
+            values["prediction_latency"] = None
+
+        settings = cls(**values)
+        invalid = settings.validate()
+        if invalid:
+            problems.extend(message for _, message in invalid)
+            defaults = cls.defaults()
+            settings = settings._replace(**{name: getattr(defaults, name) for name, _ in invalid})
+        return settings, problems
+
+    @classmethod
+    def defaults(cls):
+        """Snapshot of the built-in defaults"""
+        settings = cls(**{name: default for name, _, _, _, default in FIELDS})
+        return settings._replace(prediction_latency=None)
+
+    def validate(self):
+        """
+        Check value ranges
+
+        Returns:
+            List of (field, problem description) for invalid values
+        """
+        invalid = []
+        for name in ("health_threshold", "mana_threshold"):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                invalid.append((name, f"{name} must be between 0 and 1, got {getattr(self, name)}"))
+        for name in ("health_potion_key", "mana_potion_key"):
+            if not getattr(self, name):
+                invalid.append((name, f"{name} must not be empty"))
+        for name in ("health_cooldown", "mana_cooldown"):
+            if getattr(self, name) < 0:
+                invalid.append((name, f"{name} must not be negative, got {getattr(self, name)}"))
+        for name in ("confirm_frames", "window_frames"):
+            if getattr(self, name) < 1:
+                invalid.append((name, f"{name} must be at least 1, got {getattr(self, name)}"))
+        if self.min_poll_interval <= 0:
+            invalid.append(("min_poll_interval", f"min_interval must be positive, got {self.min_poll_interval}"))
+        if self.max_poll_interval < self.min_poll_interval:
+            invalid.append(("max_poll_interval",
+                            f"max_interval {self.max_poll_interval} is below min_interval {self.min_poll_interval}"))
+        if self.poll_safe_margin <= 0:
+            invalid.append(("poll_safe_margin", f"safe_margin must be positive, got {self.poll_safe_margin}"))
+        if self.prediction_mode not in PREDICTION_MODES:
+            invalid.append(("prediction_mode", f"unknown prediction mode '{self.prediction_mode}'"))
+        if self.prediction_latency is not None and self.prediction_latency < 0:
+            invalid.append(("prediction_latency", "prediction latency must not be negative"))
+        return invalid
+
+    def changes(self, other):
+        """Names of the fields that differ from another snapshot"""
+        return [name for name in self._fields if getattr(self, name) != getattr(other, name)]
+
+
+def startup_changes(old, new):
+    """
+    Startup-only sections that differ between two ConfigParsers
+
+    Returns:
+        Sorted list of section names
+    """
+    changed = []
+    for section in set(old.sections()) | set(new.sections()):
+        if section not in STARTUP_SECTIONS and not section.startswith(STARTUP_PREFIXES):
+            continue
+        before = dict(old[section]) if old.has_section(section) else None
+        after = dict(new[section]) if new.has_section(section) else None
+        if before != after:
+            changed.append(section)
+    return sorted(changed)
+
+
+class ConfigWatcher:
+    """
+    Detects changes to the config file from its modification time and size
+    """
+
+    def __init__(self, path=CONFIG_PATH, interval=1.0):
+        """
+        Args:
+            path: Config file to watch
+            interval: Minimum seconds between checks of the file
+        """
+        self.path = path
+        self.interval = interval
+        self.next_check = 0.0
+        self.mark_current()
+
+    def stamp(self):
+        """(mtime_ns, size) of the file, None if it doesn't exist"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def mark_current(self):
+        """Accept the file as it is now, e.g. after writing it ourselves"""
+        self.last_stamp = self.stamp()
+
+    def changed(self, now=None):
+        """
+        Whether the file changed since the last call (or mark_current)
+
+        Checks the file at most once per interval; returns False in between.
+        """
+        if now is None:
+            now = time.monotonic()
+        if now < self.next_check:
+            return False
+        self.next_check = now + self.interval
+
+        stamp = self.stamp()
+        if stamp is None or stamp == self.last_stamp:
+            return False
+        self.last_stamp = stamp
+        logging.debug(f"{self.path} changed")
+        return True
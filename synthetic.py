@@ -0,0 +1,309 @@
+"""
+Synthetic PoE2-style bar images for benchmarks and offline evaluation.
+
+Bars fill from the bottom up, like the health and mana orbs in game. The
+empty part of the bar is a dark, desaturated background that neither color
+detector counts. render_fixture() builds whole screens with both orbs and
+orb-colored UI elements for testing automatic orb location.
+render_corpus() builds labelled sequences of bar strips with a known fill
+level per frame, for evaluating detector and smoothing settings.
+"""
+import numpy as np
+
+# Effects drawn over corpus frames, stored per frame as a bit mask
+EFFECT_OVERLAY = 1  # Light text/label band across the strip
+EFFECT_TINT = 2     # Whole strip tinted, e.g. poison, chill or ignite
+EFFECT_FLASH = 4    # Brief blend towards white/red when taking a hit
+EFFECTS = {"overlay": EFFECT_OVERLAY, "tint": EFFECT_TINT, "flash": EFFECT_FLASH}
+
+TINT_COLORS = ((60, 170, 50), (140, 190, 230), (235, 130, 40))
+FLASH_COLORS = ((255, 255, 255), (255, 70, 60))
+OVERLAY_COLOR = (215, 210, 200)
+
+# Fill level patterns a corpus can follow
+SCENARIOS = ("mixed", "steps", "drain", "steady")
+
+HEALTH_COLOR = (190, 25, 30)
+MANA_COLOR = (30, 60, 200)
+EMPTY_COLOR = (22, 18, 20)
+
+# Screen resolutions and the size of a bar capture strip at each one.
+# Strips follow the default config region (1% of screen width, 17% of
+# screen height for a full orb).
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+
+
+def strip_size(resolution):
+    """(height, width) of a bar capture strip for a resolution name"""
+    width, height = RESOLUTIONS[resolution]
+    return max(10, int(height * 0.17)), max(5, int(width * 0.01))
+
+
+def render_bar(height, width, fill, color=HEALTH_COLOR, empty_color=EMPTY_COLOR,
+               noise=0, rng=None):
+    """
+    Render a bar strip filled from the bottom
+
+    Args:
+        height, width: Strip size in pixels
+        fill: Fill level 0.0-1.0
+        color: RGB color of the filled part
+        empty_color: RGB color of the empty part
+        noise: Standard deviation of Gaussian pixel noise (0 for none)
+        rng: numpy Generator used for the noise
+
+    Returns:
+        (height, width, 3) uint8 array
+    """
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    filled_rows = int(round(height * min(1.0, max(0.0, fill))))
+    img[:height - filled_rows] = empty_color
+    img[height - filled_rows:] = color
+
+    if noise:
+        rng = rng or np.random.default_rng()
+        noisy = img.astype(np.int16) + rng.normal(0, noise, img.shape).astype(np.int16)
+        img = np.clip(noisy, 0, 255).astype(np.uint8)
+    return img
+
+
+def bar_regions(resolution):
+    """
+    Health and mana capture boxes for a synthetic screen
+
+    Returns:
+        ((width, height), {"health": bbox, "mana": bbox})
+    """
+    screen_width, screen_height = RESOLUTIONS[resolution]
+    height, width = strip_size(resolution)
+    y2 = int(screen_height * 0.98)
+    health_x = int(screen_width * 0.08)
+    mana_x = int(screen_width * 0.75)
+    return (screen_width, screen_height), {
+        "health": (health_x, y2 - height, health_x + width, y2),
+        "mana": (mana_x, y2 - height, mana_x + width, y2),
+    }
+
+
+def render_orb(diameter, fill, color=HEALTH_COLOR, empty_color=EMPTY_COLOR, background=None):
+    """
+    Render a round orb filled from the bottom
+
+    Args:
+        diameter: Orb size in pixels
+        fill: Fill level 0.0-1.0
+        color: RGB color of the filled part
+        empty_color: RGB color of the empty part of the orb
+        background: RGB color outside the orb; None leaves those pixels to
+            the caller (see the returned mask)
+
+    Returns:
+        ((diameter, diameter, 3) uint8 array, (diameter, diameter) boolean orb mask)
+    """
+    radius = diameter / 2.0
+    yy, xx = np.mgrid[0:diameter, 0:diameter]
+    inside = (xx + 0.5 - radius) ** 2 + (yy + 0.5 - radius) ** 2 <= radius ** 2
+    filled_rows = int(round(diameter * min(1.0, max(0.0, fill))))
+
+    img = np.zeros((diameter, diameter, 3), dtype=np.uint8)
+    if background is not None:
+        img[:] = background
+    img[inside] = empty_color
+    img[inside & (yy >= diameter - filled_rows)] = color
+    return img, inside
+
+
+def orb_regions(resolution):
+    """
+    Bounding boxes of the health (bottom left) and mana (bottom right) orbs
+    on a synthetic screen
+
+    Returns:
+        ((width, height), {"health": bbox, "mana": bbox})
+    """
+    screen_width, screen_height = RESOLUTIONS[resolution]
+    diameter = int(screen_height * 0.17)
+    y2 = int(screen_height * 0.98)
+    health_cx = int(screen_width * 0.065)
+    mana_cx = int(screen_width * 0.935)
+    return (screen_width, screen_height), {
+        "health": (health_cx - diameter // 2, y2 - diameter, health_cx - diameter // 2 + diameter, y2),
+        "mana": (mana_cx - diameter // 2, y2 - diameter, mana_cx - diameter // 2 + diameter, y2),
+    }
+
+
+def render_screen(size, bars, background=(12, 10, 14), orbs=()):
+    """
+    Render a full screen with bars drawn into their regions
+
+    Args:
+        size: (width, height) of the screen
+        bars: Iterable of (bbox, fill, color) tuples
+        background: RGB color of the rest of the screen
+        orbs: Iterable of (bbox, fill, color) tuples drawn as round orbs
+
+    Returns:
+        (height, width, 3) uint8 array
+    """
+    width, height = size
+    screen = np.empty((height, width, 3), dtype=np.uint8)
+    screen[:] = background
+    for (x1, y1, x2, y2), fill, color in bars:
+        screen[y1:y2, x1:x2] = render_bar(y2 - y1, x2 - x1, fill, color)
+    for (x1, y1, x2, y2), fill, color in orbs:
+        img, inside = render_orb(min(x2 - x1, y2 - y1), fill, color)
+        screen[y1:y1 + img.shape[0], x1:x1 + img.shape[1]][inside] = img[inside]
+    return screen
+
+
+def render_fixture(resolution, health_fill=1.0, mana_fill=1.0, noise=0, seed=0):
+    """
+    Full-screen frame with both orbs plus small red and blue UI elements
+    that must not be mistaken for them
+
+    Args:
+        resolution: Key of RESOLUTIONS
+        health_fill, mana_fill: Orb fill levels
+        noise: Standard deviation of Gaussian pixel noise (0 for none)
+        seed: Seed for the element placement and noise
+
+    Returns:
+        ((height, width, 3) uint8 frame, {"health": bbox, "mana": bbox} of the orbs)
+    """
+    rng = np.random.default_rng(seed)
+    size, orbs = orb_regions(resolution)
+    width, height = size
+    screen = render_screen(size, [], orbs=[
+        (orbs["health"], health_fill, HEALTH_COLOR),
+        (orbs["mana"], mana_fill, MANA_COLOR),
+    ])
+
+    # Icons, buff timers and text in orb colors, kept clear of the orbs
+    unit = max(4, height // 60)
+    for color in (HEALTH_COLOR, MANA_COLOR) * 6:
+        w, h = rng.integers(unit, unit * 3, size=2)
+        x = int(rng.integers(int(width * 0.2), int(width * 0.8) - w))
+        y = int(rng.integers(0, int(height * 0.8) - h))
+        screen[y:y + h, x:x + w] = color
+
+    if noise:
+        noisy = screen.astype(np.int16) + rng.normal(0, noise, screen.shape).astype(np.int16)
+        screen = np.clip(noisy, 0, 255).astype(np.uint8)
+    return screen, orbs
+
+
+def fill_trace(scenario, frames, rng):
+    """
+    Ground-truth fill level per frame
+
+    Args:
+        scenario: "steps" (instant hits and refills), "drain" (steady drains
+            and regeneration), "steady" (constant levels) or "mixed" (all of them)
+        frames: Number of frames
+        rng: numpy Generator
+
+    Returns:
+        (frames,) float64 array of levels 0.0-1.0
+    """
+    levels = np.empty(frames)
+    level = 1.0
+    i = 0
+    while i < frames:
+        kind = scenario if scenario != "mixed" else rng.choice(("steps", "drain", "steady"))
+        length = int(rng.integers(15, 60))
+        end = min(frames, i + length)
+        if kind == "steps":
+            # Hold, then jump to a new level (a hit or a flask)
+            level = float(rng.uniform(0.05, 1.0))
+            levels[i:end] = level
+        elif kind == "drain":
+            rate = float(rng.uniform(-0.02, 0.01))
+            levels[i:end] = np.clip(level + rate * np.arange(1, end - i + 1), 0.0, 1.0)
+            level = float(levels[end - 1])
+        else:
+            levels[i:end] = level
+        i = end
+    return levels
+
+
+def apply_effect(img, color, strength, rows=None):
+    """Blend an RGB color into a strip (or a slice of its rows) in place"""
+    target = img if rows is None else img[rows]
+    blended = target * (1.0 - strength) + np.asarray(color, dtype=np.float64) * strength
+    target[:] = blended.astype(np.uint8)
+    return img
+
+
+def render_corpus(resolution="1080p", color=HEALTH_COLOR, frames=600, scenario="mixed",
+                  effects=tuple(EFFECTS), noise=6, seed=0):
+    """
+    Labelled sequence of bar strips
+
+    Args:
+        resolution: Key of RESOLUTIONS, sets the strip size
+        color: RGB color of the filled part
+        frames: Number of frames
+        scenario: Fill level pattern, see fill_trace()
+        effects: Names from EFFECTS to draw over some of the frames
+        noise: Standard deviation of Gaussian pixel noise (0 for none)
+        seed: Seed for the levels, effects and noise
+
+    Returns:
+        Dict with "frames" ((N, height, width, 3) uint8), "levels" ((N,) true
+        fill levels) and "effects" ((N,) uint8 EFFECT_* bits)
+    """
+    rng = np.random.default_rng(seed)
+    height, width = strip_size(resolution)
+    levels = fill_trace(scenario, frames, rng)
+    images = np.empty((frames, height, width, 3), dtype=np.uint8)
+    flags = np.zeros(frames, dtype=np.uint8)
+
+    # Overlays and tints last a while; flashes follow drops in the level
+    overlay_until = tint_until = flash_until = -1
+    tint = TINT_COLORS[0]
+    overlay_rows = slice(height * 2 // 5, height * 2 // 5 + max(2, height // 10))
+    for i in range(frames):
+        img = render_bar(height, width, levels[i], color)
+        if "overlay" in effects:
+            if i > overlay_until and rng.random() < 0.02:
+                overlay_until = i + int(rng.integers(20, 80))
+            if i <= overlay_until:
+                # Sparse light pixels, like the "1234/2000" label over an orb
+                band = img[overlay_rows]
+                text = rng.random(band.shape[:2]) < 0.4
+                band[text] = OVERLAY_COLOR
+                flags[i] |= EFFECT_OVERLAY
+        if "tint" in effects:
+            if i > tint_until and rng.random() < 0.01:
+                tint_until = i + int(rng.integers(30, 120))
+                tint = TINT_COLORS[rng.integers(len(TINT_COLORS))]
+            if i <= tint_until:
+                apply_effect(img, tint, 0.3)
+                flags[i] |= EFFECT_TINT
+        if "flash" in effects:
+            if i > 0 and levels[i] < levels[i - 1] - 0.05:
+                flash_until = i + int(rng.integers(1, 4))
+            if i <= flash_until:
+                apply_effect(img, FLASH_COLORS[rng.integers(len(FLASH_COLORS))], 0.45)
+                flags[i] |= EFFECT_FLASH
+        images[i] = img
+
+    if noise:
+        noisy = images.astype(np.int16) + rng.normal(0, noise, images.shape).astype(np.int16)
+        images = np.clip(noisy, 0, 255).astype(np.uint8)
+    return {"frames": images, "levels": levels, "effects": flags}
+
+
+def save_corpus(path, corpus):
+    """Write a render_corpus() result to a compressed .npz file"""
+    np.savez_compressed(path, **corpus)
+
+
+def load_corpus(path):
+    """Read a corpus written by save_corpus()"""
+    with np.load(path) as data:
+        return {name: data[name] for name in ("frames", "levels", "effects")}
@@ -0,0 +1,77 @@
+import logging
+
+from asynclog import DROP_NEWEST, DROP_OLDEST, AsyncLogHandler, BatchFileHandler, BoundedLogQueue, LogListener
+
+
+def record(message, level=logging.INFO):
+    return logging.makeLogRecord({"msg": message, "levelno": level, "levelname": logging.getLevelName(level)})
+
+
+def messages(log_queue):
+    return [r.msg for r in log_queue.get_batch(100, timeout=0)]
+
+
+def test_drop_newest_keeps_the_queued_records():
+    log_queue = BoundedLogQueue(maxsize=3, policy=DROP_NEWEST)
+    results = [log_queue.put(record(f"info {i}")) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert log_queue.dropped == 2
+    assert messages(log_queue) == ["info 0", "info 1", "info 2"]
+
+
+def test_drop_newest_still_queues_errors():
+    log_queue = BoundedLogQueue(maxsize=2, policy=DROP_NEWEST)
+    log_queue.put(record("info 0"))
+    log_queue.put(record("info 1"))
+    assert log_queue.put(record("error", logging.ERROR))
+    # The error displaced the oldest record
+    assert log_queue.dropped == 1
+    assert messages(log_queue) == ["info 1", "error"]
+
+
+def test_drop_oldest_keeps_the_newest_records():
+    log_queue = BoundedLogQueue(maxsize=3, policy=DROP_OLDEST)
+    assert all(log_queue.put(record(f"info {i}")) for i in range(5))
+    assert log_queue.dropped == 2
+    assert messages(log_queue) == ["info 2", "info 3", "info 4"]
+
+
+def test_shrinking_the_queue_counts_the_dropped_records():
+    log_queue = BoundedLogQueue(maxsize=10)
+    for i in range(6):
+        log_queue.put(record(f"info {i}"))
+    log_queue.configure(4, "unknown")
+    assert log_queue.policy == DROP_NEWEST
+    assert log_queue.dropped == 2
+    assert messages(log_queue) == ["info 2", "info 3", "info 4", "info 5"]
+
+
+def test_listener_reports_drops_and_flushes_everything_on_stop(tmp_path):
+    path = tmp_path / "test.log"
+    log_queue = BoundedLogQueue(maxsize=50, policy=DROP_NEWEST)
+    handler = BatchFileHandler(str(path))
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+
+    logger = logging.getLogger("test_asynclog")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    async_handler = AsyncLogHandler(log_queue)
+    logger.addHandler(async_handler)
+    try:
+        # Queue more than fits before the listener runs
+        for i in range(80):
+            logger.info("record %d", i)
+        logger.error("last error")
+        listener = LogListener(log_queue, [handler], batch_size=16)
+        listener.start()
+        listener.stop()
+    finally:
+        logger.removeHandler(async_handler)
+
+    lines = path.read_text().splitlines()
+    # The error displaced the oldest record, the rest of the overflow was dropped
+    assert lines == [f"INFO record {i}" for i in range(1, 50)] + ["ERROR last error"]
+    stats = listener.stats()
+    assert stats["dropped"] == 31
+    assert stats["written"] == 50 and stats["queued"] == 0
+    assert stats["batches"] == 4
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import autolocate
+import detection
+import synthetic
+from capture import SyntheticFrameSource
+
+# Largest placement error relative to the orb diameter, as in bench_autolocate
+MAX_ERROR = 0.05
+MAX_FILL_ERROR = 0.05
+FILL_CASES = ((1.0, 1.0), (0.5, 0.3), (0.2, 0.8))
+BACKGROUND = (12, 10, 14)
+
+
+@pytest.fixture(scope="module")
+def classifiers():
+    detection.register_bar_classifiers()
+    return {
+        "health": detection.get_classifier("health_calibration"),
+        "mana": detection.get_classifier("mana_calibration"),
+    }
+
+
+def strip_error(orb, bbox):
+    """Largest center/top/bottom offset of a located strip, relative to the orb diameter"""
+    x1, y1, x2, y2 = bbox
+    rx1, ry1, rx2, ry2 = orb["region"]
+    offset = max(abs((rx1 + rx2) / 2 - (x1 + x2) / 2), abs(ry1 - y1), abs(ry2 - (y2 - 1)))
+    return offset / (y2 - y1)
+
+
+def cover_center(frame, bbox, share):
+    """Blank a striped band down the middle of an orb, like a UI overlay"""
+    x1, y1, x2, y2 = bbox
+    center, half = (x1 + x2) // 2, (x2 - x1) // 8
+    rows = np.arange(y1, y2)
+    frame[rows[(rows - y1) % 10 < share * 10], center - half:center + half] = BACKGROUND
+    return frame
+
+
+@pytest.mark.parametrize("resolution", sorted(synthetic.RESOLUTIONS))
+@pytest.mark.parametrize("health_fill, mana_fill", FILL_CASES)
+def test_orbs_are_located_and_fill_recovered(classifiers, resolution, health_fill, mana_fill):
+    frame, orbs = synthetic.render_fixture(resolution, health_fill, mana_fill, noise=6, seed=1)
+    found = autolocate.locate_orbs(frame, classifiers)
+    for name, fill in (("health", health_fill), ("mana", mana_fill)):
+        orb = found[name]
+        assert orb is not None, name
+        assert strip_error(orb, orbs[name]) <= MAX_ERROR
+        assert abs(orb["fill"] - fill) <= MAX_FILL_ERROR
+        assert orb["confidence"] >= detection.MIN_LOCATE_CONFIDENCE
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_decoys_in_orb_colors_are_rejected(classifiers, seed):
+    frame, orbs = synthetic.render_fixture("1080p", 0.5, 0.5, seed=seed)
+    found = autolocate.locate_orbs(frame, classifiers)
+    for name, (x1, y1, x2, y2) in orbs.items():
+        fx1, fy1, fx2, fy2 = found[name]["bbox"]
+        assert x1 <= fx1 and fx2 <= x2 and y1 <= fy1 and fy2 <= y2
+
+    # With the orbs gone only the small UI elements are left
+    for x1, y1, x2, y2 in orbs.values():
+        frame[y1:y2, x1:x2] = BACKGROUND
+    assert autolocate.locate_orbs(frame, classifiers) == {"health": None, "mana": None}
+
+
+def test_covered_orb_has_a_low_confidence(classifiers):
+    frame, orbs = synthetic.render_fixture("1440p", noise=6, seed=1)
+    found = autolocate.locate_orbs(cover_center(frame, orbs["health"], 0.5), classifiers)
+    assert found["health"]["confidence"] < detection.MIN_LOCATE_CONFIDENCE
+    assert found["mana"]["confidence"] >= detection.MIN_LOCATE_CONFIDENCE
+
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    # The controller writes its config, logs and cache to the working directory
+    monkeypatch.chdir(tmp_path)
+    from autopot import AutoPotController
+    frame, _ = synthetic.render_fixture("1080p", noise=6, seed=1)
+    return AutoPotController(frame_source=SyntheticFrameSource(frame), interactive=False, headless=True)
+
+
+def test_auto_calibrate_keeps_the_position_of_an_unreliable_orb(controller):
+    frame, orbs = synthetic.render_fixture("1080p", noise=6, seed=1)
+    controller.frame_source.set_frame(cover_center(frame, orbs["health"], 0.5))
+    health_bar_pos = controller.health_bar_pos
+
+    found = controller.auto_calibrate()
+    assert found is not None
+    assert controller.health_bar_pos == health_bar_pos
+    assert controller.mana_bar_pos == found["mana"]["region"]
+
+
+def test_auto_calibrate_saves_nothing_without_a_reliable_orb(controller):
+    frame, orbs = synthetic.render_fixture("1080p", noise=6, seed=1)
+    for bbox in orbs.values():
+        cover_center(frame, bbox, 0.5)
+    controller.frame_source.set_frame(frame)
+    positions = controller.health_bar_pos, controller.mana_bar_pos
+
+    assert controller.auto_calibrate() is None
+    assert (controller.health_bar_pos, controller.mana_bar_pos) == positions
@@ -0,0 +1,116 @@
+import configparser
+import os
+
+import pytest
+
+import synthetic
+from capture import SyntheticFrameSource
+from control import send_command
+from dispatcher import FakeKeyboard
+from settings import CONFIG_PATH
+
+REGION_CONFIG = """[Region energy_shield]
+position = 0.30,0.80,0.31,0.95
+color = blue
+threshold = 0.5
+"""
+
+
+class CountingSource(SyntheticFrameSource):
+    """Synthetic screen that counts grabs"""
+
+    def __init__(self, frame):
+        super().__init__(frame)
+        self.grabs = 0
+
+    def grab(self, bbox):
+        self.grabs += 1
+        return super().grab(bbox)
+
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    # The controller reads its config and writes logs and cache to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "poe2_autopot_config.ini").write_text(REGION_CONFIG)
+    from autopot import AutoPotController
+    frame, _ = synthetic.render_fixture("1080p", seed=1)
+    return AutoPotController(
+        frame_source=CountingSource(frame), input_backend=FakeKeyboard(), interactive=False, headless=True
+    )
+
+
+def test_bars_and_regions_are_read_from_one_grab(controller):
+    assert "Region energy_shield" in controller.capture_planner.regions
+    controller.shared_capture.max_age = 10.0
+    source = controller.frame_source
+    grabs = source.grabs
+
+    assert controller.capture_bar("health") is not None
+    levels, present = controller.capture_region_batch()
+    assert len(levels) == len(present) == 1
+    assert controller.capture_bar("mana") is not None
+    assert source.grabs == grabs + 1
+
+
+def test_check_bar_level_uses_only_that_bars_potion(controller):
+    settings = controller.settings
+    empty = synthetic.render_bar(40, 5, 0.1, synthetic.MANA_COLOR)
+    # Smoothing takes a few readings to go below the threshold, then enough must confirm it
+    for _ in range(6):
+        level = controller.check_bar_level("mana", empty)
+        controller.update_level("mana", level)
+    controller.input_dispatcher.close()
+
+    assert level < settings.mana_threshold
+    assert [key for key, _ in controller.input_dispatcher.backend.sent] == [settings.mana_potion_key]
+    assert controller.mana_last_used > 0 and controller.health_last_used == 0
+    assert controller.history.events.snapshot()["bar"].tolist() == [1]
+
+
+def edit_config(path, section, option, value):
+    """Change one option of the config file the way a user would, with a newer mtime"""
+    config = configparser.ConfigParser()
+    config.read(path)
+    if not config.has_section(section):
+        config.add_section(section)
+    config[section][option] = value
+    mtime_ns = os.stat(path).st_mtime_ns + 1_000_000_000
+    with open(path, "w") as f:
+        config.write(f)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_config_edit_is_reloaded_once(controller):
+    edit_config(CONFIG_PATH, "Thresholds", "health", "0.6")
+    controller.check_config()
+    assert controller.settings.health_threshold == 0.6
+
+    # Unchanged since the reload - not read again
+    controller.config_watcher.next_check = 0.0
+    controller.settings = controller.settings._replace(health_threshold=0.5)
+    controller.check_config()
+    assert controller.settings.health_threshold == 0.5
+
+
+def test_invalid_config_edit_keeps_the_settings(controller):
+    settings = controller.settings
+    edit_config(CONFIG_PATH, "Thresholds", "mana", "lots")
+    controller.check_config()
+    assert controller.settings is settings
+
+
+def test_control_api_status_and_toggle(controller):
+    controller.start_control("ctl.sock")
+    try:
+        status = send_command("ctl.sock", "status")
+        assert status["ok"] and status["active"] is False
+        assert set(status["pipelines"]) == {"health", "mana", "regions"}
+        assert status["regions"] == {"energy_shield": 1.0}
+
+        assert send_command("ctl.sock", "toggle") == {"ok": True, "active": True}
+        assert send_command("ctl.sock", "status")["active"]
+        assert send_command("ctl.sock", "toggle") == {"ok": True, "active": False}
+        assert not controller.active
+    finally:
+        controller.control_server.close()
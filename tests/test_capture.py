@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from capture import CapturePlanner, ReplayFrameSource, SharedCapture
+
+SCREEN = (60, 40)
+REGIONS = {"health": (5, 10, 10, 30), "mana": (45, 10, 50, 30)}
+FRAMES = 12
+FPS = 8.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def replay(tmp_path):
+    """Short .npy replay whose frame i is filled with the value i"""
+    width, height = SCREEN
+    frames = np.repeat(np.arange(FRAMES, dtype=np.uint8), height * width * 3).reshape(FRAMES, height, width, 3)
+    path = tmp_path / "frames.npy"
+    np.save(path, frames)
+    clock = FakeClock()
+    return ReplayFrameSource(str(path), fps=FPS, clock=clock), clock
+
+
+def frame_number(img):
+    values = np.unique(img)
+    assert len(values) == 1
+    return int(values[0])
+
+
+def test_replay_plays_frames_by_time_not_by_grab(replay):
+    source, clock = replay
+    box = REGIONS["health"]
+    assert frame_number(source.grab(box)) == 0
+    # Grabbing again at the same moment doesn't advance the replay
+    assert frame_number(source.grab(box)) == 0
+    clock.now += 2.5 / FPS
+    assert frame_number(source.grab(box)) == 2
+    clock.now += FRAMES / FPS
+    assert frame_number(source.grab(box)) == 2  # Looped
+    source.loop = False
+    assert source.grab(box) is None
+
+
+def test_health_and_mana_read_the_same_replay_frame(replay):
+    source, clock = replay
+    shared = SharedCapture(CapturePlanner(REGIONS, source=source), max_age=0.05)
+    # Health is sampled four times as often as mana, at its own moments
+    for tick in range(64):
+        clock.now = 100.0 + tick / 32
+        health_frames, _ = shared.frames("health", now=clock.now)
+        health = frame_number(health_frames["health"])
+        assert health == tick // 4 % FRAMES
+        if tick % 4 == 1:
+            mana_frames, fresh = shared.frames("mana", now=clock.now + 0.01)
+            assert not fresh
+            assert frame_number(mana_frames["mana"]) == health
+
+
+class CountingSource:
+    """Synthetic screen that counts grabs"""
+    name = "counting"
+
+    def __init__(self):
+        self.grabs = 0
+
+    def grab(self, bbox):
+        self.grabs += 1
+        x1, y1, x2, y2 = bbox
+        return np.full((y2 - y1, x2 - x1, 3), self.grabs, dtype=np.uint8)
+
+
+def test_shared_capture_reuses_a_grab_once_per_pipeline():
+    source = CountingSource()
+    planner = CapturePlanner(REGIONS, mode="single", source=source)
+    shared = SharedCapture(planner, max_age=0.1)
+
+    frames, fresh = shared.frames("health", now=1.0)
+    assert fresh and set(frames) == {"health", "mana"}
+    # The other bar shares the grab, both regions come from one frame
+    mana, fresh = shared.frames("mana", now=1.05)
+    assert not fresh and mana is frames
+    # A bar that already used the grab gets a new one
+    _, fresh = shared.frames("health", now=1.06)
+    assert fresh
+    # So does a bar asking after max_age
+    _, fresh = shared.frames("mana", now=1.2)
+    assert fresh
+    assert source.grabs == shared.grabs == 3
+    assert shared.shared == 1
+
+
+def test_shared_capture_grabs_again_after_a_region_change():
+    source = CountingSource()
+    planner = CapturePlanner(REGIONS, source=source)
+    shared = SharedCapture(planner, max_age=1.0)
+    shared.frames("health", now=1.0)
+    planner.set_regions({"health": (0, 0, 4, 4), "mana": (10, 0, 14, 4)})
+    frames, fresh = shared.frames("mana", now=1.01)
+    assert fresh and frames["mana"].shape == (4, 4, 3)
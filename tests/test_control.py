@@ -0,0 +1,95 @@
+import json
+import os
+from multiprocessing.connection import Client
+
+import pytest
+
+from control import ControlServer, encode, send_command
+
+
+class FakeController:
+    """Handlers of a controller whose only state is on/off"""
+
+    def __init__(self):
+        self.active = False
+
+    def handlers(self):
+        return {
+            "status": lambda request: {"ok": True, "active": self.active, "health": 0.82, "mana": 0.4},
+            "toggle": self.toggle,
+            "fail": self.fail,
+        }
+
+    def toggle(self, request):
+        self.active = not self.active
+        return {"ok": True, "active": self.active}
+
+    def fail(self, request):
+        raise RuntimeError("handler failed")
+
+
+@pytest.fixture
+def server(tmp_path):
+    controller = FakeController()
+    server = ControlServer(str(tmp_path / "ctl.sock"), controller.handlers())
+    server.start()
+    yield server, controller
+    server.close()
+
+
+def test_status_reply_is_json(server):
+    server, _ = server
+    reply = send_command(server.address, "status")
+    assert reply == {"ok": True, "active": False, "health": 0.82, "mana": 0.4}
+
+
+def test_toggle_changes_the_state(server):
+    server, controller = server
+    assert send_command(server.address, "toggle") == {"ok": True, "active": True}
+    assert controller.active
+    assert send_command(server.address, "status")["active"]
+    assert send_command(server.address, "toggle") == {"ok": True, "active": False}
+    assert server.requests == 3
+
+
+def test_unknown_command_lists_the_commands(server):
+    server, _ = server
+    reply = send_command(server.address, "explode")
+    assert reply == {"ok": False, "error": "unknown command 'explode'", "commands": ["status", "toggle", "fail"]}
+    assert server.requests == 0
+
+
+def test_one_connection_serves_several_requests(server):
+    server, _ = server
+    with Client(server.address) as connection:
+        connection.send_bytes(b"not json")
+        reply = json.loads(connection.recv_bytes())
+        assert not reply["ok"] and reply["error"].startswith("invalid request")
+
+        connection.send_bytes(encode({"command": "fail"}))
+        assert json.loads(connection.recv_bytes()) == {"ok": False, "error": "handler failed"}
+
+        connection.send_bytes(encode({"command": "status"}))
+        assert json.loads(connection.recv_bytes())["ok"]
+
+
+def test_second_instance_is_refused(server):
+    server, _ = server
+    with pytest.raises(RuntimeError):
+        ControlServer(server.address, {}).start()
+
+
+def test_close_removes_the_socket_and_a_stale_socket_is_replaced(tmp_path):
+    address = str(tmp_path / "ctl.sock")
+    server = ControlServer(address, FakeController().handlers())
+    server.start()
+    server.close()
+    assert not os.path.exists(address)
+
+    # A socket file nobody listens on, e.g. after a crash
+    open(address, "w").close()
+    server.start()
+    try:
+        assert send_command(address, "status")["ok"]
+    finally:
+        server.close()
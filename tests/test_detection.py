@@ -0,0 +1,274 @@
+"""
+Parity tests for the vectorized detectors.
+
+The per-pixel predicates below are the tests the original nested detection
+loops applied to every pixel; the vectorized code must agree with them
+exactly.
+"""
+import numpy as np
+import pytest
+
+import detection
+import synthetic
+from capture import CapturePlanner, SyntheticFrameSource
+from regions import REGION_PREFIX, RegionBatch, RegionSpec, color_model
+
+CHANNELS = {"health": detection.RED, "mana": detection.BLUE}
+
+
+def loop_dominant(pixel, channel, ratio, min_value=detection.MIN_CHANNEL_VALUE):
+    """Original per-pixel test: value > min_value and value > max(others) * ratio"""
+    values = [int(v) for v in pixel[:3]]
+    value = values[channel]
+    others = [v for c, v in enumerate(values) if c != channel]
+    return value > min_value and value > max(others) * ratio
+
+
+def loop_presence(pixel, channel):
+    """Original "any colored pixel" test: value > 60 and value > each other channel * 1.5"""
+    values = [int(v) for v in pixel[:3]]
+    value = values[channel]
+    return value > 60 and all(value > v * 1.5 for c, v in enumerate(values) if c != channel)
+
+
+def loop_mask(img, predicate, *args):
+    height, width = img.shape[:2]
+    return np.array([[predicate(img[y, x], *args) for x in range(width)] for y in range(height)], dtype=bool)
+
+
+def random_frames(seed=0):
+    """Seeded random frames: uniform noise plus bar-like frames near the thresholds"""
+    rng = np.random.default_rng(seed)
+    frames = [rng.integers(0, 256, (24, 16, 3), dtype=np.uint8) for _ in range(4)]
+    for channel in (detection.RED, detection.BLUE):
+        frame = rng.integers(0, 80, (30, 12, 3), dtype=np.uint8)
+        frame[..., channel] = rng.integers(40, 140, (30, 12), dtype=np.uint8)
+        frames.append(frame)
+    return frames
+
+
+def value_grid(channel, second_other=0):
+    """
+    Every (channel value, other channel value) pair: pixel [v, m] has the
+    channel at v, the first other channel at m and the second at second_other
+    """
+    values = np.arange(256, dtype=np.uint8)
+    grid = np.zeros((256, 256, 3), dtype=np.uint8)
+    others = [c for c in (detection.RED, detection.GREEN, detection.BLUE) if c != channel]
+    grid[..., channel] = values[:, np.newaxis]
+    grid[..., others[0]] = values[np.newaxis, :]
+    grid[..., others[1]] = second_other
+    return grid
+
+
+@pytest.mark.parametrize("bar", CHANNELS)
+@pytest.mark.parametrize("ratio", [detection.COUNT_RATIO, detection.PRESENCE_RATIO])
+def test_color_mask_matches_loop_on_random_frames(bar, ratio):
+    channel = CHANNELS[bar]
+    for frame in random_frames():
+        expected = loop_mask(frame, loop_dominant, channel, ratio)
+        np.testing.assert_array_equal(detection.color_mask(frame, channel, ratio), expected)
+
+
+@pytest.mark.parametrize("bar", CHANNELS)
+def test_presence_and_count_match_loop_on_random_frames(bar):
+    channel = CHANNELS[bar]
+    for frame in random_frames(seed=1):
+        assert detection.has_color(frame, channel) == loop_mask(frame, loop_presence, channel).any()
+        assert detection.count_color(frame, channel) == int(
+            loop_mask(frame, loop_dominant, channel, detection.COUNT_RATIO).sum()
+        )
+
+
+@pytest.mark.parametrize("bar", CHANNELS)
+@pytest.mark.parametrize("second_other", [0, 128])
+def test_color_mask_matches_loop_on_full_value_grid(bar, second_other):
+    channel = CHANNELS[bar]
+    grid = value_grid(channel, second_other)
+    for ratio in (detection.COUNT_RATIO, detection.PRESENCE_RATIO):
+        expected = loop_mask(grid, loop_dominant, channel, ratio)
+        np.testing.assert_array_equal(detection.color_mask(grid, channel, ratio), expected)
+    presence = loop_mask(grid, loop_presence, channel)
+    np.testing.assert_array_equal(detection.color_mask(grid, channel, detection.PRESENCE_RATIO), presence)
+    assert detection.count_color(grid, channel) == int(
+        loop_mask(grid, loop_dominant, channel, detection.COUNT_RATIO).sum()
+    )
+
+
+def test_has_color_on_empty_and_single_pixel_frames():
+    frame = np.zeros((10, 5, 3), dtype=np.uint8)
+    assert not detection.has_color(frame, detection.RED)
+    frame[3, 2] = (200, 10, 10)
+    assert detection.has_color(frame, detection.RED)
+    assert not detection.has_color(frame, detection.BLUE)
+    assert detection.count_color(frame, detection.RED) == 1
+
+
+@pytest.mark.parametrize("fill", [0.0, 0.05, 0.3, 0.5, 0.77, 1.0])
+def test_profile_fill_level_of_rendered_bars(fill):
+    height = 183
+    img = synthetic.render_bar(height, 19, fill)
+    profile = detection.row_profile(detection.color_mask(img, detection.RED))
+    assert detection.profile_fill_level(profile) == pytest.approx(fill, abs=1.0 / height)
+
+
+def test_profile_fill_level_ignores_stray_pixels_and_dark_spots():
+    profile = np.zeros(100)
+    profile[60:] = 1.0
+    clean = detection.profile_fill_level(profile)
+    profile[10] = 1.0  # Stray colored row above the surface
+    profile[80] = 0.0  # Dark row below it
+    assert detection.profile_fill_level(profile) == pytest.approx(clean)
+
+
+def test_profile_fill_level_is_fractional_at_the_surface():
+    profile = np.zeros(10)
+    profile[6:] = 1.0
+    profile[5] = 0.4
+    assert detection.profile_fill_level(profile) == pytest.approx(0.44)
+    assert detection.profile_fill_level(np.zeros(0)) == 0.0
+    assert detection.profile_fill_level(np.zeros(10)) == 0.0
+
+
+@pytest.mark.parametrize("bar", CHANNELS)
+def test_eight_bit_lookup_table_matches_loop(bar):
+    channel = CHANNELS[bar]
+    for ratio in (detection.COUNT_RATIO, detection.PRESENCE_RATIO):
+        classifier = detection.channel_classifier(f"test_{bar}", channel, ratio, bits=8)
+        for frame in random_frames(seed=2) + [value_grid(channel), value_grid(channel, 128)]:
+            expected = loop_mask(frame, loop_dominant, channel, ratio)
+            np.testing.assert_array_equal(classifier.mask(frame), expected)
+
+
+@pytest.mark.parametrize("bits", range(1, 9))
+def test_quantize_packs_the_top_bits_of_each_channel(bits):
+    frame = random_frames(seed=3)[0]
+    shift = 8 - bits
+    r, g, b = (frame[..., c].astype(np.int64) >> shift for c in range(3))
+    expected = (r << 2 * bits) | (g << bits) | b
+    np.testing.assert_array_equal(detection.quantize(frame, bits).astype(np.int64), expected)
+
+
+@pytest.mark.parametrize("bits", [4, 6])
+def test_quantized_lookup_table_classifies_cube_centers(bits):
+    classifier = detection.channel_classifier("test_health", detection.RED, detection.COUNT_RATIO, bits=bits)
+    frame = random_frames(seed=4)[0]
+    # Every pixel is classified like the center of its quantization cube
+    step = 1 << (8 - bits)
+    centers = (frame // step * step + step // 2).astype(np.uint8)
+    expected = loop_mask(centers, loop_dominant, detection.RED, detection.COUNT_RATIO)
+    np.testing.assert_array_equal(classifier.mask(frame), expected)
+
+
+def test_default_lookup_tables_are_exact():
+    assert detection.DEFAULT_LUT_BITS == 8
+    classifier = detection.channel_classifier("test_health", detection.RED, detection.COUNT_RATIO)
+    frame = random_frames(seed=5)[0]
+    np.testing.assert_array_equal(classifier.mask(frame), detection.color_mask(frame, detection.RED))
+
+
+@pytest.mark.parametrize("bar", CHANNELS)
+def test_six_bit_lookup_table_mismatch_is_bounded(bar):
+    channel = CHANNELS[bar]
+    frame = np.random.default_rng(5).integers(0, 256, (256, 256, 3), dtype=np.uint8)
+    for ratio in (detection.COUNT_RATIO, detection.PRESENCE_RATIO):
+        classifier = detection.channel_classifier(f"test_{bar}", channel, ratio, bits=6)
+        mismatch = np.mean(classifier.mask(frame) != detection.color_mask(frame, channel, ratio))
+        # The accuracy traded for the smaller tables documented for lut_bits
+        assert mismatch <= 0.005
+
+
+def test_lookup_table_cache_round_trip(tmp_path):
+    built = detection.channel_classifier("test_mana", detection.BLUE, 1.3, bits=5, cache_dir=str(tmp_path))
+    assert list(tmp_path.iterdir())
+    loaded = detection.channel_classifier("test_mana", detection.BLUE, 1.3, bits=5, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(loaded.table, built.table)
+
+
+# (color model, fill color) of the regions in the batch tests; the last
+# region is a green region showing a red fill, which must read as empty
+REGION_COLORS = (
+    ("red", synthetic.HEALTH_COLOR),
+    ("blue", synthetic.MANA_COLOR),
+    ("green", (40, 170, 60)),
+    ("red", synthetic.HEALTH_COLOR),
+    ("green", synthetic.HEALTH_COLOR),
+)
+REGION_BOXES = ((10, 10, 20, 70), (40, 20, 46, 70), (70, 5, 82, 70), (100, 30, 105, 50), (130, 10, 140, 70))
+REGION_FILLS = (0.8, 0.35, 1.0, 0.5, 1.0)
+
+
+def region_batch(bits, method):
+    size = (160, 80)
+    screen = synthetic.render_screen(size, [
+        (box, fill, rgb) for box, fill, (_, rgb) in zip(REGION_BOXES, REGION_FILLS, REGION_COLORS)
+    ])
+    regions = []
+    for i, (model, _) in enumerate(REGION_COLORS):
+        color, presence = color_model(model, bits)
+        regions.append(RegionSpec(f"region{i}", "0,0,1,1", color, presence, threshold=0.5))
+    batch = RegionBatch(regions, method, "single", SyntheticFrameSource(screen, size=size))
+    batch.set_boxes({region.name: box for region, box in zip(regions, REGION_BOXES)})
+    return batch, screen
+
+
+@pytest.mark.parametrize("bits", range(1, 9))
+@pytest.mark.parametrize("method", ["profile", "count"])
+def test_region_batch_matches_per_region_measurement(bits, method):
+    batch, screen = region_batch(bits, method)
+    levels, present = batch.read()
+    for region, (x1, y1, x2, y2), level, seen in zip(batch.regions, REGION_BOXES, levels, present):
+        img = screen[y1:y2, x1:x2]
+        mask = region.color.mask(img)
+        if method == "profile":
+            expected = detection.profile_fill_level(detection.row_profile(mask))
+        else:
+            expected = detection.count_fill_level(np.count_nonzero(mask), mask.size)
+        assert level == pytest.approx(expected), region.name
+        assert seen == bool(region.presence.mask(img).any()), region.name
+
+
+@pytest.mark.parametrize("bits", range(1, 9))
+def test_region_batch_keeps_each_region_on_its_own_table(bits):
+    batch, _ = region_batch(bits, "profile")
+    levels, present = batch.read()
+    # Red fill in the green region matches no table entry of the green model
+    assert levels[-1] == 0.0 and not present[-1]
+    assert levels[0] == pytest.approx(0.8, abs=0.02) and present[0]
+    assert levels[1] == pytest.approx(0.35, abs=0.02) and present[1]
+
+
+@pytest.mark.parametrize("method", ["profile", "count"])
+def test_region_batch_reads_a_grab_shared_with_the_bars(method):
+    batch, screen = region_batch(8, method)
+    source = SyntheticFrameSource(screen, size=(160, 80))
+    boxes = dict(batch.capture_boxes, health=(150, 0, 155, 80))
+    frames = CapturePlanner(boxes, mode="single", source=source).capture()
+    shared_levels, shared_present = batch.read_frames(frames)
+    levels, present = batch.read()
+    np.testing.assert_array_equal(shared_levels, levels)
+    np.testing.assert_array_equal(shared_present, present)
+
+    del frames[REGION_PREFIX + "region2"]
+    assert batch.read_frames(frames) is None
+
+
+def test_locate_bar_finds_edges_and_column():
+    mask = np.zeros((50, 30), dtype=bool)
+    mask[10:40, 12:15] = True
+    found = detection.locate_bar(mask)
+    assert found["column"] == 13
+    assert (found["top"], found["bottom"]) == (10, 39)
+    assert (found["top_edge"], found["bottom_edge"]) == pytest.approx((10.0, 40.0))
+    assert found["confidence"] == pytest.approx(1.0)
+    assert detection.locate_bar(np.zeros((50, 30), dtype=bool)) is None
+
+
+def test_locate_bar_with_mostly_empty_span():
+    # Two stray specks: the median coverage between them is zero
+    mask = np.zeros((50, 10), dtype=bool)
+    mask[0, 4] = mask[49, 4] = True
+    found = detection.locate_bar(mask, expected_rows=50)
+    assert (found["top"], found["bottom"]) == (0, 49)
+    assert (found["top_edge"], found["bottom_edge"]) == (0.0, 50.0)
+    assert found["confidence"] == 0.0
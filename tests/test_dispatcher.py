@@ -0,0 +1,81 @@
+import threading
+
+from dispatcher import PRIORITY_HEALTH, PRIORITY_MANA, PRIORITY_REGION, FakeKeyboard, InputDispatcher
+
+
+class GatedKeyboard(FakeKeyboard):
+    """FakeKeyboard whose first send blocks until released, so keys pile up in the queue"""
+
+    def __init__(self):
+        super().__init__()
+        self.sending = threading.Event()
+        self.release = threading.Event()
+
+    def send(self, key):
+        self.sending.set()
+        assert self.release.wait(2.0)
+        super().send(key)
+
+    def keys(self):
+        return [key for key, _ in self.sent]
+
+
+def blocked_dispatcher():
+    """Dispatcher stuck sending a first key"""
+    keyboard = GatedKeyboard()
+    dispatcher = InputDispatcher(keyboard)
+    dispatcher.submit("first", PRIORITY_REGION)
+    assert keyboard.sending.wait(2.0)
+    return dispatcher, keyboard
+
+
+def test_health_is_sent_before_mana_before_regions():
+    dispatcher, keyboard = blocked_dispatcher()
+    dispatcher.submit("4", PRIORITY_REGION)
+    dispatcher.submit("2", PRIORITY_MANA)
+    dispatcher.submit("5", PRIORITY_REGION)
+    dispatcher.submit("1", PRIORITY_HEALTH)
+    assert len(dispatcher) == 4
+
+    keyboard.release.set()
+    dispatcher.close()
+    # By priority, then in submission order
+    assert keyboard.keys() == ["first", "1", "2", "4", "5"]
+    stats = dispatcher.stats()
+    assert stats["sent"] == 5 and stats["queued"] == 0 and stats["errors"] == 0
+    assert stats["p50_ms"] is not None
+
+
+def test_repeated_requests_within_the_window_are_coalesced():
+    keyboard = FakeKeyboard()
+    dispatcher = InputDispatcher(keyboard)
+    assert dispatcher.submit("1", PRIORITY_HEALTH, window=4.0, now=10.0)
+    assert not dispatcher.submit("1", PRIORITY_HEALTH, window=4.0, now=13.9)
+    # Other keys have windows of their own
+    assert dispatcher.submit("2", PRIORITY_MANA, window=4.0, now=11.0)
+    # The window runs from the request that was sent, not the coalesced one
+    assert dispatcher.submit("1", PRIORITY_HEALTH, window=4.0, now=14.0)
+    dispatcher.close()
+
+    assert sorted(key for key, _ in keyboard.sent) == ["1", "1", "2"]
+    assert dispatcher.stats()["coalesced"] == 1
+
+
+def test_clear_drops_the_queued_keys():
+    dispatcher, keyboard = blocked_dispatcher()
+    dispatcher.submit("1", PRIORITY_HEALTH)
+    dispatcher.submit("2", PRIORITY_MANA)
+    assert dispatcher.clear() == 2
+    assert len(dispatcher) == 0
+
+    keyboard.release.set()
+    dispatcher.close()
+    # Only the key that was already being sent went out
+    assert keyboard.keys() == ["first"]
+    assert dispatcher.clear() == 0
+
+
+def test_no_latency_statistics_before_the_first_key():
+    stats = InputDispatcher(FakeKeyboard()).stats()
+    assert stats["sent"] == 0
+    assert stats["p50_ms"] is None and stats["max_ms"] is None
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from events import EVENT_LEVEL, EVENT_MESSAGE, EVENT_REDRAW, EventChannel
+
+
+def waiting_consumer(channel, timeout):
+    """Start a thread blocked in channel.wait(), returns it and its result list"""
+    result = []
+    ready = threading.Event()
+
+    def consume():
+        ready.set()
+        start = time.perf_counter()
+        pending = channel.wait(timeout)
+        result.append((pending, time.perf_counter() - start))
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    assert ready.wait(2.0)
+    return thread, result
+
+
+def test_publish_wakes_the_waiting_consumer():
+    channel = EventChannel()
+    thread, result = waiting_consumer(channel, timeout=5.0)
+    time.sleep(0.05)  # The consumer is blocked in wait()
+    channel.publish(EVENT_LEVEL, ("health", 0.5))
+    thread.join(2.0)
+
+    pending, waited = result[0]
+    assert pending
+    assert waited < 2.0
+    assert channel.drain() == [(EVENT_LEVEL, ("health", 0.5))]
+
+
+def test_wait_times_out_without_events():
+    channel = EventChannel()
+    start = time.perf_counter()
+    assert not channel.wait(0.1)
+    assert 0.09 <= time.perf_counter() - start < 1.0
+    assert channel.stats()["wakeups"] == 1
+
+
+def test_wait_returns_at_once_when_events_are_pending():
+    channel = EventChannel()
+    channel.publish(EVENT_REDRAW)
+    start = time.perf_counter()
+    assert channel.wait(5.0)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_close_wakes_the_consumer_for_good():
+    channel = EventChannel()
+    thread, result = waiting_consumer(channel, timeout=None)
+    channel.close()
+    thread.join(2.0)
+    assert not thread.is_alive()
+    assert result[0][0] is False
+    # Later waits don't block either
+    assert not channel.wait()
+
+
+def test_drain_keeps_publishing_order():
+    channel = EventChannel()
+    channel.publish(EVENT_MESSAGE, "first")
+    channel.publish(EVENT_LEVEL, ("mana", 0.2))
+    channel.publish(EVENT_MESSAGE, "second")
+    assert channel.drain() == [(EVENT_MESSAGE, "first"), (EVENT_LEVEL, ("mana", 0.2)), (EVENT_MESSAGE, "second")]
+    assert channel.drain() == []
+    stats = channel.stats()
+    assert stats["published"] == stats["consumed"] == 3
+    assert stats["lag_max_ms"] is not None
+
+
+def test_full_channel_drops_the_oldest_events():
+    channel = EventChannel(capacity=3)
+    for i in range(5):
+        channel.publish(EVENT_MESSAGE, i)
+    assert len(channel) == 3
+    assert [payload for _, payload in channel.drain()] == [2, 3, 4]
+    assert channel.stats()["dropped"] == 2
@@ -0,0 +1,101 @@
+import csv
+import math
+import os
+
+import numpy as np
+
+from history import (
+    EVENT_DTYPE, FLAG_CONFIRMED, FLAG_LOW, FLAG_USED, READING_DTYPE, RingBuffer, SessionHistory, decision_flags
+)
+
+
+def test_ring_buffer_wraps_at_capacity_without_growing():
+    ring = RingBuffer(READING_DTYPE, 8)
+    data = ring.data
+    nbytes = ring.data.nbytes
+    for i in range(29):
+        ring.append((float(i), 0.5, 0.5, 0))
+    assert ring.data is data and ring.data.nbytes == nbytes
+    assert len(ring) == 8
+    assert ring.count == 29
+    assert ring.dropped() == 21
+
+
+def test_snapshot_holds_the_last_records_oldest_first():
+    ring = RingBuffer(READING_DTYPE, 5)
+    for i in range(3):
+        ring.append((float(i), 0.0, 0.0, 0))
+    assert ring.snapshot()["timestamp"].tolist() == [0.0, 1.0, 2.0]
+
+    for i in range(3, 12):
+        ring.append((float(i), 0.0, 0.0, 0))
+    assert ring.snapshot()["timestamp"].tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+
+    # Exactly at a multiple of the capacity
+    for i in range(12, 15):
+        ring.append((float(i), 0.0, 0.0, 0))
+    assert ring.snapshot()["timestamp"].tolist() == [10.0, 11.0, 12.0, 13.0, 14.0]
+
+
+def test_snapshot_is_a_copy():
+    ring = RingBuffer(EVENT_DTYPE, 4)
+    ring.append((1.0, 0, 0.3))
+    snapshot = ring.snapshot()
+    ring.append((2.0, 1, 0.2))
+    assert len(snapshot) == 1
+
+
+def test_session_memory_is_fixed_at_construction():
+    history = SessionHistory(capacity=100, event_capacity=10)
+    nbytes = history.nbytes()
+    for i in range(1000):
+        history.record_reading("health", float(i), 0.5, 0.5)
+        history.record_event("mana", float(i), 0.2)
+    assert history.nbytes() == nbytes
+    assert len(history.readings["health"]) == 100 and len(history.events) == 10
+
+
+def filled_history():
+    history = SessionHistory(capacity=4, event_capacity=4)
+    history.record_reading("health", 1.0, 0.8, 0.8)
+    history.record_reading("health", 2.0, None, 0.0, decision_flags(True, True, True))
+    history.record_reading("health", 3.0, 0.25, 0.3, decision_flags(True, False, False))
+    history.record_reading("mana", 1.5, 0.6, 0.6)
+    history.record_event("health", 2.0, 0.0)
+    return history
+
+
+def test_csv_export_with_missing_raw_levels(tmp_path):
+    paths = filled_history().export_csv(str(tmp_path))
+    assert sorted(os.path.basename(p) for p in paths) == ["events.csv", "readings_health.csv", "readings_mana.csv"]
+
+    with open(tmp_path / "readings_health.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [float(row["timestamp"]) for row in rows] == [1.0, 2.0, 3.0]
+    # A reading without colored pixels has no raw level
+    assert rows[1]["raw"] == "nan" and math.isnan(float(rows[1]["raw"]))
+    assert float(rows[1]["smoothed"]) == 0.0
+    assert (rows[1]["low"], rows[1]["confirmed"], rows[1]["used"]) == ("1", "1", "1")
+    assert (rows[2]["low"], rows[2]["confirmed"], rows[2]["used"]) == ("1", "0", "0")
+
+    with open(tmp_path / "events.csv") as f:
+        events = list(csv.DictReader(f))
+    assert events == [{"timestamp": "2.000000", "bar": "health", "level": "0.0000"}]
+
+
+def test_npz_export_with_missing_raw_levels(tmp_path):
+    path = filled_history().export_npz(str(tmp_path / "out" / "history.npz"))
+    with np.load(path) as data:
+        health = data["readings_health"]
+        assert data["bars"].tolist() == ["health", "mana"]
+        assert health["timestamp"].tolist() == [1.0, 2.0, 3.0]
+        assert np.isnan(health["raw"][1]) and not np.isnan(health["raw"][[0, 2]]).any()
+        assert health["flags"][1] == FLAG_LOW | FLAG_CONFIRMED | FLAG_USED
+        assert len(data["readings_mana"]) == 1
+        assert data["events"]["bar"].tolist() == [0]
+
+
+def test_export_writes_the_selected_formats(tmp_path):
+    target = filled_history().export(str(tmp_path), formats=("npz",))
+    assert os.path.dirname(target) == str(tmp_path)
+    assert os.listdir(target) == ["history.npz"]
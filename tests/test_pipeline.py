@@ -0,0 +1,72 @@
+import threading
+import time
+
+from pipeline import BarPipeline
+from scheduling import AdaptiveScheduler
+
+
+class CycleProbe:
+    """check() callable that counts the pipeline threads inside it at once"""
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.inside = 0
+        self.most_inside = 0
+        self.threads = set()
+
+    def __call__(self, frame):
+        with self.lock:
+            self.inside += 1
+            self.most_inside = max(self.most_inside, self.inside)
+            self.threads.add(threading.get_ident())
+        time.sleep(self.duration)
+        with self.lock:
+            self.inside -= 1
+        return 0.5
+
+
+def make_pipeline(probe):
+    scheduler = AdaptiveScheduler(0.3, min_interval=0.001, max_interval=0.001)
+    return BarPipeline("test", capture=lambda: None, check=probe, scheduler=scheduler)
+
+
+def test_concurrent_starts_run_one_thread():
+    probe = CycleProbe(0.002)
+    pipeline = make_pipeline(probe)
+    starters = [threading.Thread(target=pipeline.start) for _ in range(8)]
+    for thread in starters:
+        thread.start()
+    for thread in starters:
+        thread.join()
+    time.sleep(0.05)
+    pipeline.stop()
+    assert probe.most_inside == 1
+    assert len(probe.threads) == 1
+    assert not pipeline.is_alive()
+
+
+def test_restart_right_after_stop_waits_for_the_old_thread():
+    probe = CycleProbe(0.05)
+    pipeline = make_pipeline(probe)
+    pipeline.start()
+    time.sleep(0.01)  # The first cycle is running
+    old = pipeline.thread
+    # A quick off/on: the stop doesn't wait and the old cycle is still running
+    pipeline.stop(timeout=0)
+    pipeline.start()
+    assert not old.is_alive()
+    assert pipeline.thread is not old and pipeline.is_alive()
+    time.sleep(0.12)
+    pipeline.stop()
+    assert probe.most_inside == 1
+    assert not pipeline.is_alive()
+
+
+def test_start_while_running_keeps_the_thread():
+    pipeline = make_pipeline(CycleProbe())
+    pipeline.start()
+    thread = pipeline.thread
+    pipeline.start()
+    assert pipeline.thread is thread
+    pipeline.stop()
@@ -0,0 +1,33 @@
+import threading
+
+import pytest
+
+from scheduling import RATE_WINDOW, AdaptiveScheduler
+
+
+def test_sample_rate_over_the_rate_window():
+    scheduler = AdaptiveScheduler(0.3)
+    for i in range(101):
+        scheduler.update(1.0, now=i * 0.1)
+    assert scheduler.sample_rate(now=10.0) == pytest.approx(10.0)
+    assert scheduler.sample_rate(now=10.0 + RATE_WINDOW + 1) == 0.0
+
+
+def test_sample_rate_while_another_thread_updates():
+    scheduler = AdaptiveScheduler(0.3)
+    stop = threading.Event()
+
+    def pipeline():
+        now = 0.0
+        while not stop.is_set():
+            now += 0.01
+            scheduler.update(1.0, now=now)
+
+    thread = threading.Thread(target=pipeline)
+    thread.start()
+    try:
+        for _ in range(5000):
+            scheduler.sample_rate()
+    finally:
+        stop.set()
+        thread.join()
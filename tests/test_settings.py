@@ -0,0 +1,132 @@
+import configparser
+import os
+
+from settings import ConfigWatcher, Settings, startup_changes
+
+
+def parse(text):
+    config = configparser.ConfigParser()
+    config.read_string(text)
+    return config
+
+
+def test_missing_values_use_the_defaults():
+    settings, problems = Settings.from_config(configparser.ConfigParser())
+    assert settings == Settings.defaults()
+    assert problems == []
+
+
+def test_values_are_parsed():
+    settings, problems = Settings.from_config(parse("""
+[Thresholds]
+health = 0.5
+[Hotkeys]
+mana_potion = 4
+[Verification]
+confirm_frames = 3
+[Prediction]
+mode = ON
+latency = 0.08
+"""))
+    assert problems == []
+    assert settings.health_threshold == 0.5 and settings.mana_potion_key == "4"
+    assert settings.confirm_frames == 3
+    assert settings.prediction_mode == "on" and settings.prediction_latency == 0.08
+
+
+def test_unparsable_values_fall_back_and_are_reported():
+    settings, problems = Settings.from_config(parse("""
+[Thresholds]
+health = half
+mana = 0.4
+[Verification]
+window_frames = 2.5
+[Prediction]
+latency = soon
+"""))
+    defaults = Settings.defaults()
+    assert settings.health_threshold == defaults.health_threshold
+    assert settings.window_frames == defaults.window_frames
+    assert settings.prediction_latency is None
+    # The valid value is kept
+    assert settings.mana_threshold == 0.4
+    assert len(problems) == 3
+    assert "[Thresholds] health = 'half' is not a valid float" in problems
+
+
+def test_out_of_range_values_fall_back_and_are_reported():
+    settings, problems = Settings.from_config(parse("""
+[Thresholds]
+health = 1.5
+[Cooldowns]
+mana_potion = -1
+[Polling]
+min_interval = 0.2
+max_interval = 0.1
+[Prediction]
+mode = sometimes
+"""))
+    defaults = Settings.defaults()
+    assert settings.health_threshold == defaults.health_threshold
+    assert settings.mana_cooldown == defaults.mana_cooldown
+    assert settings.max_poll_interval == defaults.max_poll_interval
+    assert settings.min_poll_interval == 0.2
+    assert settings.prediction_mode == defaults.prediction_mode
+    assert len(problems) == 4
+    assert settings.validate() == []
+
+
+def test_startup_changes_list_only_restart_sections():
+    old = parse("[Thresholds]\nhealth = 0.3\n[Capture]\nmode = auto\n[Region es]\nkey = 3\n")
+    new = parse("[Thresholds]\nhealth = 0.4\n[Capture]\nmode = single\n")
+    assert startup_changes(old, new) == ["Capture", "Region es"]
+
+
+def touch(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_watcher_reports_a_modification_once(tmp_path):
+    path = tmp_path / "config.ini"
+    path.write_text("[Thresholds]\nhealth = 0.3\n")
+    touch(path, 1_000_000_000_000)
+    watcher = ConfigWatcher(str(path), interval=1.0)
+    assert not watcher.changed(now=10.0)
+
+    touch(path, 2_000_000_000_000)
+    # Not checked again within the interval
+    assert not watcher.changed(now=10.5)
+    assert watcher.changed(now=11.0)
+    assert not watcher.changed(now=12.0)
+
+
+def test_watcher_ignores_an_unchanged_file(tmp_path):
+    path = tmp_path / "config.ini"
+    path.write_text("[Thresholds]\nhealth = 0.3\n")
+    watcher = ConfigWatcher(str(path), interval=1.0)
+    assert not any(watcher.changed(now=float(t)) for t in range(10, 15))
+
+
+def test_watcher_notices_a_size_change_with_the_same_mtime(tmp_path):
+    path = tmp_path / "config.ini"
+    path.write_text("[Thresholds]\nhealth = 0.3\n")
+    touch(path, 1_000_000_000_000)
+    watcher = ConfigWatcher(str(path), interval=0.0)
+    path.write_text("[Thresholds]\nhealth = 0.35\n")
+    touch(path, 1_000_000_000_000)
+    assert watcher.changed(now=1.0)
+
+
+def test_watcher_skips_our_own_writes(tmp_path):
+    path = tmp_path / "config.ini"
+    path.write_text("[Thresholds]\nhealth = 0.3\n")
+    touch(path, 1_000_000_000_000)
+    watcher = ConfigWatcher(str(path), interval=0.0)
+    path.write_text("[Thresholds]\nhealth = 0.4\n")
+    watcher.mark_current()
+    assert not watcher.changed(now=1.0)
+
+
+def test_watcher_without_a_file(tmp_path):
+    watcher = ConfigWatcher(str(tmp_path / "missing.ini"), interval=0.0)
+    assert not watcher.changed(now=1.0)
@@ -0,0 +1,42 @@
+from triggers import ConfirmationFilter
+
+
+def feed(confirmation, observations):
+    return [confirmation.update(is_low) for is_low in observations]
+
+
+def test_two_of_three_confirms_on_the_second_low_reading():
+    confirmation = ConfirmationFilter(required=2, window=3)
+    assert feed(confirmation, [True, False, True]) == [False, False, True]
+
+
+def test_low_readings_outside_the_window_do_not_count():
+    confirmation = ConfirmationFilter(required=2, window=3)
+    # The first low reading has left the window when the second arrives
+    assert feed(confirmation, [True, False, False, True]) == [False, False, False, False]
+    assert confirmation.low_count == 1
+
+
+def test_single_glitch_frame_is_rejected():
+    confirmation = ConfirmationFilter(required=2, window=3)
+    assert not any(feed(confirmation, [False, False, True, False, False, False]))
+
+
+def test_one_of_one_triggers_on_the_first_low_reading():
+    confirmation = ConfirmationFilter(required=1, window=1)
+    assert feed(confirmation, [False, True, False]) == [False, True, False]
+
+
+def test_required_is_clamped_to_the_window():
+    confirmation = ConfirmationFilter(required=5, window=3)
+    assert confirmation.required == 3
+    assert feed(confirmation, [True, True, True]) == [False, False, True]
+
+
+def test_reset_after_a_press_needs_a_new_confirmation():
+    confirmation = ConfirmationFilter(required=2, window=3)
+    assert feed(confirmation, [True, True]) == [False, True]
+    confirmation.reset()
+    # The low readings from before the press no longer count
+    assert feed(confirmation, [True]) == [False]
+    assert feed(confirmation, [True]) == [True]
@@ -0,0 +1,198 @@
+"""
+Potion trigger decision logic for PoE2-AutoFlask.
+"""
+from collections import deque
+
+# Predictive triggering modes
+PREDICT_OFF = "off"
+PREDICT_SHADOW = "shadow"  # Predict and score, but only the reactive path presses flasks
+PREDICT_ON = "on"
+PREDICTION_MODES = (PREDICT_OFF, PREDICT_SHADOW, PREDICT_ON)
+
+
+class ConfirmationFilter:
+    """
+    N-of-M confirmation of a bar being below its threshold
+
+    Each monitoring cycle feeds one observation. A trigger is confirmed once
+    at least `required` of the last `window` observations were below the
+    threshold, so a single misread frame never presses a flask and the check
+    never has to stop and re-capture. required=1, window=1 triggers on the
+    first low reading.
+    """
+
+    def __init__(self, required=2, window=3):
+        """
+        Args:
+            required: Low observations needed to confirm (N)
+            window: Number of most recent observations considered (M)
+        """
+        window = max(1, int(window))
+        self.required = min(max(1, int(required)), window)
+        self.window = window
+        self.history = deque(maxlen=window)
+        self.low_count = 0
+
+    def update(self, is_low):
+        """
+        Record one observation
+
+        Args:
+            is_low: Whether this frame's reading is below the threshold
+
+        Returns:
+            True if the trigger is confirmed
+        """
+        if len(self.history) == self.window:
+            self.low_count -= self.history[0]
+        is_low = bool(is_low)
+        self.history.append(is_low)
+        self.low_count += is_low
+        return self.low_count >= self.required
+
+    def reset(self):
+        """Forget all observations, e.g. after a flask was used"""
+        self.history.clear()
+        self.low_count = 0
+
+
+class TrendPredictor:
+    """
+    Projects a bar's level a short time ahead from its recent trend
+
+    A constant-velocity Kalman filter tracks the level and its rate of
+    change from the raw (unsmoothed) readings. The predictor fires when the
+    level projected `horizon` seconds ahead - the expected time until the
+    next chance to react - is below the threshold while the bar is still
+    above it, so the flask can be pressed before the reactive path would
+    even start confirming.
+
+    Every fire is scored: it is a hit once the bar actually reads low, with
+    the time in between as lead time, or a false trigger if it doesn't
+    within verify_window seconds.
+    """
+
+    def __init__(self, process_noise=4.0, measurement_noise=0.02, min_samples=3,
+                 verify_window=1.0, history=256):
+        """
+        Args:
+            process_noise: Variance of the level's acceleration, (level/s^2)^2
+            measurement_noise: Standard deviation of a single reading
+            min_samples: Readings needed before the predictor can fire
+            verify_window: Seconds a fire has to be followed by a low reading
+            history: Number of recent lead times kept for statistics
+        """
+        self.process_noise = process_noise
+        self.measurement_variance = measurement_noise ** 2
+        self.min_samples = min_samples
+        self.verify_window = verify_window
+
+        self.fires = 0
+        self.hits = 0
+        self.false_triggers = 0
+        self.lead_times = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        """Forget the trend, e.g. after the bar's region changed"""
+        self.level = None
+        self.velocity = 0.0
+        # Covariance of (level, velocity)
+        self.p00 = self.p01 = self.p11 = 0.0
+        self.last_time = None
+        self.samples = 0
+        self.pending = None
+
+    def update(self, level, now):
+        """
+        Feed one reading
+
+        Args:
+            level: Measured level 0.0-1.0
+            now: Time of the reading, in seconds
+        """
+        if self.level is None:
+            self.level = level
+            self.velocity = 0.0
+            self.p00, self.p01, self.p11 = self.measurement_variance, 0.0, 1.0
+        else:
+            dt = now - self.last_time
+            if dt > 0:
+                # Predict: level += velocity * dt, with acceleration noise
+                q = self.process_noise
+                self.level += self.velocity * dt
+                p00 = self.p00 + dt * (2 * self.p01 + dt * self.p11) + q * dt ** 4 / 4
+                p01 = self.p01 + dt * self.p11 + q * dt ** 3 / 2
+                p11 = self.p11 + q * dt ** 2
+                self.p00, self.p01, self.p11 = p00, p01, p11
+
+            # Correct with the measured level
+            s = self.p00 + self.measurement_variance
+            k0, k1 = self.p00 / s, self.p01 / s
+            residual = level - self.level
+            self.level += k0 * residual
+            self.velocity += k1 * residual
+            self.p00, self.p01, self.p11 = (
+                (1 - k0) * self.p00,
+                (1 - k0) * self.p01,
+                self.p11 - k1 * self.p01,
+            )
+        self.last_time = now
+        self.samples += 1
+
+    def project(self, horizon):
+        """Level expected `horizon` seconds after the last reading"""
+        if self.level is None:
+            return None
+        return self.level + self.velocity * horizon
+
+    def check(self, threshold, horizon, now, is_low):
+        """
+        Decide whether to trigger ahead of the threshold crossing
+
+        Args:
+            threshold: Bar threshold
+            horizon: Seconds ahead to project, i.e. the expected reaction latency
+            now: Time of the latest reading
+            is_low: Whether the latest (smoothed) reading is already below the threshold
+
+        Returns:
+            True if the bar is projected to be below the threshold by then
+        """
+        # Score the outstanding fire
+        if self.pending is not None:
+            if is_low:
+                self.hits += 1
+                self.lead_times.append(now - self.pending)
+                self.pending = None
+            elif now - self.pending > self.verify_window:
+                self.false_triggers += 1
+                self.pending = None
+
+        fire = (
+            not is_low
+            and self.samples >= self.min_samples
+            and self.velocity < 0
+            and self.project(horizon) < threshold
+        )
+        if fire and self.pending is None:
+            self.fires += 1
+            self.pending = now
+        return fire
+
+    def stats(self):
+        """
+        Fire statistics
+
+        Returns:
+            Dict with fires, hits, false triggers and the mean/median lead
+            time of recent hits in milliseconds (None without hits)
+        """
+        leads = sorted(self.lead_times)
+        return {
+            "fires": self.fires,
+            "hits": self.hits,
+            "false_triggers": self.false_triggers,
+            "mean_lead_ms": sum(leads) / len(leads) * 1000 if leads else None,
+            "median_lead_ms": leads[len(leads) // 2] * 1000 if leads else None,
+        }